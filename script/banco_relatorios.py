@@ -0,0 +1,490 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Banco SQLite com os procedimentos dos relatórios, para consultas sem reprocessar os arquivos.
+
+O comando 'ingerir' analisa os relatórios (CSV no formato do sistema ou do conversor, ou
+XLS/XLSX lidos em streaming) e grava cada procedimento em tabelas indexadas de arquivos,
+profissionais, convênios e procedimentos. A ingestão é incremental: um arquivo já ingerido
+só é lido de novo se o tamanho, a data de modificação e o hash mudarem, e nesse caso os seus
+procedimentos são substituídos. Cada arquivo é gravado em uma única transação, com as
+linhas inseridas em lotes.
+
+O comando 'consultar' soma os procedimentos por convênio, profissional, período do relatório
+ou mês do atendimento, ou lista os procedimentos que atendem aos filtros:
+
+    python banco_relatorios.py ingerir "arq csv"
+    python banco_relatorios.py consultar --agrupar convenio --periodo 2025-04
+    python banco_relatorios.py consultar --paciente "LARISSA" --listar
+
+Os valores são guardados em centavos (inteiros) e as datas no formato AAAA-MM-DD.
+"""
+
+import os
+import sys
+import glob
+import time
+import sqlite3
+import argparse
+import datetime
+from decimal import Decimal
+import metricas
+from compressao import abrir_arquivo, remover_extensao_compressao, expandir_padrao
+from manifesto import calcular_hash
+from parser_relatorio import analisar_linhas, analisar_registros, eh_saida_gerada, Cabecalho
+from esquemas import ESQUEMA_REPASSE, tipar_procedimentos
+from processar_csv_final_ajustado import formatar_total_geral
+
+NOME_BANCO_PADRAO = 'relatorios.db'
+
+# Versão do esquema do banco (PRAGMA user_version)
+VERSAO_BANCO = 1
+
+# Procedimentos inseridos por chamada a executemany
+LOTE_INSERCAO = 5000
+
+EXTENSOES = ('.csv', '.xls', '.xlsx')
+
+# Colunas de agrupamento da consulta e a expressão SQL de cada uma
+AGRUPAMENTOS = {
+    'convenio': 'c.nome',
+    'profissional': 'pr.nome',
+    'periodo': "substr(a.periodo_inicio, 1, 7)",
+    'mes': "substr(p.data, 1, 7)",
+    'arquivo': 'a.caminho',
+}
+
+ESQUEMA_SQL = """
+CREATE TABLE IF NOT EXISTS arquivos (
+    id INTEGER PRIMARY KEY,
+    caminho TEXT NOT NULL UNIQUE,
+    tamanho INTEGER NOT NULL,
+    mtime REAL NOT NULL,
+    hash TEXT NOT NULL,
+    periodo_inicio TEXT,
+    periodo_fim TEXT,
+    procedimentos INTEGER NOT NULL,
+    ingerido_em TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS profissionais (
+    id INTEGER PRIMARY KEY,
+    nome TEXT NOT NULL UNIQUE
+);
+CREATE TABLE IF NOT EXISTS convenios (
+    id INTEGER PRIMARY KEY,
+    nome TEXT NOT NULL UNIQUE
+);
+CREATE TABLE IF NOT EXISTS procedimentos (
+    id INTEGER PRIMARY KEY,
+    arquivo_id INTEGER NOT NULL REFERENCES arquivos(id),
+    profissional_id INTEGER REFERENCES profissionais(id),
+    convenio_id INTEGER REFERENCES convenios(id),
+    codigo INTEGER,
+    data TEXT,
+    paciente TEXT COLLATE NOCASE,
+    procedimento TEXT,
+    repasse_centavos INTEGER
+);
+CREATE INDEX IF NOT EXISTS procedimentos_arquivo ON procedimentos(arquivo_id);
+CREATE INDEX IF NOT EXISTS procedimentos_convenio ON procedimentos(convenio_id, data);
+CREATE INDEX IF NOT EXISTS procedimentos_profissional ON procedimentos(profissional_id, data);
+CREATE INDEX IF NOT EXISTS procedimentos_paciente ON procedimentos(paciente);
+CREATE INDEX IF NOT EXISTS arquivos_periodo ON arquivos(periodo_inicio);
+"""
+
+_INSERIR_PROCEDIMENTO = ("INSERT INTO procedimentos (arquivo_id, profissional_id, convenio_id, codigo, data, "
+                         "paciente, procedimento, repasse_centavos) VALUES (?, ?, ?, ?, ?, ?, ?, ?)")
+
+def abrir_banco(caminho=NOME_BANCO_PADRAO):
+    """
+    Abre (ou cria) o banco de relatórios.
+
+    Args:
+        caminho (str, opcional): Arquivo do banco (padrão: relatorios.db)
+
+    Returns:
+        sqlite3.Connection: Conexão com o banco
+    """
+    conexao = sqlite3.connect(caminho)
+    versao = conexao.execute("PRAGMA user_version").fetchone()[0]
+    if versao not in (0, VERSAO_BANCO):
+        conexao.close()
+        raise ValueError(f"O banco '{caminho}' tem a versão {versao}; esta versão do script usa a {VERSAO_BANCO}.")
+    conexao.executescript(ESQUEMA_SQL)
+    conexao.execute(f"PRAGMA user_version = {VERSAO_BANCO}")
+    return conexao
+
+def _data_iso(texto):
+    """Converte uma data dd/mm/aaaa do relatório para AAAA-MM-DD (None se inválida)"""
+    try:
+        return datetime.datetime.strptime(texto, '%d/%m/%Y').date().isoformat()
+    except (TypeError, ValueError):
+        return None
+
+def registros_arquivo(arquivo, planilha=0):
+    """
+    Analisa um relatório em CSV ou Excel.
+
+    Args:
+        arquivo (str): Caminho para o relatório (.csv, .xls ou .xlsx; o CSV pode estar
+            comprimido: .csv.gz, .csv.bz2 ou .csv.xz)
+        planilha (int|str, opcional): Planilha lida nos arquivos Excel (padrão: 0)
+
+    Yields:
+        namedtuple: Registros do parser_relatorio
+    """
+    if os.path.splitext(remover_extensao_compressao(arquivo))[1].lower() == '.csv':
+        with abrir_arquivo(arquivo, 'r', encoding='utf-8-sig') as f:
+            for registro, _ in analisar_linhas(f):
+                yield registro
+    else:
+        # Importado aqui: só a ingestão de arquivos Excel precisa do leitor em streaming
+        from pipeline_xls import linhas_relatorio, SEPARADOR_DECIMAL
+        yield from analisar_registros(linhas_relatorio(arquivo, planilha), SEPARADOR_DECIMAL)
+
+class _Identificadores:
+    """Ids de profissionais e convênios, criados na primeira vez que cada nome aparece"""
+
+    def __init__(self, conexao, tabela):
+        self.conexao = conexao
+        self.tabela = tabela
+        self.ids = dict(conexao.execute(f"SELECT nome, id FROM {tabela}"))
+
+    def __call__(self, nome):
+        if nome is None:
+            return None
+        identificador = self.ids.get(nome)
+        if identificador is None:
+            identificador = self.conexao.execute(f"INSERT INTO {self.tabela} (nome) VALUES (?)", (nome,)).lastrowid
+            self.ids[nome] = identificador
+        return identificador
+
+def ingerir_arquivo(conexao, arquivo, profissionais, convenios, planilha=0, forcar=False):
+    """
+    Grava os procedimentos de um relatório no banco, se ele mudou desde a última ingestão.
+
+    Args:
+        conexao (sqlite3.Connection): Conexão aberta por abrir_banco
+        arquivo (str): Caminho para o relatório
+        profissionais (callable): Ids dos profissionais (ver _Identificadores)
+        convenios (callable): Ids dos convênios
+        planilha (int|str, opcional): Planilha lida nos arquivos Excel (padrão: 0)
+        forcar (bool, opcional): Ingere o arquivo mesmo que não tenha mudado
+
+    Returns:
+        int: Procedimentos gravados, ou None se o arquivo não mudou
+    """
+    caminho = os.path.abspath(arquivo)
+    estado = os.stat(arquivo)
+    anterior = conexao.execute("SELECT id, tamanho, mtime, hash FROM arquivos WHERE caminho = ?", (caminho,)).fetchone()
+    if anterior is not None and not forcar and (anterior[1], anterior[2]) == (estado.st_size, estado.st_mtime):
+        return None
+
+    hash_arquivo = calcular_hash(arquivo)
+    if anterior is not None and not forcar and anterior[3] == hash_arquivo:
+        # Conteúdo igual (arquivo copiado ou apenas "tocado"): só atualiza a data de modificação
+        with conexao:
+            conexao.execute("UPDATE arquivos SET tamanho = ?, mtime = ? WHERE id = ?",
+                            (estado.st_size, estado.st_mtime, anterior[0]))
+        return None
+
+    cabecalhos = []
+
+    def acompanhar(registros):
+        for registro in registros:
+            if isinstance(registro, Cabecalho):
+                cabecalhos.append(registro)
+            yield registro
+
+    total = 0
+    # Uma transação por arquivo: em caso de erro, os procedimentos anteriores são mantidos
+    with conexao:
+        if anterior is not None:
+            arquivo_id = anterior[0]
+            conexao.execute("DELETE FROM procedimentos WHERE arquivo_id = ?", (arquivo_id,))
+        else:
+            arquivo_id = conexao.execute(
+                "INSERT INTO arquivos (caminho, tamanho, mtime, hash, procedimentos, ingerido_em) VALUES (?, 0, 0, '', 0, '')",
+                (caminho,)).lastrowid
+
+        lote = []
+        with metricas.etapa('analise_insercao'):
+            for profissional, convenio, codigo, data, paciente, procedimento, repasse in tipar_procedimentos(
+                    acompanhar(registros_arquivo(arquivo, planilha)), ESQUEMA_REPASSE):
+                lote.append((arquivo_id, profissionais(profissional), convenios(convenio), codigo,
+                             data.isoformat() if data else None, paciente, procedimento, repasse))
+                if len(lote) >= LOTE_INSERCAO:
+                    conexao.executemany(_INSERIR_PROCEDIMENTO, lote)
+                    total += len(lote)
+                    lote = []
+            conexao.executemany(_INSERIR_PROCEDIMENTO, lote)
+            total += len(lote)
+
+        cabecalho = cabecalhos[0] if cabecalhos else None
+        conexao.execute("UPDATE arquivos SET tamanho = ?, mtime = ?, hash = ?, periodo_inicio = ?, periodo_fim = ?, "
+                        "procedimentos = ?, ingerido_em = ? WHERE id = ?",
+                        (estado.st_size, estado.st_mtime, hash_arquivo,
+                         _data_iso(cabecalho.periodo_inicio) if cabecalho else None,
+                         _data_iso(cabecalho.periodo_fim) if cabecalho else None,
+                         total, datetime.datetime.now().isoformat(timespec='seconds'), arquivo_id))
+
+    metricas.contar(arquivo, linhas=total, bytes=estado.st_size)
+    return total
+
+def _eh_relatorio(arquivo):
+    """Indica se o arquivo é um relatório que pode ser ingerido (só os CSVs podem estar comprimidos)"""
+    extensao = os.path.splitext(remover_extensao_compressao(arquivo))[1].lower()
+    return extensao in EXTENSOES and (extensao == '.csv' or remover_extensao_compressao(arquivo) == arquivo)
+
+def _eh_saida_gerada(arquivo):
+    """Indica se o arquivo é um consolidado ou uma partição, e não um relatório (só CSVs)"""
+    extensao = os.path.splitext(remover_extensao_compressao(arquivo))[1].lower()
+    return extensao == '.csv' and eh_saida_gerada(arquivo)
+
+def remover_arquivo(conexao, arquivo):
+    """
+    Apaga do banco um arquivo e os seus procedimentos.
+
+    Returns:
+        int: Procedimentos apagados, ou None se o arquivo não estava no banco
+    """
+    anterior = conexao.execute("SELECT id FROM arquivos WHERE caminho = ?", (os.path.abspath(arquivo),)).fetchone()
+    if anterior is None:
+        return None
+    with conexao:
+        apagados = conexao.execute("DELETE FROM procedimentos WHERE arquivo_id = ?", (anterior[0],)).rowcount
+        conexao.execute("DELETE FROM arquivos WHERE id = ?", (anterior[0],))
+    return apagados
+
+def expandir_entradas(entradas):
+    """Lista os relatórios (.csv, .xls, .xlsx e os CSVs comprimidos) de diretórios, padrões glob ou arquivos"""
+    arquivos = []
+    for entrada in entradas:
+        if os.path.isdir(entrada):
+            candidatos = glob.glob(os.path.join(entrada, '*'))
+        else:
+            candidatos = expandir_padrao(entrada)
+        arquivos.extend(c for c in candidatos if os.path.isfile(c) and _eh_relatorio(c))
+    return sorted(set(arquivos))
+
+def ingerir(caminho_banco, entradas, planilha=0, forcar=False):
+    """
+    Ingere os relatórios no banco.
+
+    Args:
+        caminho_banco (str): Arquivo do banco
+        entradas (list): Diretórios, padrões glob ou arquivos
+        planilha (int|str, opcional): Planilha lida nos arquivos Excel (padrão: 0)
+        forcar (bool, opcional): Ingere todos os arquivos, mesmo os que não mudaram
+
+    Returns:
+        bool: True se todos os arquivos foram ingeridos, False caso contrário
+    """
+    arquivos = expandir_entradas(entradas)
+    # Consolidados e partições ficam na pasta dos relatórios, mas repetem os procedimentos deles
+    gerados = [arquivo for arquivo in arquivos if _eh_saida_gerada(arquivo)]
+    arquivos = [arquivo for arquivo in arquivos if arquivo not in gerados]
+    if not arquivos:
+        print("Erro: Nenhum relatório (.csv, .xls, .xlsx) encontrado.")
+        return False
+
+    conexao = abrir_banco(caminho_banco)
+    try:
+        for arquivo in gerados:
+            # Ingerido por uma versão anterior do script: os procedimentos saem do banco
+            apagados = remover_arquivo(conexao, arquivo)
+            situacao = f"{apagados} procedimento(s) removido(s) do banco" if apagados is not None else "ignorado"
+            print(f"  - {arquivo}: consolidado ou partição gerado pelos scripts, {situacao}")
+        profissionais = _Identificadores(conexao, 'profissionais')
+        convenios = _Identificadores(conexao, 'convenios')
+        inicio = time.perf_counter()
+        ingeridos = inalterados = procedimentos = 0
+        falhas = []
+        for arquivo in arquivos:
+            try:
+                total = ingerir_arquivo(conexao, arquivo, profissionais, convenios, planilha, forcar)
+            except Exception as e:
+                falhas.append((arquivo, str(e)))
+                # A transação do arquivo foi desfeita; ids criados nela não existem mais
+                profissionais = _Identificadores(conexao, 'profissionais')
+                convenios = _Identificadores(conexao, 'convenios')
+                continue
+            if total is None:
+                inalterados += 1
+            else:
+                ingeridos += 1
+                procedimentos += total
+                print(f"  - {arquivo}: {total} procedimento(s)")
+    finally:
+        conexao.close()
+
+    print("\n===== RESUMO DA INGESTÃO =====")
+    print(f"Arquivos ingeridos: {ingeridos} ({procedimentos} procedimento(s))")
+    print(f"Sem alterações (ignorados): {inalterados}")
+    print(f"Falhas: {len(falhas)}")
+    for arquivo, mensagem in falhas:
+        print(f"  - {arquivo}: {mensagem}")
+    print(f"Tempo total: {time.perf_counter() - inicio:.2f}s")
+    return not falhas
+
+def _filtros(convenio=None, profissional=None, paciente=None, periodo=None, inicio=None, fim=None):
+    """Monta a cláusula WHERE e os parâmetros da consulta"""
+    condicoes = []
+    parametros = []
+    if convenio:
+        condicoes.append("c.nome = ?")
+        parametros.append(convenio)
+    if profissional:
+        condicoes.append("pr.nome = ?")
+        parametros.append(profissional)
+    if paciente:
+        # Prefixo: usa o índice de pacientes (sem diferenciar maiúsculas de minúsculas)
+        condicoes.append("p.paciente LIKE ?")
+        parametros.append(paciente.replace('%', '').replace('_', '') + '%')
+    if periodo:
+        condicoes.append("a.periodo_inicio LIKE ?")
+        parametros.append(periodo + '%')
+    if inicio:
+        condicoes.append("p.data >= ?")
+        parametros.append(inicio)
+    if fim:
+        condicoes.append("p.data <= ?")
+        parametros.append(fim)
+    return (" WHERE " + " AND ".join(condicoes)) if condicoes else "", parametros
+
+_FROM = """
+FROM procedimentos p
+JOIN arquivos a ON a.id = p.arquivo_id
+LEFT JOIN profissionais pr ON pr.id = p.profissional_id
+LEFT JOIN convenios c ON c.id = p.convenio_id
+"""
+
+def consultar_totais(conexao, agrupar=('convenio',), **filtros):
+    """
+    Soma os procedimentos, agrupados pelas colunas pedidas.
+
+    Args:
+        conexao (sqlite3.Connection): Conexão aberta por abrir_banco
+        agrupar (tuple, opcional): Colunas de AGRUPAMENTOS (padrão: convênio)
+        **filtros: convenio, profissional, paciente (prefixo), periodo (AAAA ou AAAA-MM do
+            relatório), inicio e fim (datas AAAA-MM-DD do atendimento)
+
+    Returns:
+        list: Tuplas (valores das colunas..., quantidade, total em centavos)
+    """
+    where, parametros = _filtros(**filtros)
+    colunas = ", ".join(AGRUPAMENTOS[coluna] for coluna in agrupar)
+    sql = f"SELECT {colunas + ', ' if colunas else ''}COUNT(*), COALESCE(SUM(p.repasse_centavos), 0) {_FROM}{where}"
+    if colunas:
+        sql += f" GROUP BY {colunas} ORDER BY {colunas}"
+    return conexao.execute(sql, parametros).fetchall()
+
+def listar_procedimentos(conexao, limite=None, **filtros):
+    """
+    Lista os procedimentos que atendem aos filtros (ver consultar_totais).
+
+    Returns:
+        list: Tuplas (profissional, convênio, código, data, paciente, procedimento, centavos, arquivo)
+    """
+    where, parametros = _filtros(**filtros)
+    sql = (f"SELECT pr.nome, c.nome, p.codigo, p.data, p.paciente, p.procedimento, p.repasse_centavos, a.caminho "
+           f"{_FROM}{where} ORDER BY p.data, p.codigo")
+    if limite:
+        sql += f" LIMIT {int(limite)}"
+    return conexao.execute(sql, parametros).fetchall()
+
+def _formatar_centavos(centavos):
+    return formatar_total_geral(Decimal(centavos or 0).scaleb(-2))
+
+def _imprimir_tabela(cabecalho, linhas):
+    """Exibe as linhas alinhadas em colunas"""
+    textos = [[str(valor) if valor is not None else '' for valor in linha] for linha in linhas]
+    larguras = [max([len(titulo)] + [len(linha[i]) for linha in textos]) for i, titulo in enumerate(cabecalho)]
+    print("  ".join(titulo.ljust(largura) for titulo, largura in zip(cabecalho, larguras)))
+    print("  ".join('-' * largura for largura in larguras))
+    for linha in textos:
+        print("  ".join(valor.ljust(largura) for valor, largura in zip(linha, larguras)))
+
+def consultar(caminho_banco, agrupar=('convenio',), listar=False, limite=None, **filtros):
+    """
+    Executa uma consulta e exibe o resultado.
+
+    Returns:
+        bool: True se a consulta foi executada, False caso contrário
+    """
+    if not os.path.isfile(caminho_banco):
+        print(f"Erro: O banco '{caminho_banco}' não existe; use o comando 'ingerir' antes.")
+        return False
+
+    conexao = abrir_banco(caminho_banco)
+    try:
+        inicio = time.perf_counter()
+        if listar:
+            linhas = listar_procedimentos(conexao, limite, **filtros)
+            duracao = time.perf_counter() - inicio
+            _imprimir_tabela(['profissional', 'convenio', 'codigo', 'data', 'paciente', 'procedimento', 'repasse', 'arquivo'],
+                             [linha[:6] + (_formatar_centavos(linha[6]), os.path.basename(linha[7])) for linha in linhas])
+        else:
+            linhas = consultar_totais(conexao, agrupar, **filtros)
+            duracao = time.perf_counter() - inicio
+            _imprimir_tabela(list(agrupar) + ['procedimentos', 'total'],
+                             [linha[:-1] + (_formatar_centavos(linha[-1]),) for linha in linhas])
+            if len(linhas) > 1:
+                print(f"\nTotal: {_formatar_centavos(sum(linha[-1] for linha in linhas))} "
+                      f"({sum(linha[-2] for linha in linhas)} procedimento(s))")
+    finally:
+        conexao.close()
+
+    print(f"\n{len(linhas)} linha(s) em {duracao * 1000:.1f} ms")
+    return True
+
+def criar_parser_argumentos():
+    """Cria o parser dos argumentos de linha de comando"""
+    parser = argparse.ArgumentParser(description="Banco SQLite com os procedimentos dos relatórios de repasse.")
+    parser.add_argument('--banco', default=NOME_BANCO_PADRAO, help=f"Arquivo do banco (padrão: {NOME_BANCO_PADRAO})")
+    comandos = parser.add_subparsers(dest='comando', required=True)
+
+    ingestao = comandos.add_parser('ingerir', help="Grava no banco os relatórios novos ou alterados")
+    ingestao.add_argument('entradas', nargs='+', help="Diretórios, padrões glob ou arquivos (.csv, .xls, .xlsx)")
+    ingestao.add_argument('--planilha', type=int, default=0, help="Planilha lida nos arquivos Excel (padrão: 0)")
+    ingestao.add_argument('--forcar', action='store_true', help="Ingere todos os arquivos, mesmo os que não mudaram")
+    metricas.adicionar_argumentos(ingestao)
+
+    consulta = comandos.add_parser('consultar', help="Soma ou lista os procedimentos gravados")
+    consulta.add_argument('--agrupar', default='convenio',
+                          help=f"Colunas de agrupamento, separadas por vírgula: {', '.join(AGRUPAMENTOS)} "
+                               "(padrão: convenio; vazio para o total geral)")
+    consulta.add_argument('--convenio', help="Somente este convênio")
+    consulta.add_argument('--profissional', help="Somente este profissional")
+    consulta.add_argument('--paciente', help="Somente pacientes cujo nome começa com este texto")
+    consulta.add_argument('--periodo', help="Período do relatório (AAAA ou AAAA-MM)")
+    consulta.add_argument('--inicio', help="Atendimentos a partir desta data (AAAA-MM-DD)")
+    consulta.add_argument('--fim', help="Atendimentos até esta data (AAAA-MM-DD)")
+    consulta.add_argument('--listar', action='store_true', help="Lista os procedimentos em vez de somá-los")
+    consulta.add_argument('--limite', type=int, help="Número máximo de procedimentos listados")
+    return parser
+
+def main():
+    args = criar_parser_argumentos().parse_args()
+
+    try:
+        if args.comando == 'ingerir':
+            with metricas.medir(args.metricas, args.metricas_saida, args.perfil):
+                sucesso = ingerir(args.banco, args.entradas, args.planilha, args.forcar)
+        else:
+            agrupar = tuple(coluna.strip() for coluna in args.agrupar.split(',') if coluna.strip())
+            invalidas = [coluna for coluna in agrupar if coluna not in AGRUPAMENTOS]
+            if invalidas:
+                print(f"Erro: Agrupamento inválido: {', '.join(invalidas)} (use {', '.join(AGRUPAMENTOS)})")
+                return 1
+            sucesso = consultar(args.banco, agrupar, args.listar, args.limite, convenio=args.convenio,
+                                profissional=args.profissional, paciente=args.paciente, periodo=args.periodo,
+                                inicio=args.inicio, fim=args.fim)
+    except (ValueError, sqlite3.Error) as e:
+        print(f"Erro: {str(e)}")
+        return 1
+    return 0 if sucesso else 1
+
+if __name__ == "__main__":
+    sys.exit(main())
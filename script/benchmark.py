@@ -0,0 +1,237 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Medição de desempenho da conversão e da consolidação em relatórios sintéticos.
+
+Para cada tamanho pedido, gera relatórios com o gerador_relatorios.py e mede, em um
+processo novo para cada caso (para que o pico de memória de um caso não contamine o outro):
+
+- a conversão XLS/XLSX -> CSV (converter_xls_para_csv), com cada motor;
+- a consolidação dos CSVs (processar_arquivos_csv).
+
+São medidos o tempo total, as linhas de procedimento por segundo, os MB lidos por segundo e
+o pico de memória (RSS) do processo. Também é medido o tempo de inicialização dos scripts
+(--help da linha de comando e listagem das planilhas), em processos novos. Os resultados são gravados em JSON e podem ser
+comparados com os de uma execução anterior com --comparar.
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import platform
+import tempfile
+import statistics
+import subprocess
+import contextlib
+import multiprocessing
+from datetime import datetime
+from concurrent.futures import ProcessPoolExecutor
+from gerador_relatorios import gerar_arquivos, MAX_LINHAS_XLS
+from conversor_streaming import MOTORES
+from leitor_excel import PADRAO_NOME_PLANILHAS
+from xls_to_csv_interface import converter_xls_para_csv
+from processar_csv_final_ajustado import processar_arquivos_csv
+from metricas import pico_rss_mb
+
+TAMANHOS_PADRAO = (1000, 10000)
+ARQUIVOS_CONSOLIDACAO = 10
+REPETICOES_INICIALIZACAO = 5
+
+DIRETORIO_SCRIPTS = os.path.dirname(os.path.abspath(__file__))
+
+def _executar_caso(operacao, argumentos):
+    """Executa um caso no processo atual, sem as mensagens do script, e mede tempo e memória"""
+    with open(os.devnull, 'w') as nulo, contextlib.redirect_stdout(nulo):
+        inicio = time.perf_counter()
+        if operacao == 'conversao':
+            sucesso = converter_xls_para_csv(*argumentos)
+        else:
+            processar_arquivos_csv(*argumentos)
+            sucesso = os.path.exists(argumentos[2])
+        tempo = time.perf_counter() - inicio
+    return sucesso, tempo, pico_rss_mb()
+
+def medir(operacao, argumentos, linhas, tamanho_bytes):
+    """
+    Mede um caso em um processo novo.
+
+    Args:
+        operacao (str): 'conversao' ou 'consolidacao'
+        argumentos (tuple): Argumentos de converter_xls_para_csv ou processar_arquivos_csv
+        linhas (int): Linhas de procedimento processadas
+        tamanho_bytes (int): Tamanho dos arquivos de entrada
+
+    Returns:
+        dict: Tempo, vazão e pico de memória do caso
+    """
+    with ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context('spawn')) as executor:
+        sucesso, tempo, pico = executor.submit(_executar_caso, operacao, argumentos).result()
+
+    return {
+        'sucesso': sucesso,
+        'linhas': linhas,
+        'bytes': tamanho_bytes,
+        'tempo_s': round(tempo, 4),
+        'linhas_por_s': round(linhas / tempo, 1) if tempo else None,
+        'mb_por_s': round(tamanho_bytes / (1024 * 1024) / tempo, 3) if tempo else None,
+        'pico_rss_mb': pico,
+    }
+
+def _tamanho_total(arquivos):
+    return sum(os.path.getsize(arquivo) for arquivo in arquivos)
+
+def executar_benchmark(tamanhos, diretorio, formatos=('xls', 'xlsx'), motores=MOTORES, convenios=8, semente=0):
+    """
+    Executa todos os casos do benchmark.
+
+    Args:
+        tamanhos (list): Números de procedimentos por relatório
+        diretorio (str): Diretório de trabalho (relatórios gerados e saídas)
+        formatos (tuple, opcional): Formatos medidos na conversão (padrão: xls e xlsx)
+        motores (tuple, opcional): Motores medidos na conversão (padrão: todos)
+        convenios (int, opcional): Convênios por relatório (padrão: 8)
+        semente (int, opcional): Semente dos dados gerados (padrão: 0)
+
+    Returns:
+        list: Resultados de cada caso
+    """
+    resultados = []
+
+    def registrar(caso, medicao):
+        resultado = dict(caso, **medicao)
+        resultados.append(resultado)
+        pico = f"{resultado['pico_rss_mb']} MB" if resultado['pico_rss_mb'] is not None else "n/d"
+        print(f"  {caso['operacao']:<12} {caso['formato']:<5} {caso.get('motor', ''):<9} "
+              f"{resultado['tempo_s']:>9.3f} s {resultado['linhas_por_s']:>12.0f} linhas/s "
+              f"{resultado['mb_por_s']:>8.2f} MB/s  pico {pico}")
+
+    for tamanho in tamanhos:
+        print(f"\nTamanho: {tamanho} procedimentos por relatório")
+        base = os.path.join(diretorio, str(tamanho))
+
+        for formato in formatos:
+            if formato == 'xls' and tamanho + 2 * convenios + 4 > MAX_LINHAS_XLS:
+                print(f"  conversao    xls   (ignorado: acima do limite de {MAX_LINHAS_XLS} linhas do formato)")
+                continue
+            arquivos, linhas = gerar_arquivos(base, formato, 1, 1, convenios, tamanho, semente)
+            for motor in motores:
+                saida = os.path.join(base, f"saida_{formato}_{motor}.csv")
+                medicao = medir('conversao', (arquivos[0], saida, 0, PADRAO_NOME_PLANILHAS, False, motor), linhas, _tamanho_total(arquivos))
+                registrar({'operacao': 'conversao', 'formato': formato, 'motor': motor, 'tamanho': tamanho}, medicao)
+
+        diretorio_csv = os.path.join(base, 'csv')
+        arquivos, linhas = gerar_arquivos(diretorio_csv, 'csv', ARQUIVOS_CONSOLIDACAO, 1, convenios, tamanho, semente)
+        saida = os.path.join(base, 'consolidado.csv')
+        medicao = medir('consolidacao', (diretorio_csv, '*.csv', saida), linhas, _tamanho_total(arquivos))
+        registrar({'operacao': 'consolidacao', 'formato': 'csv', 'tamanho': tamanho, 'arquivos': ARQUIVOS_CONSOLIDACAO}, medicao)
+
+    return resultados
+
+def medir_inicializacao(diretorio, repeticoes=REPETICOES_INICIALIZACAO):
+    """
+    Mede o tempo de inicialização dos scripts, cada execução em um processo Python novo.
+
+    Args:
+        diretorio (str): Diretório de trabalho (recebe um arquivo Excel de exemplo)
+        repeticoes (int, opcional): Execuções de cada caso (padrão: 5)
+
+    Returns:
+        list: Resultados de cada caso (tempo_s é a mediana das execuções)
+    """
+    arquivos, _ = gerar_arquivos(os.path.join(diretorio, 'inicializacao'), 'xlsx', 1, 3, 4, 100)
+    casos = [
+        ('ajuda_cli', [os.path.join(DIRETORIO_SCRIPTS, 'xls_to_csv_interface.py'), '--help']),
+        ('listar_planilhas', ['-c', f"from leitor_excel import listar_nomes_planilhas; listar_nomes_planilhas({arquivos[0]!r})"]),
+        ('importar_pandas', ['-c', 'import pandas']),
+    ]
+
+    print("\nInicialização (processo novo a cada execução)")
+    resultados = []
+    for nome, argumentos in casos:
+        tempos = []
+        for _ in range(repeticoes):
+            inicio = time.perf_counter()
+            subprocess.run([sys.executable] + argumentos, cwd=DIRETORIO_SCRIPTS, check=True,
+                           stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+            tempos.append(time.perf_counter() - inicio)
+        mediana = statistics.median(tempos)
+        resultados.append({'operacao': 'inicializacao', 'formato': nome, 'tamanho': 0, 'repeticoes': repeticoes,
+                           'tempo_s': round(mediana, 4), 'tempo_min_s': round(min(tempos), 4)})
+        print(f"  {nome:<18} {mediana:>7.3f} s (mínimo {min(tempos):.3f} s)")
+    return resultados
+
+def _chave_caso(resultado):
+    return (resultado['operacao'], resultado['formato'], resultado.get('motor'), resultado['tamanho'])
+
+def comparar_resultados(resultados, arquivo_anterior):
+    """
+    Compara os tempos com os de uma execução anterior gravada em JSON.
+
+    Args:
+        resultados (list): Resultados da execução atual
+        arquivo_anterior (str): JSON gravado por uma execução anterior
+    """
+    with open(arquivo_anterior, 'r', encoding='utf-8') as f:
+        anteriores = {_chave_caso(r): r for r in json.load(f)['resultados']}
+
+    print(f"\nComparação com {arquivo_anterior}:")
+    for resultado in resultados:
+        anterior = anteriores.get(_chave_caso(resultado))
+        if not anterior or not anterior['tempo_s']:
+            continue
+        variacao = (resultado['tempo_s'] / anterior['tempo_s'] - 1) * 100
+        operacao, formato, motor, tamanho = _chave_caso(resultado)
+        print(f"  {operacao:<12} {formato:<5} {motor or '':<9} {tamanho:>8}: "
+              f"{anterior['tempo_s']:.3f} s -> {resultado['tempo_s']:.3f} s ({variacao:+.1f}%)")
+
+def criar_parser_argumentos():
+    """Cria o parser dos argumentos de linha de comando"""
+    parser = argparse.ArgumentParser(description="Mede o desempenho da conversão e da consolidação em relatórios sintéticos.")
+    parser.add_argument('--tamanhos', default=','.join(str(t) for t in TAMANHOS_PADRAO),
+                        help="Procedimentos por relatório, separados por vírgula (padrão: 1000,10000)")
+    parser.add_argument('--formatos', default='xls,xlsx', help="Formatos medidos na conversão (padrão: xls,xlsx)")
+    parser.add_argument('--convenios', type=int, default=8, help="Convênios por relatório (padrão: 8)")
+    parser.add_argument('--semente', type=int, default=0, help="Semente dos dados gerados (padrão: 0)")
+    parser.add_argument('--diretorio', help="Diretório de trabalho (padrão: um diretório temporário, apagado ao final)")
+    parser.add_argument('--repeticoes', type=int, default=REPETICOES_INICIALIZACAO,
+                        help=f"Execuções de cada caso de inicialização (padrão: {REPETICOES_INICIALIZACAO}; 0 desativa)")
+    parser.add_argument('--saida', help="Arquivo JSON dos resultados (padrão: benchmark_AAAAMMDD_HHMMSS.json)")
+    parser.add_argument('--comparar', metavar='JSON', help="Resultados de uma execução anterior, para comparação")
+    return parser
+
+def main():
+    args = criar_parser_argumentos().parse_args()
+
+    try:
+        tamanhos = [int(t) for t in args.tamanhos.split(',') if t.strip()]
+    except ValueError:
+        print(f"Erro: tamanhos inválidos: {args.tamanhos}")
+        return 1
+    formatos = tuple(f.strip() for f in args.formatos.split(',') if f.strip())
+
+    with contextlib.ExitStack() as pilha:
+        diretorio = args.diretorio or pilha.enter_context(tempfile.TemporaryDirectory(prefix='benchmark_'))
+        resultados = []
+        if args.repeticoes > 0:
+            resultados += medir_inicializacao(diretorio, args.repeticoes)
+        resultados += executar_benchmark(tamanhos, diretorio, formatos, convenios=args.convenios, semente=args.semente)
+
+    saida = args.saida or f"benchmark_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
+    with open(saida, 'w', encoding='utf-8') as f:
+        json.dump({
+            'data': datetime.now().isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'plataforma': platform.platform(),
+            'resultados': resultados,
+        }, f, ensure_ascii=False, indent=2)
+    print(f"\nResultados gravados em {saida}")
+
+    if args.comparar:
+        comparar_resultados(resultados, args.comparar)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Cliente do servidor de conversão (ver servidor_conversao.py).
+
+Aceita os mesmos argumentos do xls_to_csv_interface.py, ou, com --consolidar como primeiro
+argumento, os do processar_csv_final_ajustado.py:
+
+    python cliente_conversao.py entrada.xls saida.csv 0
+    python cliente_conversao.py --consolidar "arq csv" "*.csv" consolidado.csv
+
+Se houver um servidor em execução, o trabalho é enviado a ele e o cliente apenas exibe as
+mensagens e sai com o mesmo código que o script sairia; o cliente não importa o pandas.
+Se não houver servidor, o trabalho é executado no próprio processo, como se o script
+tivesse sido chamado diretamente. O endereço do servidor pode ser indicado na variável de
+ambiente CONVERSOR_SERVIDOR (caminho de um socket Unix ou host:porta).
+
+O cliente só usa um socket Unix que pertença ao próprio usuário e envia junto com o trabalho
+o token que o servidor gravou no diretório privado do usuário (ver servidor_conversao.py).
+"""
+
+import os
+import sys
+import json
+import socket
+from servidor_conversao import (OPERACAO_CONVERSAO, OPERACAO_CONSOLIDACAO, endereco_padrao, interpretar_endereco,
+                                arquivo_token)
+
+VARIAVEL_ENDERECO = 'CONVERSOR_SERVIDOR'
+
+ARGUMENTO_CONSOLIDAR = '--consolidar'
+
+# Tempo máximo para conectar ao servidor antes de converter no próprio processo
+TIMEOUT_CONEXAO = 1.0
+
+def enviar_trabalho(operacao, argumentos, endereco=None):
+    """
+    Envia um trabalho ao servidor e aguarda o resultado.
+
+    Args:
+        operacao (str): 'conversao' ou 'consolidacao'
+        argumentos (list): Argumentos de linha de comando do script
+        endereco (str, opcional): Endereço do servidor (padrão: CONVERSOR_SERVIDOR ou o padrão)
+
+    Returns:
+        dict: Resposta do servidor ({'sucesso', 'saida'}), ou None se não há servidor
+    """
+    endereco = endereco or os.environ.get(VARIAVEL_ENDERECO) or endereco_padrao()
+    familia, endereco_socket = interpretar_endereco(endereco)
+    try:
+        if familia != socket.AF_INET and hasattr(os, 'getuid') and os.stat(endereco_socket).st_uid != os.getuid():
+            print(f"Aviso: o socket '{endereco_socket}' pertence a outro usuário; o trabalho será executado localmente.",
+                  file=sys.stderr)
+            return None
+        # Sem o token, não há um servidor deste usuário no endereço
+        with open(arquivo_token(endereco), 'r', encoding='utf-8') as f:
+            token = f.read().strip()
+    except OSError:
+        return None
+    try:
+        conexao = socket.socket(familia, socket.SOCK_STREAM)
+        conexao.settimeout(TIMEOUT_CONEXAO)
+        conexao.connect(endereco_socket)
+    except (OSError, AttributeError):
+        return None
+
+    with conexao:
+        # A conversão pode demorar: depois de conectado, espera sem limite de tempo
+        conexao.settimeout(None)
+        requisicao = {'operacao': operacao, 'argumentos': argumentos, 'diretorio': os.getcwd(), 'token': token}
+        conexao.sendall((json.dumps(requisicao, ensure_ascii=False) + "\n").encode('utf-8'))
+        with conexao.makefile('r', encoding='utf-8') as f:
+            linha = f.readline()
+    if not linha:
+        return {'sucesso': False, 'saida': "Erro: o servidor encerrou a conexão sem responder.\n"}
+    return json.loads(linha)
+
+def executar_localmente(operacao, argumentos):
+    """Executa o script no próprio processo, como se tivesse sido chamado na linha de comando"""
+    if operacao == OPERACAO_CONSOLIDACAO:
+        import processar_csv_final_ajustado as script
+    else:
+        import xls_to_csv_interface as script
+    sys.argv = [script.__file__] + argumentos
+    script.main()
+
+def main():
+    argumentos = sys.argv[1:]
+    operacao = OPERACAO_CONVERSAO
+    if argumentos[:1] == [ARGUMENTO_CONSOLIDAR]:
+        operacao = OPERACAO_CONSOLIDACAO
+        argumentos = argumentos[1:]
+
+    # Sem argumentos, os scripts entram no modo interativo, que só funciona no terminal local
+    resposta = enviar_trabalho(operacao, argumentos) if argumentos else None
+    if resposta is None:
+        executar_localmente(operacao, argumentos)
+        return 0
+
+    sys.stdout.write(resposta['saida'])
+    return 0 if resposta['sucesso'] else 1
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Leitura e gravação transparente de CSVs comprimidos (gzip, bz2 e xz).
+
+A compressão é escolhida pela extensão do arquivo: 'consolidado.csv.gz' é gravado em gzip,
+'relatorio.csv.xz' é lido descomprimindo à medida que as linhas são consumidas, e qualquer
+outro nome é tratado como um arquivo comum. A compressão acontece em streaming, sem gerar
+uma cópia descomprimida em disco.
+
+O nível de compressão vale para todos os arquivos gravados pelo processo (ver
+definir_nivel e a opção --nivel-compressao); sem ele, cada formato usa o padrão da
+ferramenta de linha de comando correspondente (gzip -6, bzip2 -9, xz -6).
+"""
+
+import io
+import os
+import glob
+
+# Extensão -> formato de compressão
+EXTENSOES = {'.gz': 'gzip', '.bz2': 'bz2', '.xz': 'xz'}
+
+NIVEIS_PADRAO = {'gzip': 6, 'bz2': 9, 'xz': 6}
+
+NIVEL_MINIMO = 1
+NIVEL_MAXIMO = 9
+
+_nivel = None
+
+def formato_compressao(caminho):
+    """
+    Identifica a compressão de um arquivo pela extensão.
+
+    Args:
+        caminho (str): Caminho do arquivo
+
+    Returns:
+        str: 'gzip', 'bz2' ou 'xz', ou None se o arquivo não é comprimido
+    """
+    return EXTENSOES.get(os.path.splitext(caminho)[1].lower())
+
+def remover_extensao_compressao(caminho):
+    """Retorna o caminho sem a extensão de compressão (ex: 'a.csv.gz' -> 'a.csv')"""
+    if formato_compressao(caminho):
+        return os.path.splitext(caminho)[0]
+    return caminho
+
+def definir_nivel(nivel):
+    """
+    Define o nível de compressão dos arquivos gravados a seguir pelo processo.
+
+    Args:
+        nivel (int): De 1 (mais rápido) a 9 (menor arquivo), ou None para o padrão de cada formato
+    """
+    global _nivel
+    if nivel is not None and not NIVEL_MINIMO <= nivel <= NIVEL_MAXIMO:
+        raise ValueError(f"Nível de compressão inválido: {nivel} (use de {NIVEL_MINIMO} a {NIVEL_MAXIMO})")
+    _nivel = nivel
+
+def nivel_atual():
+    """Retorna o nível definido com definir_nivel (None se for o padrão de cada formato)"""
+    return _nivel
+
+def abrir_arquivo(caminho, modo='r', encoding=None, newline=None, formato=None):
+    """
+    Abre um arquivo, comprimindo ou descomprimindo conforme a extensão.
+
+    Args:
+        caminho (str): Caminho do arquivo
+        modo (str, opcional): 'r', 'w' ou 'a', em texto ou binário ('rb', 'wb'...), como no open()
+        encoding (str, opcional): Codificação (apenas em modo texto)
+        newline (str, opcional): Tratamento das quebras de linha (apenas em modo texto)
+        formato (str, opcional): Compressão a usar, quando não pode ser deduzida do nome
+            (ex: o arquivo temporário de uma saída '.csv.gz'); padrão: pela extensão
+
+    Returns:
+        file: Arquivo aberto, em texto ou binário conforme o modo
+    """
+    formato = formato or formato_compressao(caminho)
+    if formato is None:
+        return open(caminho, modo, encoding=encoding, newline=newline)
+
+    modo_binario = modo.replace('t', '').replace('b', '') + 'b'
+    nivel = _nivel or NIVEIS_PADRAO[formato]
+    gravacao = modo_binario[0] != 'r'
+    # Importados aqui: a maioria das execuções não usa compressão
+    if formato == 'gzip':
+        import gzip
+        # mtime=0: o mesmo conteúdo gera sempre o mesmo arquivo (e o mesmo hash no manifesto)
+        binario = gzip.GzipFile(caminho, modo_binario, compresslevel=nivel, mtime=0)
+    elif formato == 'bz2':
+        import bz2
+        binario = bz2.BZ2File(caminho, modo_binario, compresslevel=nivel)
+    else:
+        import lzma
+        binario = lzma.LZMAFile(caminho, modo_binario, preset=nivel if gravacao else None)
+
+    if 'b' in modo:
+        return binario
+    return io.TextIOWrapper(binario, encoding=encoding, newline=newline)
+
+def bytes_gravados(arquivo):
+    """
+    Retorna quantos bytes (antes da compressão) já foram gravados em um arquivo aberto por
+    abrir_arquivo em modo texto.
+
+    Os arquivos bz2 e xz não permitem tell() no modo texto; a posição é lida do arquivo
+    binário, depois de esvaziado o buffer de texto.
+    """
+    arquivo.flush()
+    return arquivo.buffer.tell()
+
+def expandir_padrao(padrao):
+    """
+    Lista os arquivos de um padrão glob, incluindo as versões comprimidas.
+
+    Por exemplo, '*.csv' encontra também 'a.csv.gz', 'b.csv.bz2' e 'c.csv.xz'.
+
+    Args:
+        padrao (str): Padrão glob (ex: 'arq csv/*.csv')
+
+    Returns:
+        list: Caminhos encontrados, sem repetições e sem ordem definida
+    """
+    arquivos = set(glob.glob(padrao))
+    if not formato_compressao(padrao):
+        for extensao in EXTENSOES:
+            arquivos.update(glob.glob(padrao + extensao))
+    return list(arquivos)
+
+def _nivel_argumento(texto):
+    """Converte o argumento --nivel-compressao, validando a faixa"""
+    import argparse
+    try:
+        nivel = int(texto)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"nível inválido: '{texto}'")
+    if not NIVEL_MINIMO <= nivel <= NIVEL_MAXIMO:
+        raise argparse.ArgumentTypeError(f"o nível deve ir de {NIVEL_MINIMO} a {NIVEL_MAXIMO}")
+    return nivel
+
+def adicionar_argumentos(parser):
+    """Adiciona a um parser de linha de comando a opção --nivel-compressao"""
+    parser.add_argument('--nivel-compressao', type=_nivel_argumento, metavar='N',
+                        help="Nível de compressão das saídas .gz, .bz2 e .xz, de 1 (mais rápido) a 9 "
+                             "(menor arquivo); padrão: 6 para gzip e xz, 9 para bz2")
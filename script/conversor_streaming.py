@@ -0,0 +1,298 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Motor de conversão XLS/XLSX para CSV em streaming, sem montar um DataFrame do pandas.
+
+As linhas são lidas diretamente da planilha (openpyxl em modo somente leitura para .xlsx,
+xlrd com carregamento sob demanda para .xls) e gravadas no CSV à medida que são lidas.
+Para .xlsx o consumo de memória é constante; para .xls o xlrd carrega apenas a planilha
+selecionada, nunca o arquivo inteiro como DataFrame.
+
+A saída reproduz a do caminho pandas (pd.read_excel + df.to_csv) para planilhas cujas
+colunas contenham texto, como os relatórios de repasse. Em colunas puramente numéricas
+com células vazias, o pandas converte a coluna para float e grava inteiros como '154.0',
+o que não é possível reproduzir sem ler a planilha inteira antes de gravar.
+"""
+
+import os
+import math
+import contextlib
+import datetime
+from dialetos import DIALETO_PADRAO, eh_padrao, formatar_valor, abrir_saida, criar_escritor
+from compressao import bytes_gravados
+
+MOTOR_PANDAS = 'pandas'
+MOTOR_STREAMING = 'streaming'
+MOTORES = (MOTOR_PANDAS, MOTOR_STREAMING)
+
+# Textos que o pandas interpreta como valor ausente ao ler planilhas (na_values padrão)
+VALORES_AUSENTES = {
+    '', '#N/A', '#N/A N/A', '#NA', '-1.#IND', '-1.#QNAN', '-NaN', '-nan', '1.#IND',
+    '1.#QNAN', '<NA>', 'N/A', 'NA', 'NULL', 'NaN', 'None', 'n/a', 'nan', 'null',
+}
+
+# Intervalo, em linhas, entre os avisos de progresso e as verificações de cancelamento
+LINHAS_POR_AVISO = 1000
+
+class ConversaoCancelada(Exception):
+    """Sinaliza que a conversão foi cancelada; o arquivo de saída parcial já foi removido"""
+
+def _eh_xls(arquivo):
+    return os.path.splitext(arquivo)[1].lower() == '.xls'
+
+def abrir_livro(arquivo):
+    """
+    Abre a pasta de trabalho para leitura sob demanda.
+
+    Args:
+        arquivo (str): Caminho para o arquivo XLS/XLSX
+
+    Returns:
+        object: Livro do xlrd (.xls) ou do openpyxl (.xlsx)
+    """
+    if _eh_xls(arquivo):
+        import xlrd
+        return xlrd.open_workbook(arquivo, on_demand=True)
+
+    import openpyxl
+    return openpyxl.load_workbook(arquivo, read_only=True, data_only=True)
+
+def fechar_livro(livro):
+    """Libera os recursos de um livro aberto com abrir_livro"""
+    if hasattr(livro, 'release_resources'):
+        livro.release_resources()
+    else:
+        livro.close()
+
+def nomes_planilhas(livro):
+    """Retorna os nomes das planilhas de um livro aberto com abrir_livro"""
+    if hasattr(livro, 'sheet_names'):
+        return livro.sheet_names()
+    return livro.sheetnames
+
+def contar_linhas(livro, planilha=0):
+    """
+    Retorna o número de linhas de uma planilha (incluindo o cabeçalho), sem ler os dados.
+
+    Args:
+        livro (object): Livro aberto com abrir_livro
+        planilha (int|str, opcional): Índice ou nome da planilha (padrão: 0)
+
+    Returns:
+        int: Número de linhas, ou None se o arquivo não informar as dimensões da planilha
+    """
+    if hasattr(livro, 'sheet_by_index'):
+        folha = livro.sheet_by_index(planilha) if isinstance(planilha, int) else livro.sheet_by_name(planilha)
+        return folha.nrows
+    folha = livro.worksheets[planilha] if isinstance(planilha, int) else livro[planilha]
+    return folha.max_row
+
+def _converter_celula_xlrd(celula, datemode):
+    """Converte uma célula do xlrd para o mesmo valor Python produzido pelo pandas"""
+    import xlrd
+
+    tipo = celula.ctype
+    valor = celula.value
+    if tipo in (xlrd.XL_CELL_EMPTY, xlrd.XL_CELL_BLANK, xlrd.XL_CELL_ERROR):
+        return None
+    if tipo == xlrd.XL_CELL_BOOLEAN:
+        return bool(valor)
+    if tipo == xlrd.XL_CELL_DATE:
+        try:
+            data = xlrd.xldate.xldate_as_datetime(valor, datemode)
+        except (ValueError, OverflowError):
+            return valor
+        # Datas na época base do Excel representam apenas horários
+        if (datemode == 0 and data.date() == datetime.date(1899, 12, 31)) or \
+           (datemode == 1 and data.date() == datetime.date(1904, 1, 1)):
+            return data.time()
+        return data
+    if tipo == xlrd.XL_CELL_NUMBER:
+        return _converter_numero(valor)
+    return valor
+
+def _converter_numero(valor):
+    # Números inteiros são gravados sem casas decimais, como no pandas
+    if isinstance(valor, float) and valor.is_integer():
+        return int(valor)
+    return valor
+
+def iterar_linhas(livro, planilha=0):
+    """
+    Gera as linhas de uma planilha como listas de valores Python.
+
+    Args:
+        livro (object): Livro aberto com abrir_livro
+        planilha (int|str, opcional): Índice ou nome da planilha (padrão: 0)
+
+    Yields:
+        list: Valores das células da linha (None para células vazias)
+    """
+    if hasattr(livro, 'sheet_by_index'):
+        # xlrd: carrega apenas a planilha pedida e a descarta ao final
+        if isinstance(planilha, int):
+            folha = livro.sheet_by_index(planilha)
+        else:
+            folha = livro.sheet_by_name(planilha)
+        try:
+            for i in range(folha.nrows):
+                yield [_converter_celula_xlrd(celula, livro.datemode) for celula in folha.row(i)]
+        finally:
+            livro.unload_sheet(folha.name)
+    else:
+        # openpyxl em modo somente leitura: as linhas são lidas do XML sob demanda
+        folha = livro.worksheets[planilha] if isinstance(planilha, int) else livro[planilha]
+        for linha in folha.iter_rows(values_only=True):
+            yield [_converter_numero(valor) for valor in linha]
+
+def _normalizar_valor(valor):
+    """Aplica ao valor as mesmas regras de valores ausentes do pandas"""
+    if valor is None:
+        return None
+    if isinstance(valor, str):
+        return None if valor in VALORES_AUSENTES else valor
+    if isinstance(valor, float) and math.isnan(valor):
+        return None
+    return valor
+
+def _montar_cabecalho(valores):
+    """
+    Gera os nomes das colunas como o pandas: 'Unnamed: N' para vazios e sufixos para repetidos.
+    """
+    nomes = []
+    contagem = {}
+    for i, valor in enumerate(valores):
+        nome = f"Unnamed: {i}" if valor is None or valor == '' else str(valor)
+        if nome in contagem:
+            base = nome
+            while nome in contagem:
+                contagem[base] += 1
+                nome = f"{base}.{contagem[base]}"
+        contagem.setdefault(nome, 0)
+        nomes.append(nome)
+    return nomes
+
+def normalizar_linhas(linhas, nomes_colunas=True):
+    """
+    Aplica às linhas de uma planilha as mesmas regras de leitura do pandas.
+
+    A primeira linha gerada é o cabeçalho (nomes das colunas); as demais têm os valores
+    ausentes trocados por None e são completadas até a largura do cabeçalho. Linhas vazias
+    do final da planilha são descartadas.
+
+    Args:
+        linhas (iterable): Linhas da planilha (ver iterar_linhas)
+        nomes_colunas (bool, opcional): Se False, a primeira linha não é transformada em nomes
+            de colunas e passa pelas mesmas regras das demais (padrão: True)
+
+    Yields:
+        list: Cabeçalho e, em seguida, as linhas de dados
+    """
+    largura = None
+    vazias_pendentes = 0
+    for linha in linhas:
+        if largura is None and nomes_colunas:
+            cabecalho = _montar_cabecalho(linha)
+            largura = len(cabecalho)
+            yield cabecalho
+            continue
+        if largura is None:
+            largura = len(linha)
+
+        valores = [_normalizar_valor(valor) for valor in linha]
+
+        # Linhas vazias só são geradas se houver dados depois delas, pois o
+        # pandas descarta as linhas vazias do final da planilha
+        if all(valor is None for valor in valores):
+            vazias_pendentes += 1
+            continue
+        for _ in range(vazias_pendentes):
+            yield [None] * largura
+        vazias_pendentes = 0
+
+        if len(valores) < largura:
+            valores.extend([None] * (largura - len(valores)))
+        yield valores
+
+def escrever_linhas_csv(linhas, arquivo_saida, progresso=None, cancelar=None, total_linhas=None, dialeto=None):
+    """
+    Grava no CSV as linhas de uma planilha, usando a primeira linha como cabeçalho.
+
+    Com um dialeto diferente do padrão, cada célula é formatada (separadores, casas decimais,
+    datas) no momento em que a linha é gravada.
+
+    Args:
+        linhas (iterable): Linhas da planilha (ver iterar_linhas)
+        arquivo_saida (str): Caminho para o arquivo CSV de saída
+        progresso (callable, opcional): Chamada a cada LINHAS_POR_AVISO linhas e ao final, com
+            (linhas_lidas, total_linhas, bytes_gravados)
+        cancelar (threading.Event, opcional): Se sinalizado, a conversão é interrompida, o
+            arquivo parcial é removido e ConversaoCancelada é lançada
+        total_linhas (int, opcional): Total de linhas de dados, repassado ao progresso
+        dialeto (Dialeto, opcional): Formato do CSV (padrão: o CSV gerado pelo pandas)
+
+    Returns:
+        int: Número de linhas de dados gravadas (sem contar o cabeçalho)
+    """
+    total = -1
+    try:
+        if eh_padrao(dialeto):
+            dialeto = DIALETO_PADRAO
+            registros = normalizar_linhas(linhas)
+        else:
+            registros = ([formatar_valor(valor, dialeto) for valor in valores]
+                         for valores in normalizar_linhas(linhas, dialeto.nomes_colunas))
+            if not dialeto.nomes_colunas:
+                # Sem linha de nomes de colunas, a primeira linha também é de dados
+                total = 0
+        with abrir_saida(arquivo_saida, dialeto) as f:
+            escritor = criar_escritor(f, dialeto)
+            for lidas, valores in enumerate(registros):
+                escritor.writerow(valores)
+                total += 1
+                if lidas and lidas % LINHAS_POR_AVISO == 0:
+                    if cancelar is not None and cancelar.is_set():
+                        raise ConversaoCancelada()
+                    if progresso is not None:
+                        progresso(lidas, total_linhas, bytes_gravados(f))
+            if progresso is not None:
+                progresso(max(total, 0), max(total, 0), bytes_gravados(f))
+    except BaseException:
+        # Cancelada ou com erro: não deixa um CSV incompleto para trás (o erro pode ter
+        # ocorrido antes de o arquivo ser criado, ex: diretório de saída inexistente)
+        with contextlib.suppress(FileNotFoundError):
+            os.remove(arquivo_saida)
+        raise
+
+    return max(total, 0)
+
+def converter_planilha_streaming(arquivo_entrada, arquivo_saida, planilha=0, livro=None, progresso=None, cancelar=None, dialeto=None):
+    """
+    Converte uma planilha para CSV em streaming, linha a linha.
+
+    Args:
+        arquivo_entrada (str): Caminho para o arquivo XLS/XLSX de entrada
+        arquivo_saida (str): Caminho para o arquivo CSV de saída
+        planilha (int|str, opcional): Índice ou nome da planilha (padrão: 0)
+        livro (object, opcional): Livro já aberto com abrir_livro, para converter várias
+            planilhas abrindo o arquivo uma única vez
+        progresso (callable, opcional): Ver escrever_linhas_csv
+        cancelar (threading.Event, opcional): Ver escrever_linhas_csv
+        dialeto (Dialeto, opcional): Formato do CSV (padrão: o CSV gerado pelo pandas)
+
+    Returns:
+        int: Número de linhas de dados gravadas
+    """
+    livro_proprio = livro is None
+    if livro_proprio:
+        livro = abrir_livro(arquivo_entrada)
+    try:
+        total_linhas = None
+        if progresso is not None:
+            total_linhas = contar_linhas(livro, planilha)
+            total_linhas = total_linhas - 1 if total_linhas else None
+        return escrever_linhas_csv(iterar_linhas(livro, planilha), arquivo_saida, progresso, cancelar, total_linhas, dialeto)
+    finally:
+        if livro_proprio:
+            fechar_livro(livro)
@@ -8,16 +8,37 @@ Este script fornece uma interface gráfica amigável para converter arquivos Exc
 
 import os
 import sys
-import pandas as pd
+import time
 import PySimpleGUI as sg
 import threading
 import traceback
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+from leitor_excel import (listar_nomes_planilhas, converter_planilha, converter_arquivo, exportar_todas_planilhas, ler_previa,
+                          previa_em_cache, TODAS_PLANILHAS, PADRAO_NOME_PLANILHAS)
+from conversor_streaming import MOTORES, MOTOR_PANDAS, ConversaoCancelada
+from dialetos import DIALETOS
 
 # Configuração de tema e aparência
 sg.theme('LightBlue2')
 FONT = ('Arial', 11)
 FONT_BOLD = ('Arial', 11, 'bold')
 
+# Intervalo mínimo (em segundos) entre duas atualizações de progresso enviadas à janela
+INTERVALO_PROGRESSO = 0.2
+
+# Situações dos itens da fila de conversão
+STATUS_NA_FILA = 'Na fila'
+STATUS_CONVERTENDO = 'Convertendo'
+STATUS_CONCLUIDO = 'Concluído'
+STATUS_CANCELADO = 'Cancelado'
+STATUS_ERRO = 'Erro'
+
+# Largura máxima (em caracteres) de cada coluna na prévia da planilha
+LARGURA_COLUNA_PREVIA = 18
+
+COLUNAS_FILA = ['Arquivo', 'Planilha', 'Situação', 'Linhas', 'Tempo (s)', 'Linhas/s']
+
 def listar_planilhas(arquivo_excel):
     """
     Lista todas as planilhas disponíveis em um arquivo Excel.
@@ -29,43 +50,126 @@ def listar_planilhas(arquivo_excel):
         list: Lista de nomes das planilhas
     """
     try:
-        xl = pd.ExcelFile(arquivo_excel)
-        return xl.sheet_names
+        return listar_nomes_planilhas(arquivo_excel)
     except Exception as e:
         sg.popup_error(f"Erro ao listar planilhas: {str(e)}")
         return []
 
-def converter_xls_para_csv(arquivo_entrada, arquivo_saida, nome_planilha, janela):
+def ler_previa_em_segundo_plano(janela, arquivo, planilha):
+    """
+    Lê a prévia de uma planilha (executada em uma thread) e a envia no evento '-PREVIA_LIDA-'.
+
+    O valor do evento é a tupla (arquivo, planilha, previa, erro).
+    """
+    try:
+        janela.write_event_value('-PREVIA_LIDA-', (arquivo, planilha, ler_previa(arquivo, planilha), None))
+    except Exception as e:
+        janela.write_event_value('-PREVIA_LIDA-', (arquivo, planilha, None, str(e)))
+
+def formatar_previa(colunas, linhas, largura=LARGURA_COLUNA_PREVIA):
+    """
+    Monta o texto da prévia: as colunas detectadas e as primeiras linhas, alinhadas.
+
+    Args:
+        colunas (list): Nomes das colunas
+        linhas (list): Primeiras linhas de dados
+        largura (int, opcional): Largura máxima de cada coluna
+
+    Returns:
+        str: Texto da prévia
+    """
+    def celula(valor):
+        texto = '' if valor is None else str(valor).replace('\n', ' ')
+        return texto if len(texto) <= largura else texto[:largura - 1] + '…'
+
+    tabela = [[celula(valor) for valor in linha] for linha in [colunas] + linhas]
+    larguras = [max(len(linha[i]) for linha in tabela if i < len(linha)) for i in range(len(colunas))]
+    texto = [f"Colunas detectadas: {len(colunas)}"]
+    for linha in tabela:
+        texto.append(' | '.join(valor.ljust(larguras[i]) for i, valor in enumerate(linha)).rstrip())
+    return '\n'.join(texto)
+
+def criar_aviso_progresso(janela, unidade='linhas', intervalo=INTERVALO_PROGRESSO):
+    """
+    Cria a função de progresso passada à conversão, que envia eventos '-PROGRESSO-' à janela.
+
+    Os avisos são limitados a um a cada `intervalo` segundos (o último sempre é enviado),
+    para não sobrecarregar o loop de eventos. O valor do evento é a tupla
+    (feitas, total, bytes_gravados, segundos_restantes, unidade).
+
+    Args:
+        janela (sg.Window): Janela que recebe os eventos
+        unidade (str, opcional): Unidade do progresso ('linhas' ou 'planilhas')
+        intervalo (float, opcional): Intervalo mínimo entre os eventos, em segundos
+
+    Returns:
+        callable: Função (feitas, total, bytes_gravados)
+    """
+    inicio = time.monotonic()
+    ultimo_aviso = [0.0]
+
+    def avisar(feitas, total, bytes_gravados):
+        agora = time.monotonic()
+        if feitas != total and agora - ultimo_aviso[0] < intervalo:
+            return
+        ultimo_aviso[0] = agora
+
+        restante = None
+        if total and feitas:
+            restante = (agora - inicio) * (total - feitas) / feitas
+        janela.write_event_value('-PROGRESSO-', (feitas, total, bytes_gravados, restante, unidade))
+
+    return avisar
+
+def converter_xls_para_csv(arquivo_entrada, arquivo_saida, nome_planilha, janela, todas_planilhas=False, padrao_nome=PADRAO_NOME_PLANILHAS, paralelo=False, motor=MOTOR_PANDAS, cancelar=None, dialeto=None):
     """
     Converte um arquivo XLS/XLSX para CSV.
     
     Args:
         arquivo_entrada (str): Caminho para o arquivo XLS/XLSX de entrada
         arquivo_saida (str): Caminho para o arquivo CSV de saída
+            (ao converter todas as planilhas, os CSVs são gravados no diretório dele)
         nome_planilha (str): Nome da planilha a ser convertida
         janela (sg.Window): Janela para atualização de progresso
+        todas_planilhas (bool, opcional): Gera um CSV por planilha, lendo o arquivo uma única vez
+        padrao_nome (str, opcional): Padrão do nome dos CSVs ao converter todas as planilhas
+        paralelo (bool, opcional): Lê as planilhas em paralelo ao converter todas as planilhas
+        motor (str, opcional): 'pandas' (padrão) ou 'streaming', que grava o CSV linha a linha
+        cancelar (threading.Event, opcional): Sinalizado pela janela para interromper a conversão;
+            o arquivo parcial é removido e o evento '-CANCELADO-' é enviado
+        dialeto (Dialeto, opcional): Formato do CSV (padrão: o CSV gerado pelo pandas)
     
     Returns:
         bool: True se a conversão foi bem-sucedida, False caso contrário
     """
     try:
         # Atualiza a interface
-        janela.write_event_value('-PROGRESSO-', 'Lendo o arquivo Excel...')
+        janela.write_event_value('-MENSAGEM-', 'Lendo o arquivo Excel...')
         
-        # Lê o arquivo XLS/XLSX
-        df = pd.read_excel(arquivo_entrada, sheet_name=nome_planilha)
+        if todas_planilhas:
+            # Converte todas as planilhas no diretório do arquivo de saída
+            janela.write_event_value('-MENSAGEM-', 'Convertendo todas as planilhas para CSV...')
+            saidas = exportar_todas_planilhas(arquivo_entrada, padrao_nome, os.path.dirname(arquivo_saida), paralelo, motor=motor,
+                                              progresso=criar_aviso_progresso(janela, 'planilhas'), cancelar=cancelar,
+                                              dialeto=dialeto)
+            janela.write_event_value('-MENSAGEM-', f'Conversão concluída com sucesso! {len(saidas)} planilha(s) convertida(s).')
+            janela.write_event_value('-CONCLUIDO-', True)
+            return True
         
-        # Atualiza a interface
-        janela.write_event_value('-PROGRESSO-', 'Convertendo para CSV...')
-        
-        # Salva como CSV
-        df.to_csv(arquivo_saida, index=False, encoding='utf-8')
+        # Grava o CSV em blocos de linhas, avisando o progresso e verificando o cancelamento
+        janela.write_event_value('-MENSAGEM-', 'Convertendo para CSV...')
+        converter_planilha(arquivo_entrada, arquivo_saida, nome_planilha, motor,
+                           progresso=criar_aviso_progresso(janela), cancelar=cancelar, dialeto=dialeto)
         
         # Atualiza a interface
-        janela.write_event_value('-PROGRESSO-', f'Conversão concluída com sucesso!')
+        janela.write_event_value('-MENSAGEM-', f'Conversão concluída com sucesso!')
         janela.write_event_value('-CONCLUIDO-', True)
         return True
     
+    except ConversaoCancelada:
+        janela.write_event_value('-CANCELADO-', 'Conversão cancelada; o arquivo parcial foi removido.')
+        return False
+    
     except Exception as e:
         # Atualiza a interface com o erro
         erro = f"Erro durante a conversão: {str(e)}"
@@ -73,17 +177,130 @@ def converter_xls_para_csv(arquivo_entrada, arquivo_saida, nome_planilha, janela
         traceback.print_exc()
         return False
 
-def criar_layout_principal():
+def listar_excel_pasta(pasta):
+    """Lista os arquivos Excel (.xls/.xlsx) de uma pasta, em ordem de nome"""
+    return sorted(
+        os.path.join(pasta, nome) for nome in os.listdir(pasta)
+        if os.path.splitext(nome)[1].lower() in ('.xls', '.xlsx') and not nome.startswith('~$')
+    )
+
+def interpretar_planilha(texto):
+    """Converte o texto do campo de planilha da fila em índice, nome ou TODAS_PLANILHAS"""
+    texto = texto.strip()
+    if not texto:
+        return 0
+    if texto.isdigit():
+        return int(texto)
+    return texto
+
+def caminho_saida_fila(arquivo_entrada, destino=None):
+    """Define o CSV de um item da fila (mesmo nome do arquivo Excel, extensão .csv)"""
+    nome_base = os.path.splitext(os.path.basename(arquivo_entrada))[0]
+    return os.path.join(destino or os.path.dirname(arquivo_entrada), f"{nome_base}.csv")
+
+def executar_fila(itens, janela, processos, motor=MOTOR_PANDAS, destino=None, cancelar=None, dialeto=None):
     """
-    Cria o layout principal da interface gráfica.
+    Converte os itens da fila em um pool de processos, avisando a janela a cada mudança.
+
+    No máximo `processos` itens são enviados ao pool ao mesmo tempo; ao cancelar, os itens
+    ainda não enviados são marcados como cancelados e os que estão em conversão terminam.
+    Envia à janela os eventos '-FILA_ITEM-' (indice, situacao, linhas, segundos) e, ao final,
+    '-FILA_CONCLUIDA-' (concluidos, falhas, cancelados, linhas, segundos, erro), enviado
+    mesmo que a fila seja interrompida por um erro (erro é None quando não há).
+
+    Args:
+        itens (list): Tuplas (indice, arquivo_entrada, planilha)
+        janela (sg.Window): Janela que recebe os eventos
+        processos (int): Número máximo de conversões simultâneas
+        motor (str, opcional): 'pandas' (padrão) ou 'streaming'
+        destino (str, opcional): Pasta dos CSVs (padrão: a pasta de cada arquivo)
+        cancelar (threading.Event, opcional): Sinaliza o cancelamento da fila
+        dialeto (Dialeto, opcional): Formato dos CSVs (padrão: o CSV gerado pelo pandas)
+    """
+    inicio = time.monotonic()
+    pendentes = deque(itens)
+    em_andamento = {}
+    concluidos = falhas = cancelados = total_linhas = 0
+
+    erro = None
+    try:
+        with ProcessPoolExecutor(max_workers=processos) as executor:
+            while pendentes or em_andamento:
+                while pendentes and len(em_andamento) < processos and not (cancelar and cancelar.is_set()):
+                    indice, arquivo, planilha = pendentes[0]
+                    futuro = executor.submit(converter_arquivo, arquivo, caminho_saida_fila(arquivo, destino), planilha, motor,
+                                             dialeto=dialeto)
+                    # Retirado da fila só depois de enviado: se o envio falhar, o item recebe o erro
+                    pendentes.popleft()
+                    em_andamento[futuro] = (indice, time.monotonic())
+                    janela.write_event_value('-FILA_ITEM-', (indice, STATUS_CONVERTENDO, None, None))
+
+                if cancelar is not None and cancelar.is_set():
+                    for indice, _, _ in pendentes:
+                        janela.write_event_value('-FILA_ITEM-', (indice, STATUS_CANCELADO, None, None))
+                    cancelados += len(pendentes)
+                    pendentes.clear()
+
+                if not em_andamento:
+                    break
+
+                # O tempo limite permite atender ao cancelamento enquanto as conversões andam
+                feitos, _ = wait(em_andamento, timeout=0.5, return_when=FIRST_COMPLETED)
+                for futuro in feitos:
+                    indice, inicio_item = em_andamento.pop(futuro)
+                    duracao = time.monotonic() - inicio_item
+                    try:
+                        linhas = futuro.result()
+                    except Exception as e:
+                        falhas += 1
+                        janela.write_event_value('-FILA_ITEM-', (indice, f"{STATUS_ERRO}: {str(e)}", None, duracao))
+                        continue
+                    concluidos += 1
+                    total_linhas += linhas
+                    janela.write_event_value('-FILA_ITEM-', (indice, STATUS_CONCLUIDO, linhas, duracao))
+    except Exception as e:
+        # Ex: BrokenProcessPool ao enviar um item depois que um processo do pool morreu; os
+        # itens que ainda não terminaram são marcados com o erro
+        erro = str(e) or type(e).__name__
+        for indice, _ in em_andamento.values():
+            janela.write_event_value('-FILA_ITEM-', (indice, f"{STATUS_ERRO}: {erro}", None, None))
+        for indice, _, _ in pendentes:
+            janela.write_event_value('-FILA_ITEM-', (indice, f"{STATUS_ERRO}: {erro}", None, None))
+        falhas += len(em_andamento) + len(pendentes)
+    finally:
+        # Sempre enviado, para a janela não ficar com os botões da fila desabilitados
+        janela.write_event_value('-FILA_CONCLUIDA-', (concluidos, falhas, cancelados, total_linhas,
+                                                      time.monotonic() - inicio, erro))
+
+def linhas_tabela_fila(fila):
+    """Monta as linhas da tabela da fila a partir dos itens"""
+    tabela = []
+    for item in fila:
+        planilha = 'Todas' if item['planilha'] == TODAS_PLANILHAS else item['planilha']
+        linhas = item['linhas'] if item['linhas'] is not None else ''
+        duracao = f"{item['duracao']:.1f}" if item['duracao'] is not None else ''
+        vazao = ''
+        if item['linhas'] is not None and item['duracao']:
+            vazao = f"{item['linhas'] / item['duracao']:.0f}"
+        tabela.append([os.path.basename(item['arquivo']), planilha, item['status'], linhas, duracao, vazao])
+    return tabela
+
+def formatar_progresso(feitas, total, bytes_gravados, restante, unidade):
+    """Monta o texto de status de um evento '-PROGRESSO-'"""
+    texto = f"{feitas} de {total} {unidade}" if total else f"{feitas} {unidade}"
+    texto += f" - {bytes_gravados / (1024 * 1024):.1f} MB gravados"
+    if restante is not None and feitas != total:
+        texto += f" - cerca de {int(restante) + 1} s restantes"
+    return texto
+
+def criar_layout_arquivo():
+    """
+    Cria o layout da aba de conversão de um único arquivo.
     
     Returns:
         list: Layout para PySimpleGUI
     """
     layout = [
-        [sg.Text('Conversor de Excel para CSV', font=('Arial', 16, 'bold'), justification='center', expand_x=True)],
-        [sg.HorizontalSeparator()],
-        
         # Seção de arquivo de entrada
         [sg.Frame('Arquivo Excel de Entrada', [
             [sg.Input(key='-ARQUIVO_ENTRADA-', size=(50, 1), readonly=True),
@@ -93,14 +310,30 @@ def criar_layout_principal():
         # Seção de seleção de planilha
         [sg.Frame('Planilha', [
             [sg.Text('Selecione a planilha:')],
-            [sg.Combo(values=[], key='-PLANILHA-', size=(48, 1), readonly=True, disabled=True),
-             sg.Button('Carregar Planilhas', key='-CARREGAR_PLANILHAS-', disabled=True)]
+            [sg.Combo(values=[], key='-PLANILHA-', size=(48, 1), readonly=True, disabled=True, enable_events=True),
+             sg.Button('Carregar Planilhas', key='-CARREGAR_PLANILHAS-', disabled=True)],
+            [sg.Checkbox('Converter todas as planilhas', key='-TODAS_PLANILHAS-', enable_events=True),
+             sg.Checkbox('Ler em paralelo', key='-PARALELO-', disabled=True)],
+            [sg.Text('Padrão de nome:'),
+             sg.Input(PADRAO_NOME_PLANILHAS, key='-PADRAO_NOME-', size=(36, 1), disabled=True)]
+        ])],
+        
+        # Prévia das primeiras linhas da planilha selecionada
+        [sg.Frame('Prévia da Planilha', [
+            [sg.Multiline('', key='-PREVIA-', size=(70, 8), disabled=True, horizontal_scroll=True,
+                          font=('Courier New', 9))]
         ])],
         
         # Seção de arquivo de saída
         [sg.Frame('Arquivo CSV de Saída', [
             [sg.Input(key='-ARQUIVO_SAIDA-', size=(50, 1), readonly=True),
-             sg.SaveAs('Selecionar Destino', file_types=(("Arquivo CSV", "*.csv"),), key='-SAVE_AS-', disabled=True)]
+             sg.SaveAs('Selecionar Destino', file_types=(("Arquivo CSV", "*.csv"),), key='-SAVE_AS-', disabled=True)],
+            [sg.Text('Motor de conversão:'),
+             sg.Combo(values=list(MOTORES), default_value=MOTOR_PANDAS, key='-MOTOR-', size=(12, 1), readonly=True),
+             sg.Text('(streaming: memória constante em planilhas grandes)')],
+            [sg.Text('Formato do CSV:'),
+             sg.Combo(values=list(DIALETOS), default_value='padrao', key='-DIALETO-', size=(12, 1), readonly=True),
+             sg.Text("(sistema: ';', vírgula decimal, como os relatórios do sistema)")]
         ])],
         
         # Barra de progresso e status
@@ -115,6 +348,65 @@ def criar_layout_principal():
     
     return layout
 
+def criar_layout_fila():
+    """
+    Cria o layout da aba da fila de conversão de vários arquivos.
+    
+    Returns:
+        list: Layout para PySimpleGUI
+    """
+    processos = os.cpu_count() or 1
+    layout = [
+        # Arquivos da fila, cada um com a sua planilha
+        [sg.Frame('Arquivos', [
+            [sg.Input(key='-FILA_ARQUIVOS-', visible=False, enable_events=True),
+             sg.FilesBrowse('Adicionar Arquivos', target='-FILA_ARQUIVOS-', file_types=(("Arquivos Excel", "*.xls;*.xlsx"),)),
+             sg.Input(key='-FILA_PASTA-', visible=False, enable_events=True),
+             sg.FolderBrowse('Adicionar Pasta', target='-FILA_PASTA-'),
+             sg.Button('Remover Selecionados', key='-FILA_REMOVER-'),
+             sg.Button('Limpar', key='-FILA_LIMPAR-')],
+            [sg.Table(values=[], headings=COLUNAS_FILA, key='-FILA_TABELA-', num_rows=10, expand_x=True,
+                      auto_size_columns=False, col_widths=[24, 10, 14, 8, 8, 8],
+                      select_mode=sg.TABLE_SELECT_MODE_EXTENDED)],
+            [sg.Text('Planilha:'), sg.Input('0', key='-FILA_PLANILHA-', size=(14, 1)),
+             sg.Text(f"(índice, nome ou {TODAS_PLANILHAS} para todas)"),
+             sg.Button('Aplicar aos Selecionados', key='-FILA_APLICAR-')]
+        ])],
+        
+        # Destino dos CSVs e conversões simultâneas
+        [sg.Frame('Destino', [
+            [sg.Input(key='-FILA_DESTINO-', size=(40, 1)), sg.FolderBrowse('Selecionar Pasta'),
+             sg.Text('(vazio: pasta de cada arquivo)')],
+            [sg.Text('Conversões simultâneas:'),
+             sg.Spin(list(range(1, processos * 2 + 1)), initial_value=processos, key='-FILA_PROCESSOS-', size=(4, 1))]
+        ])],
+        
+        # Progresso da fila
+        [sg.Text('Status:', font=FONT_BOLD), sg.Text('Fila vazia.', key='-FILA_STATUS-', size=(55, 1))],
+        [sg.ProgressBar(100, orientation='h', size=(44, 20), key='-FILA_BARRA-')],
+        
+        [sg.Button('Iniciar Fila', key='-FILA_INICIAR-'),
+         sg.Button('Cancelar Fila', key='-FILA_CANCELAR-', disabled=True)]
+    ]
+    
+    return layout
+
+def criar_layout_principal():
+    """
+    Cria o layout principal da interface gráfica.
+    
+    Returns:
+        list: Layout para PySimpleGUI
+    """
+    return [
+        [sg.Text('Conversor de Excel para CSV', font=('Arial', 16, 'bold'), justification='center', expand_x=True)],
+        [sg.HorizontalSeparator()],
+        [sg.TabGroup([[
+            sg.Tab('Arquivo', criar_layout_arquivo()),
+            sg.Tab('Fila de Conversão', criar_layout_fila()),
+        ]])]
+    ]
+
 def main():
     """
     Função principal que cria e gerencia a interface gráfica.
@@ -125,17 +417,60 @@ def main():
     # Variáveis de controle
     thread_conversao = None
     conversao_em_andamento = False
+    cancelar = threading.Event()
+    
+    # Fila de conversão: itens com arquivo, planilha, situação, linhas e duração
+    fila = []
+    thread_fila = None
+    fila_em_andamento = False
+    cancelar_fila = threading.Event()
+    
+    def adicionar_na_fila(arquivos, planilha):
+        existentes = {item['arquivo'] for item in fila}
+        for arquivo in arquivos:
+            if arquivo not in existentes:
+                fila.append({'arquivo': arquivo, 'planilha': planilha, 'status': STATUS_NA_FILA, 'linhas': None, 'duracao': None})
+        janela['-FILA_TABELA-'].update(values=linhas_tabela_fila(fila))
+        janela['-FILA_STATUS-'].update(f"{len(fila)} arquivo(s) na fila.")
+    
+    def mostrar_previa(arquivo, planilha):
+        # Prévias já lidas aparecem na hora; as demais são lidas em segundo plano
+        previa = previa_em_cache(arquivo, planilha)
+        if previa is not None:
+            janela['-PREVIA-'].update(formatar_previa(*previa))
+            return
+        janela['-PREVIA-'].update('Carregando prévia...')
+        threading.Thread(target=ler_previa_em_segundo_plano, args=(janela, arquivo, planilha), daemon=True).start()
+    
+    def habilitar_fila(habilitado):
+        for chave in ('-FILA_INICIAR-', '-FILA_REMOVER-', '-FILA_LIMPAR-', '-FILA_APLICAR-'):
+            janela[chave].update(disabled=not habilitado)
+        janela['-FILA_CANCELAR-'].update(disabled=habilitado)
     
     # Loop de eventos
     while True:
         evento, valores = janela.read(timeout=100)
         
-        # Verifica se a janela foi fechada
-        if evento == sg.WIN_CLOSED or evento == '-CANCELAR-':
+        # Verifica se a janela foi fechada: interrompe a conversão e espera a remoção do arquivo parcial
+        if evento == sg.WIN_CLOSED:
             if conversao_em_andamento:
-                sg.popup_yes_no('Uma conversão está em andamento. Deseja realmente sair?', title='Confirmar Saída')
+                cancelar.set()
+                thread_conversao.join(timeout=10)
+            if fila_em_andamento:
+                cancelar_fila.set()
             break
         
+        # O botão Cancelar interrompe a conversão em andamento ou, sem conversão, fecha o programa
+        if evento == '-CANCELAR-':
+            if not conversao_em_andamento:
+                if fila_em_andamento:
+                    cancelar_fila.set()
+                break
+            if sg.popup_yes_no('Deseja cancelar a conversão em andamento?', title='Cancelar Conversão') == 'Yes':
+                cancelar.set()
+                janela['-STATUS-'].update("Cancelando a conversão...")
+            continue
+        
         # Quando um arquivo de entrada é selecionado
         if evento == '-BROWSE-' and valores['-ARQUIVO_ENTRADA-']:
             # Habilita o botão de carregar planilhas
@@ -163,6 +498,9 @@ def main():
                     # Habilita o botão de converter
                     janela['-CONVERTER-'].update(disabled=False)
                     
+                    # Mostra a prévia da primeira planilha
+                    mostrar_previa(valores['-ARQUIVO_ENTRADA-'], planilhas[0])
+                    
                     # Atualiza o status
                     janela['-STATUS-'].update(f"Planilhas carregadas: {len(planilhas)} encontradas")
                 else:
@@ -170,6 +508,22 @@ def main():
             except Exception as e:
                 sg.popup_error(f"Erro ao carregar planilhas: {str(e)}")
         
+        # Quando outra planilha é selecionada, mostra a prévia dela
+        if evento == '-PLANILHA-' and valores['-ARQUIVO_ENTRADA-'] and valores['-PLANILHA-']:
+            mostrar_previa(valores['-ARQUIVO_ENTRADA-'], valores['-PLANILHA-'])
+        
+        # Prévia lida em segundo plano (ignorada se a seleção mudou enquanto era lida)
+        if evento == '-PREVIA_LIDA-':
+            arquivo, planilha, previa, erro = valores[evento]
+            if arquivo == valores['-ARQUIVO_ENTRADA-'] and planilha == valores['-PLANILHA-']:
+                janela['-PREVIA-'].update(formatar_previa(*previa) if previa else f"Não foi possível ler a prévia: {erro}")
+        
+        # Quando a opção de converter todas as planilhas é alterada
+        if evento == '-TODAS_PLANILHAS-':
+            todas = valores['-TODAS_PLANILHAS-']
+            janela['-PARALELO-'].update(disabled=not todas)
+            janela['-PADRAO_NOME-'].update(disabled=not todas)
+        
         # Quando o botão de converter é clicado
         if evento == '-CONVERTER-' and not conversao_em_andamento:
             # Verifica se todos os campos necessários estão preenchidos
@@ -185,18 +539,24 @@ def main():
                 sg.popup_error("Defina o arquivo CSV de saída.")
                 continue
             
+            todas_planilhas = valores['-TODAS_PLANILHAS-']
+            if todas_planilhas and not valores['-PADRAO_NOME-']:
+                sg.popup_error("Defina o padrão de nome dos arquivos CSV.")
+                continue
+            
             # Confirma a conversão
             if sg.popup_yes_no(
                 f"Confirma a conversão?\n\n"
                 f"Arquivo de entrada: {os.path.basename(valores['-ARQUIVO_ENTRADA-'])}\n"
-                f"Planilha: {valores['-PLANILHA-']}\n"
+                f"Planilha: {'Todas' if todas_planilhas else valores['-PLANILHA-']}\n"
                 f"Arquivo de saída: {os.path.basename(valores['-ARQUIVO_SAIDA-'])}",
                 title="Confirmar Conversão"
             ) == "Yes":
                 # Inicia a conversão em uma thread separada
                 conversao_em_andamento = True
+                cancelar.clear()
                 janela['-STATUS-'].update("Iniciando conversão...")
-                janela['-PROGRESS_BAR-'].update(visible=True, current_count=10)
+                janela['-PROGRESS_BAR-'].update(visible=True, current_count=0)
                 janela['-CONVERTER-'].update(disabled=True)
                 janela['-CARREGAR_PLANILHAS-'].update(disabled=True)
                 janela['-BROWSE-'].update(disabled=True)
@@ -204,25 +564,39 @@ def main():
                 
                 thread_conversao = threading.Thread(
                     target=converter_xls_para_csv,
-                    args=(valores['-ARQUIVO_ENTRADA-'], valores['-ARQUIVO_SAIDA-'], valores['-PLANILHA-'], janela),
+                    args=(valores['-ARQUIVO_ENTRADA-'], valores['-ARQUIVO_SAIDA-'], valores['-PLANILHA-'], janela,
+                          todas_planilhas, valores['-PADRAO_NOME-'], valores['-PARALELO-'], valores['-MOTOR-'], cancelar,
+                          DIALETOS[valores['-DIALETO-']]),
                     daemon=True
                 )
                 thread_conversao.start()
         
-        # Atualização de progresso da conversão
-        if evento == '-PROGRESSO-':
+        # Mensagens de status da conversão
+        if evento == '-MENSAGEM-':
+            if not cancelar.is_set():
+                janela['-STATUS-'].update(valores[evento])
+        
+        # Atualização de progresso da conversão (linhas ou planilhas gravadas)
+        if evento == '-PROGRESSO-' and not cancelar.is_set():
+            feitas, total = valores[evento][0], valores[evento][1]
+            janela['-STATUS-'].update(formatar_progresso(*valores[evento]))
+            if total:
+                janela['-PROGRESS_BAR-'].update(current_count=int(feitas * 100 / total))
+        
+        # Quando a conversão é cancelada
+        if evento == '-CANCELADO-':
+            conversao_em_andamento = False
             janela['-STATUS-'].update(valores[evento])
-            # Atualiza a barra de progresso
-            if "Lendo" in valores[evento]:
-                janela['-PROGRESS_BAR-'].update(current_count=30)
-            elif "Convertendo" in valores[evento]:
-                janela['-PROGRESS_BAR-'].update(current_count=70)
-            elif "concluída" in valores[evento]:
-                janela['-PROGRESS_BAR-'].update(current_count=100)
+            janela['-PROGRESS_BAR-'].update(visible=False)
+            janela['-CONVERTER-'].update(disabled=False)
+            janela['-CARREGAR_PLANILHAS-'].update(disabled=False)
+            janela['-BROWSE-'].update(disabled=False)
+            janela['-SAVE_AS-'].update(disabled=False)
         
         # Quando a conversão é concluída
         if evento == '-CONCLUIDO-':
             conversao_em_andamento = False
+            janela['-PROGRESS_BAR-'].update(current_count=100)
             janela['-CONVERTER-'].update(disabled=False)
             janela['-CARREGAR_PLANILHAS-'].update(disabled=False)
             janela['-BROWSE-'].update(disabled=False)
@@ -249,6 +623,86 @@ def main():
             
             sg.popup_error(valores[evento])
         
+        # Arquivos ou pasta adicionados à fila (com a planilha informada no campo da fila)
+        if evento in ('-FILA_ARQUIVOS-', '-FILA_PASTA-') and valores[evento] and not fila_em_andamento:
+            if evento == '-FILA_ARQUIVOS-':
+                arquivos = valores[evento].split(';')
+            else:
+                arquivos = listar_excel_pasta(valores[evento])
+            adicionar_na_fila(arquivos, interpretar_planilha(valores['-FILA_PLANILHA-']))
+        
+        if evento == '-FILA_REMOVER-' and not fila_em_andamento:
+            for indice in sorted(valores['-FILA_TABELA-'], reverse=True):
+                del fila[indice]
+            janela['-FILA_TABELA-'].update(values=linhas_tabela_fila(fila))
+        
+        if evento == '-FILA_LIMPAR-' and not fila_em_andamento:
+            fila.clear()
+            janela['-FILA_TABELA-'].update(values=[])
+            janela['-FILA_STATUS-'].update('Fila vazia.')
+        
+        if evento == '-FILA_APLICAR-' and not fila_em_andamento:
+            planilha = interpretar_planilha(valores['-FILA_PLANILHA-'])
+            for indice in valores['-FILA_TABELA-']:
+                fila[indice]['planilha'] = planilha
+            janela['-FILA_TABELA-'].update(values=linhas_tabela_fila(fila), select_rows=valores['-FILA_TABELA-'])
+        
+        # Inicia a fila: converte os itens ainda não concluídos, sem diálogos por arquivo
+        if evento == '-FILA_INICIAR-' and not fila_em_andamento:
+            itens = [(i, item['arquivo'], item['planilha']) for i, item in enumerate(fila) if item['status'] != STATUS_CONCLUIDO]
+            if not itens:
+                sg.popup_error("Adicione arquivos à fila.")
+                continue
+            if valores['-FILA_DESTINO-']:
+                os.makedirs(valores['-FILA_DESTINO-'], exist_ok=True)
+            for indice, _, _ in itens:
+                fila[indice].update(status=STATUS_NA_FILA, linhas=None, duracao=None)
+            janela['-FILA_TABELA-'].update(values=linhas_tabela_fila(fila))
+            janela['-FILA_BARRA-'].update(current_count=0, max=len(itens))
+            janela['-FILA_STATUS-'].update(f"Convertendo {len(itens)} arquivo(s)...")
+            
+            fila_em_andamento = True
+            fila_total = len(itens)
+            fila_feitos = 0
+            fila_linhas = 0
+            fila_inicio = time.monotonic()
+            cancelar_fila.clear()
+            habilitar_fila(False)
+            thread_fila = threading.Thread(
+                target=executar_fila,
+                args=(itens, janela, int(valores['-FILA_PROCESSOS-']), valores['-MOTOR-'],
+                      valores['-FILA_DESTINO-'] or None, cancelar_fila, DIALETOS[valores['-DIALETO-']]),
+                daemon=True
+            )
+            thread_fila.start()
+        
+        if evento == '-FILA_CANCELAR-' and fila_em_andamento:
+            cancelar_fila.set()
+            janela['-FILA_STATUS-'].update("Cancelando: os arquivos em conversão serão concluídos...")
+        
+        # Mudança na situação de um item da fila
+        if evento == '-FILA_ITEM-':
+            indice, status, linhas, duracao = valores[evento]
+            fila[indice].update(status=status, linhas=linhas, duracao=duracao)
+            janela['-FILA_TABELA-'].update(values=linhas_tabela_fila(fila))
+            if status != STATUS_CONVERTENDO:
+                fila_feitos += 1
+                fila_linhas += linhas or 0
+                janela['-FILA_BARRA-'].update(current_count=fila_feitos)
+                if not cancelar_fila.is_set():
+                    vazao = fila_linhas / max(time.monotonic() - fila_inicio, 1e-6)
+                    janela['-FILA_STATUS-'].update(f"{fila_feitos} de {fila_total} arquivo(s) - {vazao:.0f} linhas/s")
+        
+        # Fim da fila
+        if evento == '-FILA_CONCLUIDA-':
+            concluidos, falhas, cancelados, linhas, duracao, erro = valores[evento]
+            fila_em_andamento = False
+            habilitar_fila(True)
+            situacao = f"interrompida por erro ({erro})" if erro else "concluída"
+            janela['-FILA_STATUS-'].update(
+                f"Fila {situacao} em {duracao:.1f} s: {concluidos} convertido(s), {falhas} falha(s), "
+                f"{cancelados} cancelado(s), {linhas} linhas")
+        
         # Quando o botão Sobre é clicado
         if evento == '-SOBRE-':
             sg.popup(
@@ -0,0 +1,164 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Dialetos de saída dos CSVs gerados pelos conversores.
+
+Um dialeto define o separador de campos, os separadores decimal e de milhar, as casas
+decimais dos números, a codificação (com ou sem BOM), as aspas e o formato das datas.
+O dialeto 'padrao' é o CSV gerado pelo pandas (vírgula, ponto decimal, UTF-8), gravado
+pelos conversores exatamente como antes. O dialeto 'sistema' é o formato dos relatórios
+exportados pelo sistema de origem, que o processar_csv_final_ajustado.py espera: ';',
+vírgula decimal ('1.024,27'), UTF-8 com BOM e as linhas do relatório gravadas como estão,
+sem a linha de nomes de colunas que o pandas montaria.
+
+Com um dialeto diferente do padrão, cada célula é formatada uma única vez, no momento em
+que a linha é gravada, sem uma segunda passagem de reformatação sobre o CSV.
+"""
+
+import os
+import csv
+import math
+import datetime
+from decimal import Decimal, ROUND_HALF_UP
+from collections import namedtuple
+from compressao import abrir_arquivo
+
+# nomes_colunas: grava a primeira linha como os nomes de colunas do pandas ('Unnamed: N'
+# nas células vazias); se False, a primeira linha é gravada como as demais
+Dialeto = namedtuple('Dialeto', 'delimitador decimal milhar casas_decimais codificacao aspas '
+                                'formato_data formato_data_hora terminador nomes_colunas')
+
+DIALETO_PADRAO = Dialeto(',', '.', '', None, 'utf-8', csv.QUOTE_MINIMAL,
+                         '%Y-%m-%d', '%Y-%m-%d %H:%M:%S', os.linesep, True)
+DIALETO_SISTEMA = Dialeto(';', ',', '.', 2, 'utf-8-sig', csv.QUOTE_MINIMAL,
+                          '%d/%m/%Y', '%d/%m/%Y %H:%M:%S', '\n', False)
+
+# Formato em que as células lidas das planilhas são passadas ao parser_relatorio: o do
+# sistema, com os números no menor texto que os representa (sem milhar nem casas fixas)
+DIALETO_CONSOLIDADO = DIALETO_SISTEMA._replace(milhar='', casas_decimais=None, codificacao='utf-8')
+
+DIALETOS = {
+    'padrao': DIALETO_PADRAO,
+    'sistema': DIALETO_SISTEMA,
+}
+
+ASPAS = {
+    'minimo': csv.QUOTE_MINIMAL,
+    'todos': csv.QUOTE_ALL,
+    'nenhum': csv.QUOTE_NONE,
+}
+
+def eh_padrao(dialeto):
+    """Indica se o dialeto é o CSV padrão do pandas (gravado pelo caminho original)"""
+    return dialeto is None or dialeto == DIALETO_PADRAO
+
+def montar_dialeto(nome='padrao', **alteracoes):
+    """
+    Monta um dialeto a partir de um dos dialetos pré-definidos.
+
+    Args:
+        nome (str, opcional): 'padrao' ou 'sistema' (padrão: 'padrao')
+        **alteracoes: Campos do Dialeto a alterar; valores None são ignorados
+
+    Returns:
+        Dialeto: Dialeto resultante
+    """
+    if nome not in DIALETOS:
+        raise ValueError(f"Dialeto inválido: {nome} (use {', '.join(DIALETOS)})")
+    alteracoes = {campo: valor for campo, valor in alteracoes.items() if valor is not None}
+    if isinstance(alteracoes.get('aspas'), str):
+        alteracoes['aspas'] = ASPAS[alteracoes['aspas']]
+    dialeto = DIALETOS[nome]._replace(**alteracoes)
+    if dialeto.decimal == dialeto.delimitador or (dialeto.milhar and dialeto.milhar in (dialeto.decimal, dialeto.delimitador)):
+        raise ValueError("Os separadores de campos, decimal e de milhar devem ser diferentes.")
+    return dialeto
+
+def parametros_dialeto(dialeto):
+    """Descrição do dialeto gravada no manifesto (None para o padrão, mantendo o cache existente)"""
+    return None if eh_padrao(dialeto) else dialeto._asdict()
+
+def formatar_numero(numero, dialeto):
+    """
+    Formata um número com os separadores e as casas decimais do dialeto.
+
+    Args:
+        numero (int|float|Decimal): Número a formatar
+        dialeto (Dialeto): Dialeto de saída
+
+    Returns:
+        str: Texto do número (ex: '1.024,27' no dialeto 'sistema')
+    """
+    if isinstance(numero, float):
+        # repr() gera o menor decimal que representa o float (ex: 166.2, e não 166.19999...)
+        numero = Decimal(repr(numero))
+    if dialeto.casas_decimais is not None and isinstance(numero, Decimal):
+        numero = numero.quantize(Decimal(1).scaleb(-dialeto.casas_decimais), rounding=ROUND_HALF_UP)
+    if isinstance(numero, int):
+        # Inteiros são códigos e quantidades: sem separador de milhar
+        return str(numero)
+    texto = format(numero, ',f' if dialeto.milhar else 'f')
+    return texto.replace(',', '\0').replace('.', dialeto.decimal).replace('\0', dialeto.milhar)
+
+def formatar_valor(valor, dialeto):
+    """
+    Converte o valor de uma célula para o texto gravado no CSV.
+
+    Args:
+        valor: Valor lido da planilha (None, texto, número, data ou hora)
+        dialeto (Dialeto): Dialeto de saída
+
+    Returns:
+        str: Texto da célula
+    """
+    if valor is None:
+        return ''
+    if isinstance(valor, bool):
+        return str(valor)
+    if isinstance(valor, float) and math.isnan(valor):
+        return ''
+    if isinstance(valor, (int, float, Decimal)):
+        return formatar_numero(valor, dialeto)
+    if isinstance(valor, datetime.datetime):
+        if valor.time() == datetime.time(0, 0):
+            return valor.strftime(dialeto.formato_data)
+        return valor.strftime(dialeto.formato_data_hora)
+    if isinstance(valor, datetime.date):
+        return valor.strftime(dialeto.formato_data)
+    return str(valor)
+
+def abrir_saida(arquivo_saida, dialeto):
+    """Abre o CSV de saída com a codificação do dialeto (comprimido se o nome terminar em .gz, .bz2 ou .xz)"""
+    return abrir_arquivo(arquivo_saida, 'w', encoding=dialeto.codificacao, newline='')
+
+def criar_escritor(arquivo, dialeto):
+    """
+    Cria o escritor de CSV do dialeto.
+
+    Returns:
+        csv.writer: Escritor que grava linhas já formatadas (ver formatar_valor)
+    """
+    return csv.writer(arquivo, delimiter=dialeto.delimitador, quoting=dialeto.aspas,
+                      lineterminator=dialeto.terminador,
+                      escapechar='\\' if dialeto.aspas == csv.QUOTE_NONE else None)
+
+def adicionar_argumentos(parser):
+    """Adiciona a um parser de linha de comando as opções do dialeto de saída"""
+    grupo = parser.add_argument_group('formato do CSV de saída')
+    grupo.add_argument('--dialeto', choices=list(DIALETOS), default='padrao',
+                       help="'padrao' (CSV do pandas) ou 'sistema' (';', vírgula decimal, UTF-8 com BOM, "
+                            "como os relatórios do sistema de origem)")
+    grupo.add_argument('--delimitador', help="Separador de campos")
+    grupo.add_argument('--decimal', help="Separador decimal")
+    grupo.add_argument('--milhar', help="Separador de milhar ('' para nenhum)")
+    grupo.add_argument('--casas-decimais', type=int, help="Casas decimais dos números não inteiros")
+    grupo.add_argument('--codificacao', help="Codificação do arquivo (ex: utf-8, utf-8-sig, latin-1)")
+    grupo.add_argument('--aspas', choices=list(ASPAS), help="Quando usar aspas nos campos")
+    grupo.add_argument('--formato-data', help="Formato das datas (ex: %%d/%%m/%%Y)")
+
+def dialeto_dos_argumentos(args):
+    """Monta o dialeto a partir das opções adicionadas por adicionar_argumentos"""
+    return montar_dialeto(args.dialeto, delimitador=args.delimitador, decimal=args.decimal, milhar=args.milhar,
+                          casas_decimais=args.casas_decimais, codificacao=args.codificacao, aspas=args.aspas,
+                          formato_data=args.formato_data,
+                          formato_data_hora=f"{args.formato_data} %H:%M:%S" if args.formato_data else None)
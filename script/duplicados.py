@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Detecção de procedimentos duplicados entre relatórios durante a consolidação.
+
+Um procedimento é identificado pelo Cód.Ate, pela data, pelo paciente e pelo procedimento.
+Quando o mesmo procedimento aparece em mais de um relatório (por exemplo, um relatório
+reemitido com um período que se sobrepõe ao anterior), as ocorrências seguintes à primeira
+são duplicadas: no modo 'remover' elas não são copiadas para o consolidado e o seu valor é
+descontado do Total Geral; no modo 'marcar' são mantidas e apenas listadas.
+
+As chaves são guardadas como hashes de 16 bytes em um dicionário em memória, com custo
+constante por linha. Acima de um limite de chaves, o índice passa para um banco SQLite
+temporário em disco, de forma que arquivos muito grandes não esgotam a memória.
+"""
+
+import os
+import sqlite3
+import hashlib
+import tempfile
+from decimal import Decimal
+
+MODO_REMOVER = 'remover'
+MODO_MARCAR = 'marcar'
+MODOS = (MODO_REMOVER, MODO_MARCAR)
+
+# Chaves mantidas em memória antes de o índice passar para o disco (~150 bytes cada)
+LIMITE_MEMORIA_PADRAO = 1000000
+
+# Duplicados listados por arquivo no modo 'marcar'
+MAX_LISTADOS = 20
+
+def chave_procedimento(procedimento):
+    """
+    Calcula a chave de um procedimento (Cód.Ate, data, paciente e procedimento).
+
+    Args:
+        procedimento (Procedimento): Registro gerado pelo parser_relatorio
+
+    Returns:
+        bytes: Hash de 16 bytes da chave
+    """
+    texto = '\x1f'.join(campo.strip() for campo in (procedimento.codigo, procedimento.data,
+                                                    procedimento.paciente, procedimento.procedimento))
+    return hashlib.blake2b(texto.encode('utf-8'), digest_size=16).digest()
+
+class IndiceDuplicados:
+    """
+    Índice das chaves de procedimento já vistas na consolidação.
+
+    Usado como gerenciador de contexto; ao sair, o banco temporário (se criado) é removido.
+    """
+
+    def __init__(self, modo=MODO_REMOVER, limite_memoria=LIMITE_MEMORIA_PADRAO, diretorio=None):
+        """
+        Args:
+            modo (str, opcional): 'remover' (padrão) ou 'marcar'
+            limite_memoria (int, opcional): Chaves mantidas em memória antes de usar o disco
+            diretorio (str, opcional): Diretório do banco temporário (padrão: o do sistema)
+        """
+        if modo not in MODOS:
+            raise ValueError(f"Modo de duplicados inválido: {modo} (use {', '.join(MODOS)})")
+        self.modo = modo
+        self.limite_memoria = limite_memoria
+        self.diretorio = diretorio
+        self.origens = []
+        # Duplicados do arquivo atual, como (procedimento, arquivo onde apareceu primeiro)
+        self.encontrados = []
+        self.duplicados = 0
+        self.valor = Decimal('0')
+        self._memoria = {}
+        self._banco = None
+        self._caminho_banco = None
+
+    @property
+    def remover(self):
+        """Indica se os duplicados são retirados do consolidado"""
+        return self.modo == MODO_REMOVER
+
+    def iniciar_arquivo(self, arquivo):
+        """Registra o arquivo cujos procedimentos serão verificados a seguir"""
+        self.origens.append(arquivo)
+        self.encontrados = []
+
+    def verificar(self, procedimento):
+        """
+        Registra um procedimento e indica se ele já foi visto.
+
+        Args:
+            procedimento (Procedimento): Registro gerado pelo parser_relatorio
+
+        Returns:
+            str: Arquivo onde o procedimento apareceu primeiro, se for duplicado; senão None
+        """
+        chave = chave_procedimento(procedimento)
+        origem = len(self.origens) - 1
+
+        if self._banco is None:
+            anterior = self._memoria.setdefault(chave, origem)
+            if anterior == origem and len(self._memoria) > self.limite_memoria:
+                self._passar_para_disco()
+        else:
+            cursor = self._banco.execute("INSERT OR IGNORE INTO chaves VALUES (?, ?)", (chave, origem))
+            if cursor.rowcount:
+                anterior = origem
+            else:
+                anterior = self._banco.execute("SELECT origem FROM chaves WHERE chave = ?", (chave,)).fetchone()[0]
+
+        # Um procedimento repetido dentro do próprio relatório não é tratado como duplicado
+        if anterior == origem:
+            return None
+        self.duplicados += 1
+        if procedimento.repasse is not None:
+            self.valor += procedimento.repasse
+        self.encontrados.append((procedimento, self.origens[anterior]))
+        return self.origens[anterior]
+
+    def _passar_para_disco(self):
+        """Move as chaves da memória para um banco SQLite temporário"""
+        descritor, self._caminho_banco = tempfile.mkstemp(prefix='duplicados_', suffix='.sqlite', dir=self.diretorio)
+        os.close(descritor)
+        self._banco = sqlite3.connect(self._caminho_banco)
+        # O banco é descartado ao final: não precisa sobreviver a uma queda do processo
+        self._banco.execute("PRAGMA journal_mode=OFF")
+        self._banco.execute("PRAGMA synchronous=OFF")
+        self._banco.execute("CREATE TABLE chaves (chave BLOB PRIMARY KEY, origem INTEGER) WITHOUT ROWID")
+        self._banco.executemany("INSERT INTO chaves VALUES (?, ?)", self._memoria.items())
+        self._memoria = {}
+
+    def fechar(self):
+        """Fecha e remove o banco temporário, se houver"""
+        if self._banco is not None:
+            self._banco.close()
+            self._banco = None
+        if self._caminho_banco is not None:
+            os.remove(self._caminho_banco)
+            self._caminho_banco = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, tipo, valor, rastreamento):
+        self.fechar()
+        return False
@@ -0,0 +1,330 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Esquemas de leitura tipada dos relatórios.
+
+Um esquema declara quais colunas do relatório são carregadas e o tipo de cada uma. Com ele,
+em vez de copiar a planilha como está (com o cabeçalho, as linhas 'Convênio:' e as linhas de
+total misturadas aos dados), os conversores e o consolidador geram uma tabela só com os
+procedimentos, uma linha por procedimento, com o profissional e o convênio de cada um.
+
+Tipos disponíveis:
+- 'texto': texto livre (ex: paciente);
+- 'categoria': textos com poucos valores distintos (ex: convênio, procedimento), guardados
+  uma única vez na memória (category no pandas);
+- 'inteiro': números inteiros (ex: Cód.Ate);
+- 'data': datas no formato do esquema (padrão dd/mm/aaaa);
+- 'centavos': valores monetários em ponto fixo, guardados como inteiros em centavos.
+
+No pandas, a planilha é lida apenas nas colunas do esquema e sem inferência de tipos
+(dtype=object); as colunas são convertidas uma única vez, já com os tipos declarados.
+
+Além do esquema embutido 'repasse', é possível declarar outros em JSON:
+
+    {"nome": "valores", "colunas": [
+        {"nome": "convenio", "tipo": "categoria"},
+        {"nome": "repasse", "tipo": "centavos", "origem": 4}]}
+
+As colunas sem 'origem' vêm do contexto do relatório ('profissional' ou 'convenio'); as
+demais indicam o índice da coluna na planilha (0 = Cód.Ate, 1 = Data, 2 = Paciente,
+3 = Procedimento, 4 = Repasse).
+"""
+
+import os
+import json
+import datetime
+import functools
+from collections import namedtuple
+from decimal import Decimal, InvalidOperation, ROUND_HALF_UP
+from dialetos import DIALETO_PADRAO, formatar_valor, abrir_saida, criar_escritor
+from parser_relatorio import Procedimento
+
+Coluna = namedtuple('Coluna', 'nome tipo origem')
+Esquema = namedtuple('Esquema', 'nome colunas formato_data')
+
+TIPOS = ('texto', 'categoria', 'inteiro', 'data', 'centavos')
+
+# Colunas que vêm do contexto do relatório (e não de uma coluna da planilha)
+COLUNAS_CONTEXTO = ('profissional', 'convenio')
+
+# Campo do registro Procedimento correspondente a cada coluna da planilha
+CAMPOS_PROCEDIMENTO = {0: 'codigo', 1: 'data', 2: 'paciente', 3: 'procedimento', 4: 'repasse'}
+
+# Coluna da planilha que identifica as linhas de procedimento (Cód.Ate) e os blocos
+COLUNA_CODIGO = 0
+
+ESQUEMA_REPASSE = Esquema('repasse', (
+    Coluna('profissional', 'categoria', None),
+    Coluna('convenio', 'categoria', None),
+    Coluna('codigo', 'inteiro', 0),
+    Coluna('data', 'data', 1),
+    Coluna('paciente', 'texto', 2),
+    Coluna('procedimento', 'categoria', 3),
+    Coluna('repasse', 'centavos', 4),
+), '%d/%m/%Y')
+
+ESQUEMAS = {
+    'repasse': ESQUEMA_REPASSE,
+}
+
+def carregar_esquema(nome):
+    """
+    Obtém um esquema embutido pelo nome ou carrega um esquema declarado em JSON.
+
+    Args:
+        nome (str): Nome de um esquema embutido (ex: 'repasse') ou caminho de um arquivo JSON
+
+    Returns:
+        Esquema: Esquema carregado
+
+    Raises:
+        ValueError: Se o esquema não existir ou for inválido
+    """
+    if nome in ESQUEMAS:
+        return ESQUEMAS[nome]
+    if not os.path.isfile(nome):
+        raise ValueError(f"Esquema desconhecido: {nome} (use {', '.join(ESQUEMAS)} ou um arquivo JSON)")
+
+    with open(nome, 'r', encoding='utf-8') as f:
+        dados = json.load(f)
+    colunas = []
+    for coluna in dados.get('colunas', []):
+        origem = coluna.get('origem')
+        if coluna.get('tipo') not in TIPOS:
+            raise ValueError(f"Tipo inválido na coluna '{coluna.get('nome')}': {coluna.get('tipo')} (use {', '.join(TIPOS)})")
+        if origem is None and coluna.get('nome') not in COLUNAS_CONTEXTO:
+            raise ValueError(f"A coluna '{coluna.get('nome')}' precisa de 'origem' (use {', '.join(COLUNAS_CONTEXTO)} sem origem)")
+        if origem is not None and origem not in CAMPOS_PROCEDIMENTO:
+            raise ValueError(f"Origem inválida na coluna '{coluna.get('nome')}': {origem}")
+        colunas.append(Coluna(coluna['nome'], coluna['tipo'], origem))
+    if not colunas:
+        raise ValueError(f"O esquema '{nome}' não declara nenhuma coluna.")
+    return Esquema(dados.get('nome', os.path.splitext(os.path.basename(nome))[0]), tuple(colunas),
+                   dados.get('formato_data', ESQUEMA_REPASSE.formato_data))
+
+def colunas_planilha(esquema):
+    """Índices das colunas da planilha que precisam ser lidas (a do código sempre é lida)"""
+    return sorted({COLUNA_CODIGO} | {coluna.origem for coluna in esquema.colunas if coluna.origem is not None})
+
+def _converter_inteiro(valor):
+    """
+    Converte um campo para inteiro, do mesmo jeito em tipar_procedimentos e em tipar_dataframe.
+
+    Args:
+        valor: Texto do campo (ex: ' 120217 ' ou '-5') ou número lido pelo pandas
+
+    Returns:
+        int: Valor convertido, ou None se o campo não for um inteiro
+    """
+    if isinstance(valor, float):
+        return int(valor) if valor.is_integer() else None
+    try:
+        return int(str(valor).strip())
+    except ValueError:
+        return None
+
+def _converter_categoria(categorias, texto):
+    """Guarda cada texto de uma coluna 'categoria' uma única vez"""
+    return categorias.setdefault(texto, texto)
+
+def _converter_data(texto, formato):
+    try:
+        return datetime.datetime.strptime(texto, formato).date()
+    except ValueError:
+        return None
+
+def _converter_centavos(valor):
+    if valor is None:
+        return None
+    return int((valor * 100).to_integral_value(rounding=ROUND_HALF_UP))
+
+def _converter_centavos_planilha(valor):
+    """
+    Converte um valor lido pelo pandas em centavos, com o arredondamento de tipar_procedimentos.
+
+    Args:
+        valor: Número da planilha (ex: 1.005, convertido pelo seu texto '1.005') ou texto
+
+    Returns:
+        int: Centavos (meio para cima, ex: 1.005 -> 101), ou None se o valor não for um número
+    """
+    try:
+        numero = Decimal(str(valor).strip())
+    except InvalidOperation:
+        return None
+    return _converter_centavos(numero) if numero.is_finite() else None
+
+def tipar_procedimentos(registros, esquema):
+    """
+    Converte os procedimentos gerados pelo parser_relatorio para os tipos do esquema.
+
+    Os textos das colunas 'categoria' são guardados uma única vez, por mais linhas que os
+    repitam.
+
+    Args:
+        registros (iterable): Registros do analisador (os que não são Procedimento são ignorados)
+        esquema (Esquema): Esquema da tabela
+
+    Yields:
+        tuple: Valores da linha, na ordem das colunas do esquema (int, date, str ou None;
+            'centavos' como inteiro)
+    """
+    categorias = {}
+    conversores = []
+    for coluna in esquema.colunas:
+        campo = coluna.nome if coluna.origem is None else CAMPOS_PROCEDIMENTO[coluna.origem]
+        if coluna.tipo == 'inteiro':
+            converter = _converter_inteiro
+        elif coluna.tipo == 'data':
+            converter = functools.partial(_converter_data, formato=esquema.formato_data)
+        elif coluna.tipo == 'centavos':
+            converter = _converter_centavos
+        elif coluna.tipo == 'categoria':
+            converter = functools.partial(_converter_categoria, categorias)
+        else:
+            converter = None
+        conversores.append((Procedimento._fields.index(campo), converter))
+
+    for registro in registros:
+        if isinstance(registro, Procedimento):
+            yield tuple(registro[i] if converter is None or registro[i] is None else converter(registro[i])
+                        for i, converter in conversores)
+
+def tipar_dataframe(bruto, esquema):
+    """
+    Monta a tabela tipada de procedimentos a partir da planilha lida pelo pandas.
+
+    Args:
+        bruto (pd.DataFrame): Planilha lida com header=None, usecols=colunas_planilha(esquema)
+            e dtype=object (sem inferência de tipos)
+        esquema (Esquema): Esquema da tabela
+
+    Returns:
+        pd.DataFrame: Uma linha por procedimento, com as colunas e os tipos do esquema
+    """
+    import pandas as pd
+
+    primeira = bruto[COLUNA_CODIGO].astype('string').str.strip()
+    contexto = {
+        'profissional': primeira.str.extract(r'^Profissional:\s*(.*?)\s*$', expand=False).ffill(),
+        # O bloco de um convênio termina na sua linha de total ou em um novo profissional
+        'convenio': primeira.str.extract(r'^Conv[êe]nio:\s*(.*?)\s*$', expand=False)
+                    .mask(primeira.str.match(r'Total|Profissional:', na=False), '').ffill().replace('', pd.NA),
+    }
+    procedimentos = (primeira.str.fullmatch(r'\d+') & contexto['convenio'].notna()).fillna(False).astype(bool)
+    linhas = bruto[procedimentos]
+
+    tabela = {}
+    for coluna in esquema.colunas:
+        if coluna.origem is None:
+            serie = contexto[coluna.nome][procedimentos]
+        else:
+            serie = linhas[coluna.origem]
+
+        if coluna.tipo == 'inteiro':
+            # A mesma conversão de tipar_procedimentos (ex: ' -5 ' -> -5, '1.5' -> nulo)
+            serie = serie.map(_converter_inteiro, na_action='ignore').astype('Int64')
+        elif coluna.tipo == 'data':
+            textos = serie.where(serie.map(lambda valor: isinstance(valor, str)))
+            serie = pd.to_datetime(textos.str.strip(), format=esquema.formato_data, errors='coerce') \
+                      .fillna(pd.to_datetime(serie.where(textos.isna()), errors='coerce'))
+        elif coluna.tipo == 'centavos':
+            # Decimal com meio para cima, como tipar_procedimentos (o round() do pandas
+            # arredonda o float para o par: 1.005 -> 100)
+            serie = serie.map(_converter_centavos_planilha, na_action='ignore').astype('Int64')
+        elif coluna.tipo == 'categoria':
+            serie = serie.astype('string').str.strip().astype('category')
+        else:
+            serie = serie.astype('string').str.strip()
+        tabela[coluna.nome] = serie.reset_index(drop=True)
+
+    return pd.DataFrame(tabela, columns=[coluna.nome for coluna in esquema.colunas])
+
+def linhas_dataframe(tabela, esquema):
+    """
+    Gera as linhas de uma tabela tipada do pandas como tuplas de valores do Python.
+
+    Yields:
+        tuple: Valores da linha, como os de tipar_procedimentos
+    """
+    import pandas as pd
+
+    datas = [i for i, coluna in enumerate(esquema.colunas) if coluna.tipo == 'data']
+    for linha in tabela.astype(object).itertuples(index=False, name=None):
+        linha = [None if pd.isna(valor) else valor for valor in linha]
+        for i in datas:
+            if linha[i] is not None:
+                linha[i] = linha[i].date()
+        yield tuple(linha)
+
+def parametros_esquema(esquema):
+    """Descrição do esquema gravada no manifesto (listas, como ficam depois de lidas do JSON)"""
+    return {
+        'nome': esquema.nome,
+        'colunas': [list(coluna) for coluna in esquema.colunas],
+        'formato_data': esquema.formato_data,
+    }
+
+class TabelaCSV:
+    """
+    Grava a tabela de procedimentos em CSV, com os nomes das colunas do esquema na primeira linha.
+
+    Usada como gerenciador de contexto; se ocorrer um erro, o arquivo incompleto é removido.
+    """
+
+    def __init__(self, arquivo_saida, esquema, dialeto=None):
+        """
+        Args:
+            arquivo_saida (str): Caminho para o arquivo CSV de saída
+            esquema (Esquema): Esquema da tabela
+            dialeto (Dialeto, opcional): Formato do CSV (padrão: o CSV gerado pelo pandas)
+        """
+        self.arquivo_saida = arquivo_saida
+        self.esquema = esquema
+        self.dialeto = dialeto or DIALETO_PADRAO
+        self.linhas = 0
+        self._centavos = [i for i, coluna in enumerate(esquema.colunas) if coluna.tipo == 'centavos']
+        self._arquivo = None
+        self._escritor = None
+
+    def __enter__(self):
+        self._arquivo = abrir_saida(self.arquivo_saida, self.dialeto)
+        self._escritor = criar_escritor(self._arquivo, self.dialeto)
+        self._escritor.writerow([coluna.nome for coluna in self.esquema.colunas])
+        return self
+
+    def escrever(self, linhas):
+        """
+        Grava linhas tipadas (ver tipar_procedimentos e linhas_dataframe).
+
+        Returns:
+            int: Número de linhas gravadas nesta chamada
+        """
+        gravadas = 0
+        for linha in linhas:
+            valores = list(linha)
+            for i in self._centavos:
+                if valores[i] is not None:
+                    valores[i] = Decimal(valores[i]).scaleb(-2)
+            self._escritor.writerow([formatar_valor(valor, self.dialeto) for valor in valores])
+            gravadas += 1
+        self.linhas += gravadas
+        return gravadas
+
+    def __exit__(self, tipo, valor, rastreamento):
+        self._arquivo.close()
+        if tipo is not None:
+            # Com erro ou cancelada: não deixa uma tabela incompleta para trás
+            os.remove(self.arquivo_saida)
+        return False
+
+def gravar_tabela(linhas, arquivo_saida, esquema, dialeto=None):
+    """
+    Grava a tabela de procedimentos em CSV (ver TabelaCSV).
+
+    Returns:
+        int: Número de linhas gravadas (sem contar a dos nomes das colunas)
+    """
+    with TabelaCSV(arquivo_saida, esquema, dialeto) as tabela:
+        return tabela.escrever(linhas)
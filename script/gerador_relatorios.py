@@ -0,0 +1,207 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Gerador de relatórios de repasse sintéticos, para testes de desempenho.
+
+Os relatórios seguem a estrutura do "Demonstrativo de Produtividade" exportado pelo sistema
+de origem (título, profissional, blocos de convênio com procedimentos e totais, total geral)
+e podem ser gravados em .xls (requer xlwt), .xlsx (openpyxl) ou no CSV separado por ';' que
+o processar_csv_final_ajustado.py espera. Os dados são gerados a partir de uma semente, de
+forma que a mesma configuração gera sempre os mesmos arquivos.
+"""
+
+import os
+import csv
+import sys
+import random
+import argparse
+import datetime
+from decimal import Decimal
+
+FORMATOS = ('xls', 'xlsx', 'csv')
+
+# Limite de linhas de uma planilha no formato .xls
+MAX_LINHAS_XLS = 65536
+
+CONVENIOS = [
+    'ASSEFAZ', 'BRADESCO', 'CAMED', 'CASEC (CODEVASF)', 'CASSI', 'GEAP', 'HAPVIDA', 'IPES',
+    'PARTICULAR', 'PETROBRAS', 'PLAN ASSISTE MPU', 'POSTAL SAUDE', 'SULAMERICA', 'UNIMED', 'VALE',
+]
+PROCEDIMENTOS = [
+    ('COLONOSCOPIA COM BIOPSIA E OU CITOLOGIA', Decimal('151.50')),
+    ('COLONOSCOPIA SEM BIOPSIA', Decimal('154.00')),
+    ('POLIPECTOMIA DE COLON', Decimal('204.84')),
+    ('ENDOSCOPIA DIGESTIVA ALTA', Decimal('92.37')),
+    ('ENDOSCOPIA COM BIOPSIA', Decimal('118.45')),
+    ('RETOSSIGMOIDOSCOPIA FLEXIVEL', Decimal('87.10')),
+]
+PROFISSIONAIS = ['ANNE MICHELLE COLONO', 'ANNE MICHELLE ENDO', 'CARLOS EDUARDO LIMA', 'MARIANA SOUZA REIS']
+NOMES = ['ADRIANA', 'ALLAN', 'ANA LUCIA', 'CICERO', 'EDNALDO', 'JOSE', 'KATIA', 'LARISSA', 'LYNNE', 'MARIA', 'SOLANGE']
+SOBRENOMES = ['ALVES', 'ANDRADE', 'BARRETO', 'CARVALHO', 'GURGEL', 'MATOS', 'MORAES', 'OLIVEIRA', 'SANTOS', 'SILVA', 'TEIXEIRA']
+
+RODAPE = '\\Relatorios\\Repasse\\REP_Repasse_Padrao.rpt'
+
+def gerar_relatorio(aleatorio, convenios=4, procedimentos=20, profissional=None):
+    """
+    Gera as linhas de um relatório de repasse.
+
+    Args:
+        aleatorio (random.Random): Gerador de números aleatórios
+        convenios (int, opcional): Número de blocos de convênio (padrão: 4)
+        procedimentos (int, opcional): Número total de linhas de procedimento (padrão: 20)
+        profissional (str, opcional): Nome do profissional (padrão: sorteado)
+
+    Returns:
+        list: Linhas do relatório; códigos e quantidades são int, valores são Decimal
+    """
+    profissional = profissional or aleatorio.choice(PROFISSIONAIS)
+    convenios = max(1, min(convenios, len(CONVENIOS)))
+    inicio = datetime.date(2024, 1, 1) + datetime.timedelta(days=aleatorio.randrange(365))
+    fim = inicio + datetime.timedelta(days=29)
+
+    linhas = [
+        ['Usuário Geração: Tarcísio', 'REPASSE\nDEMONSTRATIVO DE PRODUTIVIDADE',
+         f"Impressão: {fim.strftime('%d/%m/%Y')}", 'Página......: 1 de 1 ', 'Empresa...: Clinica Endogastro',
+         f"Período: {inicio.strftime('%d/%m/%Y')} à {fim.strftime('%d/%m/%Y')}"],
+        [f"Profissional: {profissional}", None, None, None, None, None],
+    ]
+
+    # Distribui os procedimentos entre os convênios (cada convênio tem pelo menos um)
+    quantidades = [1] * convenios
+    for _ in range(max(procedimentos - convenios, 0)):
+        quantidades[aleatorio.randrange(convenios)] += 1
+
+    codigo = 100000 + aleatorio.randrange(10000)
+    total_geral = Decimal('0')
+    for convenio, quantidade in zip(sorted(aleatorio.sample(CONVENIOS, convenios)), quantidades):
+        linhas.append([f"Convênio: {convenio}", 'Cód.Ate', 'Data', 'Paciente', 'Procedimento', 'Repasse'])
+        total = Decimal('0')
+        for _ in range(quantidade):
+            codigo += aleatorio.randrange(1, 50)
+            data = inicio + datetime.timedelta(days=aleatorio.randrange(30))
+            paciente = f"{aleatorio.choice(NOMES)} {aleatorio.choice(SOBRENOMES)} {aleatorio.choice(SOBRENOMES)}"
+            procedimento, valor = aleatorio.choice(PROCEDIMENTOS)
+            linhas.append([codigo, data.strftime('%d/%m/%Y'), paciente, procedimento, valor, None])
+            total += valor
+        linhas.append(['Total Procedimentos:', quantidade, f"Total {convenio}:", total, None, None])
+        total_geral += total
+
+    linhas.append(['Total Procedimentos:', sum(quantidades), 'Total:', total_geral,
+                   f"_______________________________________\n{profissional}", None])
+    linhas.append([RODAPE, None, None, None, None, None])
+    return linhas
+
+def _valor_planilha(valor):
+    """Converte o valor gerado para a célula da planilha (Decimal vira float, como no Excel)"""
+    return float(valor) if isinstance(valor, Decimal) else valor
+
+def _valor_csv(valor, coluna):
+    """Formata o valor gerado como no CSV do sistema de origem ('1.024,27', códigos com espaço)"""
+    if valor is None:
+        return ''
+    if isinstance(valor, Decimal):
+        return f"{valor:,.2f}".replace(',', '_').replace('.', ',').replace('_', '.')
+    if isinstance(valor, int) and coluna == 0:
+        return f"{valor} "
+    return str(valor)
+
+def gravar_xls(arquivo, planilhas):
+    """Grava as planilhas ({nome: linhas}) em um arquivo .xls; requer o pacote xlwt"""
+    try:
+        import xlwt
+    except ImportError:
+        raise RuntimeError("A geração de arquivos .xls requer o pacote xlwt (pip install xlwt).")
+
+    livro = xlwt.Workbook(encoding='utf-8')
+    for nome, linhas in planilhas.items():
+        if len(linhas) > MAX_LINHAS_XLS:
+            raise ValueError(f"A planilha '{nome}' tem {len(linhas)} linhas; o formato .xls aceita até {MAX_LINHAS_XLS}.")
+        folha = livro.add_sheet(nome)
+        for i, linha in enumerate(linhas):
+            for j, valor in enumerate(linha):
+                if valor is not None:
+                    folha.write(i, j, _valor_planilha(valor))
+    livro.save(arquivo)
+
+def gravar_xlsx(arquivo, planilhas):
+    """Grava as planilhas ({nome: linhas}) em um arquivo .xlsx, em modo de escrita otimizada"""
+    import openpyxl
+
+    livro = openpyxl.Workbook(write_only=True)
+    for nome, linhas in planilhas.items():
+        folha = livro.create_sheet(nome)
+        for linha in linhas:
+            folha.append([_valor_planilha(valor) for valor in linha])
+    livro.save(arquivo)
+
+def gravar_csv(arquivo, linhas):
+    """Grava um relatório no CSV do sistema de origem (';', vírgula decimal, UTF-8 com BOM)"""
+    with open(arquivo, 'w', encoding='utf-8-sig', newline='') as f:
+        escritor = csv.writer(f, delimiter=';', lineterminator='\n')
+        for linha in linhas:
+            escritor.writerow([_valor_csv(valor, j) for j, valor in enumerate(linha)])
+
+def gerar_arquivos(diretorio, formato='xls', arquivos=1, planilhas=1, convenios=4, procedimentos=20, semente=0, prefixo='relatorio'):
+    """
+    Gera um conjunto de relatórios sintéticos.
+
+    Args:
+        diretorio (str): Diretório dos arquivos gerados
+        formato (str, opcional): 'xls', 'xlsx' ou 'csv' (padrão: 'xls')
+        arquivos (int, opcional): Número de arquivos (padrão: 1)
+        planilhas (int, opcional): Planilhas por arquivo; ignorado no formato csv (padrão: 1)
+        convenios (int, opcional): Convênios por relatório (padrão: 4)
+        procedimentos (int, opcional): Procedimentos por relatório (padrão: 20)
+        semente (int, opcional): Semente dos dados aleatórios (padrão: 0)
+        prefixo (str, opcional): Prefixo do nome dos arquivos (padrão: 'relatorio')
+
+    Returns:
+        tuple: (lista de arquivos gerados, total de linhas de procedimento)
+    """
+    if formato not in FORMATOS:
+        raise ValueError(f"Formato inválido: {formato} (use {', '.join(FORMATOS)})")
+
+    os.makedirs(diretorio, exist_ok=True)
+    aleatorio = random.Random(semente)
+    gerados = []
+    total_procedimentos = 0
+
+    for i in range(1, arquivos + 1):
+        arquivo = os.path.join(diretorio, f"{prefixo} {i}.{formato}")
+        if formato == 'csv':
+            gravar_csv(arquivo, gerar_relatorio(aleatorio, convenios, procedimentos))
+        else:
+            conteudo = {f"Planilha{j}": gerar_relatorio(aleatorio, convenios, procedimentos)
+                        for j in range(1, planilhas + 1)}
+            if formato == 'xls':
+                gravar_xls(arquivo, conteudo)
+            else:
+                gravar_xlsx(arquivo, conteudo)
+        total_procedimentos += procedimentos * (1 if formato == 'csv' else planilhas)
+        gerados.append(arquivo)
+
+    return gerados, total_procedimentos
+
+def criar_parser_argumentos():
+    """Cria o parser dos argumentos de linha de comando"""
+    parser = argparse.ArgumentParser(description="Gera relatórios de repasse sintéticos para testes de desempenho.")
+    parser.add_argument('diretorio', help="Diretório dos arquivos gerados")
+    parser.add_argument('--formato', choices=FORMATOS, default='xls', help="Formato dos arquivos (padrão: xls)")
+    parser.add_argument('--arquivos', type=int, default=1, help="Número de arquivos (padrão: 1)")
+    parser.add_argument('--planilhas', type=int, default=1, help="Planilhas por arquivo, em xls/xlsx (padrão: 1)")
+    parser.add_argument('--convenios', type=int, default=4, help="Convênios por relatório (padrão: 4)")
+    parser.add_argument('--procedimentos', type=int, default=20, help="Procedimentos por relatório (padrão: 20)")
+    parser.add_argument('--semente', type=int, default=0, help="Semente dos dados aleatórios (padrão: 0)")
+    parser.add_argument('--prefixo', default='relatorio', help="Prefixo do nome dos arquivos (padrão: relatorio)")
+    return parser
+
+if __name__ == "__main__":
+    args = criar_parser_argumentos().parse_args()
+    try:
+        gerados, total = gerar_arquivos(args.diretorio, args.formato, args.arquivos, args.planilhas,
+                                        args.convenios, args.procedimentos, args.semente, args.prefixo)
+    except (RuntimeError, ValueError) as e:
+        print(f"Erro: {str(e)}")
+        sys.exit(1)
+    print(f"{len(gerados)} arquivo(s) gerado(s) em {args.diretorio} ({total} procedimentos).")
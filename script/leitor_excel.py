@@ -0,0 +1,420 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Leitura de arquivos Excel compartilhada pelo conversor de linha de comando e pela interface gráfica.
+
+Mantém um pequeno cache de pd.ExcelFile indexado por caminho, data de modificação e tamanho,
+de forma que a validação e a leitura dos dados usem o mesmo arquivo já decodificado, em vez
+de abrir o arquivo Excel várias vezes.
+
+O pandas só é importado quando um DataFrame é realmente necessário; a listagem das planilhas
+lê apenas os metadados do arquivo, sem o pandas.
+"""
+
+import os
+import re
+import contextlib
+import zipfile
+import itertools
+import threading
+import xml.etree.ElementTree as ET
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from conversor_streaming import (MOTOR_PANDAS, MOTOR_STREAMING, LINHAS_POR_AVISO, ConversaoCancelada,
+                                 abrir_livro, fechar_livro, nomes_planilhas, iterar_linhas, normalizar_linhas,
+                                 converter_planilha_streaming)
+from dialetos import DIALETO_PADRAO, DIALETO_CONSOLIDADO, eh_padrao, formatar_valor, abrir_saida, criar_escritor
+from compressao import bytes_gravados
+from esquemas import colunas_planilha, tipar_dataframe, tipar_procedimentos, linhas_dataframe, gravar_tabela
+from parser_relatorio import analisar_registros
+
+# Quantidade máxima de arquivos Excel mantidos abertos no cache
+MAX_ARQUIVOS_ABERTOS = 8
+
+# Quantidade máxima de prévias de planilhas mantidas no cache
+MAX_PREVIAS = 32
+
+# Linhas de dados lidas na prévia de uma planilha
+LINHAS_PREVIA = 10
+
+# Indica a conversão de todas as planilhas ('*' não é permitido em nomes de planilha do Excel)
+TODAS_PLANILHAS = '*'
+
+# Padrão de nome dos CSVs gerados ao exportar todas as planilhas.
+# Campos disponíveis: {base} (nome do arquivo Excel), {planilha} (nome da planilha) e {indice}
+PADRAO_NOME_PLANILHAS = '{base}_{planilha}.csv'
+
+_cache_arquivos = OrderedDict()
+_trava_cache = threading.Lock()
+
+_cache_previas = OrderedDict()
+_trava_previas = threading.Lock()
+
+def _chave_arquivo(caminho):
+    """Gera a chave do cache: caminho absoluto, data de modificação e tamanho"""
+    info = os.stat(caminho)
+    return (os.path.abspath(caminho), info.st_mtime_ns, info.st_size)
+
+def abrir_excel(caminho):
+    """
+    Abre um arquivo Excel, reaproveitando o pd.ExcelFile já aberto se o arquivo não mudou.
+
+    Args:
+        caminho (str): Caminho para o arquivo Excel
+
+    Returns:
+        pd.ExcelFile: Arquivo Excel aberto
+    """
+    chave = _chave_arquivo(caminho)
+
+    with _trava_cache:
+        xl = _cache_arquivos.get(chave)
+        if xl is not None:
+            _cache_arquivos.move_to_end(chave)
+            return xl
+
+        # Descarta versões antigas do mesmo arquivo (modificado desde a abertura)
+        for chave_antiga in [c for c in _cache_arquivos if c[0] == chave[0]]:
+            _cache_arquivos.pop(chave_antiga).close()
+
+        # Importado aqui para que quem não lê DataFrames não pague o custo de importar o pandas
+        import pandas as pd
+        xl = pd.ExcelFile(caminho)
+        _cache_arquivos[chave] = xl
+
+        # Remove os arquivos usados há mais tempo
+        while len(_cache_arquivos) > MAX_ARQUIVOS_ABERTOS:
+            _, xl_antigo = _cache_arquivos.popitem(last=False)
+            xl_antigo.close()
+
+        return xl
+
+def listar_nomes_planilhas(caminho):
+    """
+    Lista as planilhas de um arquivo Excel lendo apenas os metadados, sem o pandas.
+
+    Para .xlsx, os nomes vêm do xl/workbook.xml, sem ler as planilhas nem os textos
+    compartilhados; para .xls, do xlrd com carregamento sob demanda, que não lê as planilhas.
+
+    Args:
+        caminho (str): Caminho para o arquivo Excel
+
+    Returns:
+        list: Nomes das planilhas, na ordem do arquivo
+    """
+    if os.path.splitext(caminho)[1].lower() != '.xls':
+        try:
+            with zipfile.ZipFile(caminho) as pacote:
+                raiz = ET.fromstring(pacote.read('xl/workbook.xml'))
+            # Compara só o nome local das tags, que aparecem com namespaces diferentes conforme o gerador
+            return [elemento.get('name') for elemento in raiz.iter() if elemento.tag.rsplit('}', 1)[-1] == 'sheet']
+        except (zipfile.BadZipFile, KeyError, ET.ParseError):
+            pass
+
+    livro = abrir_livro(caminho)
+    try:
+        return nomes_planilhas(livro)
+    finally:
+        fechar_livro(livro)
+
+def fechar_excel(caminho=None):
+    """
+    Fecha arquivos Excel mantidos no cache.
+
+    Args:
+        caminho (str, opcional): Arquivo a ser fechado (padrão: todos)
+    """
+    with _trava_cache:
+        caminho_abs = os.path.abspath(caminho) if caminho else None
+        for chave in list(_cache_arquivos):
+            if caminho_abs is None or chave[0] == caminho_abs:
+                _cache_arquivos.pop(chave).close()
+
+def _chave_previa(caminho, planilha, linhas):
+    return _chave_arquivo(caminho) + (planilha, linhas)
+
+def previa_em_cache(caminho, planilha, linhas=LINHAS_PREVIA):
+    """
+    Retorna a prévia de uma planilha se ela já estiver no cache, sem ler o arquivo.
+
+    Returns:
+        tuple: (colunas, linhas) ou None se a prévia ainda não foi lida
+    """
+    try:
+        chave = _chave_previa(caminho, planilha, linhas)
+    except OSError:
+        return None
+    with _trava_previas:
+        previa = _cache_previas.get(chave)
+        if previa is not None:
+            _cache_previas.move_to_end(chave)
+        return previa
+
+def ler_previa(caminho, planilha=0, linhas=LINHAS_PREVIA):
+    """
+    Lê as primeiras linhas de uma planilha, sem carregar a planilha inteira.
+
+    As linhas são lidas em streaming (openpyxl somente leitura para .xlsx; para .xls, o xlrd
+    carrega apenas a planilha pedida) e a leitura é interrompida após `linhas` linhas de dados.
+    As prévias ficam em um cache (LRU) por arquivo e planilha.
+
+    Args:
+        caminho (str): Caminho para o arquivo Excel
+        planilha (int|str, opcional): Índice ou nome da planilha (padrão: 0)
+        linhas (int, opcional): Número de linhas de dados (padrão: LINHAS_PREVIA)
+
+    Returns:
+        tuple: (colunas, linhas), com os nomes das colunas como o pandas os detectaria e as
+            primeiras linhas de dados (None nas células vazias)
+    """
+    previa = previa_em_cache(caminho, planilha, linhas)
+    if previa is not None:
+        return previa
+
+    chave = _chave_previa(caminho, planilha, linhas)
+    livro = abrir_livro(caminho)
+    try:
+        gerador = normalizar_linhas(iterar_linhas(livro, planilha))
+        try:
+            lidas = list(itertools.islice(gerador, linhas + 1))
+        finally:
+            gerador.close()
+    finally:
+        fechar_livro(livro)
+    previa = (lidas[0] if lidas else [], lidas[1:])
+
+    with _trava_previas:
+        _cache_previas[chave] = previa
+        while len(_cache_previas) > MAX_PREVIAS:
+            _cache_previas.popitem(last=False)
+    return previa
+
+def converter_planilha(arquivo_entrada, arquivo_saida, planilha=0, motor=MOTOR_PANDAS, progresso=None, cancelar=None, livro=None, dialeto=None):
+    """
+    Converte uma planilha para CSV, com aviso de progresso e cancelamento opcionais.
+
+    No motor pandas a planilha é lida inteira e gravada em blocos de linhas; no motor
+    streaming as linhas são gravadas à medida que são lidas. Em ambos, o cancelamento é
+    verificado entre os blocos e remove o arquivo parcial. Com um dialeto diferente do
+    padrão, as células são formatadas enquanto cada bloco é gravado.
+
+    Args:
+        arquivo_entrada (str): Caminho para o arquivo XLS/XLSX de entrada
+        arquivo_saida (str): Caminho para o arquivo CSV de saída
+        planilha (int|str, opcional): Índice ou nome da planilha (padrão: 0)
+        motor (str, opcional): 'pandas' (padrão) ou 'streaming'
+        progresso (callable, opcional): Chamada com (linhas_gravadas, total_linhas, bytes_gravados)
+        cancelar (threading.Event, opcional): Sinaliza o cancelamento (lança ConversaoCancelada)
+        livro (object, opcional): Livro já aberto com abrir_livro (apenas no motor streaming)
+        dialeto (Dialeto, opcional): Formato do CSV (padrão: o CSV gerado pelo pandas)
+
+    Returns:
+        int: Número de linhas de dados gravadas
+    """
+    if motor == MOTOR_STREAMING:
+        return converter_planilha_streaming(arquivo_entrada, arquivo_saida, planilha, livro, progresso, cancelar, dialeto)
+
+    padrao = eh_padrao(dialeto)
+    if padrao or dialeto.nomes_colunas:
+        df = abrir_excel(arquivo_entrada).parse(sheet_name=planilha)
+    else:
+        df = abrir_excel(arquivo_entrada).parse(sheet_name=planilha, header=None)
+    total = len(df)
+    if cancelar is not None and cancelar.is_set():
+        raise ConversaoCancelada()
+
+    try:
+        with abrir_saida(arquivo_saida, dialeto or DIALETO_PADRAO) as f:
+            escritor = None if padrao else criar_escritor(f, dialeto)
+            if escritor is not None and dialeto.nomes_colunas:
+                escritor.writerow([formatar_valor(nome, dialeto) for nome in df.columns])
+            for inicio in range(0, max(total, 1), LINHAS_POR_AVISO):
+                if cancelar is not None and cancelar.is_set():
+                    raise ConversaoCancelada()
+                bloco = df.iloc[inicio:inicio + LINHAS_POR_AVISO]
+                if escritor is None:
+                    # Mesmo resultado de df.to_csv(arquivo_saida), gravado em blocos
+                    bloco.to_csv(f, index=False, header=inicio == 0)
+                else:
+                    # astype(object) devolve os valores como tipos do Python (int, float, Timestamp)
+                    escritor.writerows([formatar_valor(valor, dialeto) for valor in linha]
+                                       for linha in bloco.astype(object).itertuples(index=False, name=None))
+                if progresso is not None:
+                    progresso(min(inicio + LINHAS_POR_AVISO, total), total, bytes_gravados(f))
+    except BaseException:
+        # Cancelada ou com erro: não deixa um CSV incompleto para trás (o erro pode ter
+        # ocorrido antes de o arquivo ser criado, ex: diretório de saída inexistente)
+        with contextlib.suppress(FileNotFoundError):
+            os.remove(arquivo_saida)
+        raise
+
+    return total
+
+def ler_tabela(arquivo_entrada, esquema, planilha=0, motor=MOTOR_PANDAS):
+    """
+    Lê os procedimentos de um relatório em Excel com os tipos declarados no esquema.
+
+    No motor pandas, a planilha é lida só nas colunas do esquema e sem inferência de tipos, e
+    convertida de uma vez (ver esquemas.tipar_dataframe). No motor streaming, as linhas passam
+    pelo parser_relatorio à medida que são lidas e só os procedimentos ficam na memória.
+
+    Args:
+        arquivo_entrada (str): Caminho para o arquivo XLS/XLSX
+        esquema (Esquema): Esquema da tabela (ver esquemas.py)
+        planilha (int|str, opcional): Índice ou nome da planilha (padrão: 0)
+        motor (str, opcional): 'pandas' (padrão) ou 'streaming'
+
+    Returns:
+        list: Linhas tipadas, uma por procedimento (ver esquemas.tipar_procedimentos)
+    """
+    if motor != MOTOR_STREAMING:
+        bruto = abrir_excel(arquivo_entrada).parse(sheet_name=planilha, header=None,
+                                                   usecols=colunas_planilha(esquema), dtype=object)
+        return list(linhas_dataframe(tipar_dataframe(bruto, esquema), esquema))
+
+    # As células são passadas ao parser como texto, com as datas no formato do esquema
+    dialeto = DIALETO_CONSOLIDADO._replace(formato_data=esquema.formato_data)
+    livro = abrir_livro(arquivo_entrada)
+    try:
+        campos = ([formatar_valor(valor, dialeto) for valor in linha]
+                  for linha in normalizar_linhas(iterar_linhas(livro, planilha), nomes_colunas=False))
+        return list(tipar_procedimentos(analisar_registros(campos, dialeto.decimal), esquema))
+    finally:
+        fechar_livro(livro)
+
+def converter_tabela(arquivo_entrada, arquivo_saida, esquema, planilha=0, motor=MOTOR_PANDAS, dialeto=None):
+    """
+    Grava em CSV a tabela tipada dos procedimentos de um relatório em Excel (ver ler_tabela).
+
+    Args:
+        arquivo_entrada (str): Caminho para o arquivo XLS/XLSX
+        arquivo_saida (str): Caminho para o arquivo CSV de saída
+        esquema (Esquema): Esquema da tabela
+        planilha (int|str, opcional): Índice ou nome da planilha (padrão: 0)
+        motor (str, opcional): 'pandas' (padrão) ou 'streaming'
+        dialeto (Dialeto, opcional): Formato do CSV (padrão: o CSV gerado pelo pandas)
+
+    Returns:
+        int: Número de procedimentos gravados
+    """
+    return gravar_tabela(ler_tabela(arquivo_entrada, esquema, planilha, motor), arquivo_saida, esquema, dialeto)
+
+def converter_arquivo(arquivo_entrada, arquivo_saida, planilha=0, motor=MOTOR_PANDAS, padrao_nome=PADRAO_NOME_PLANILHAS, dialeto=None):
+    """
+    Converte uma planilha (ou todas) de um arquivo Excel; usada pelas filas de conversão.
+
+    Args:
+        arquivo_entrada (str): Caminho para o arquivo Excel
+        arquivo_saida (str): Caminho para o CSV de saída (com TODAS_PLANILHAS, os CSVs são
+            gravados no diretório dele, com nomes definidos por padrao_nome)
+        planilha (int|str, opcional): Índice ou nome da planilha, ou TODAS_PLANILHAS (padrão: 0)
+        motor (str, opcional): 'pandas' (padrão) ou 'streaming'
+        padrao_nome (str, opcional): Padrão do nome dos CSVs ao converter todas as planilhas
+        dialeto (Dialeto, opcional): Formato dos CSVs (padrão: o CSV gerado pelo pandas)
+
+    Returns:
+        int: Número de linhas de dados gravadas (somadas entre as planilhas)
+    """
+    if planilha != TODAS_PLANILHAS:
+        return converter_planilha(arquivo_entrada, arquivo_saida, planilha, motor, dialeto=dialeto)
+
+    linhas = {}
+    exportar_todas_planilhas(arquivo_entrada, padrao_nome, os.path.dirname(arquivo_saida), motor=motor, linhas=linhas,
+                             dialeto=dialeto)
+    return sum(linhas.values())
+
+def nome_saida_planilha(arquivo_entrada, nome_planilha, indice, padrao_nome=PADRAO_NOME_PLANILHAS, diretorio_saida=None):
+    """
+    Monta o caminho do CSV de uma planilha a partir do padrão de nomes.
+
+    Args:
+        arquivo_entrada (str): Caminho para o arquivo Excel
+        nome_planilha (str): Nome da planilha
+        indice (int): Índice da planilha no arquivo
+        padrao_nome (str, opcional): Padrão do nome do arquivo (padrão: '{base}_{planilha}.csv')
+        diretorio_saida (str, opcional): Diretório do CSV (padrão: o mesmo do arquivo Excel)
+
+    Returns:
+        str: Caminho do arquivo CSV
+    """
+    base = os.path.splitext(os.path.basename(arquivo_entrada))[0]
+    # Remove caracteres que não podem fazer parte de nomes de arquivo
+    planilha = re.sub(r'[\\/:*?"<>|]', '_', str(nome_planilha)).strip()
+    nome = padrao_nome.format(base=base, planilha=planilha, indice=indice)
+    return os.path.join(diretorio_saida or os.path.dirname(arquivo_entrada), nome)
+
+def exportar_todas_planilhas(arquivo_entrada, padrao_nome=PADRAO_NOME_PLANILHAS, diretorio_saida=None, paralelo=False, max_threads=None, motor=MOTOR_PANDAS, progresso=None, cancelar=None, linhas=None, dialeto=None):
+    """
+    Exporta todas as planilhas de um arquivo Excel, uma por CSV, abrindo o arquivo uma única vez.
+
+    Args:
+        arquivo_entrada (str): Caminho para o arquivo Excel
+        padrao_nome (str, opcional): Padrão do nome dos CSVs (ver PADRAO_NOME_PLANILHAS)
+        diretorio_saida (str, opcional): Diretório dos CSVs (padrão: o mesmo do arquivo Excel)
+        paralelo (bool, opcional): Lê e grava as planilhas em paralelo (útil em arquivos grandes);
+            ignorado no motor streaming, que lê as planilhas em sequência
+        max_threads (int, opcional): Número máximo de threads no modo paralelo
+        motor (str, opcional): 'pandas' (padrão) ou 'streaming'
+        progresso (callable, opcional): Chamada a cada planilha concluída, com
+            (planilhas_concluidas, total_planilhas, bytes_gravados)
+        cancelar (threading.Event, opcional): Sinaliza o cancelamento; os CSVs já gravados
+            são removidos e ConversaoCancelada é lançada
+        linhas (dict, opcional): Preenchido com o número de linhas de dados de cada CSV gravado
+        dialeto (Dialeto, opcional): Formato dos CSVs (padrão: o CSV gerado pelo pandas)
+
+    Returns:
+        list: Lista de tuplas (nome_planilha, arquivo_csv) na ordem das planilhas
+    """
+    if diretorio_saida:
+        os.makedirs(diretorio_saida, exist_ok=True)
+
+    concluidas = []
+    trava = threading.Lock()
+
+    def exportar(nome, arquivo_saida, livro=None):
+        gravadas = converter_planilha(arquivo_entrada, arquivo_saida, nome, motor, cancelar=cancelar, livro=livro, dialeto=dialeto)
+        with trava:
+            concluidas.append(arquivo_saida)
+            if linhas is not None:
+                linhas[arquivo_saida] = gravadas
+            if progresso is not None:
+                progresso(len(concluidas), len(saidas), sum(os.path.getsize(c) for c in concluidas))
+
+    try:
+        if motor == MOTOR_STREAMING:
+            livro = abrir_livro(arquivo_entrada)
+            try:
+                saidas = _nomes_saidas(arquivo_entrada, nomes_planilhas(livro), padrao_nome, diretorio_saida)
+                for nome, arquivo_saida in saidas:
+                    exportar(nome, arquivo_saida, livro)
+            finally:
+                fechar_livro(livro)
+            return saidas
+
+        xl = abrir_excel(arquivo_entrada)
+        saidas = _nomes_saidas(arquivo_entrada, xl.sheet_names, padrao_nome, diretorio_saida)
+
+        if paralelo and len(saidas) > 1:
+            with ThreadPoolExecutor(max_workers=max_threads or min(len(saidas), os.cpu_count() or 1)) as executor:
+                # list() propaga a primeira exceção ocorrida nas threads
+                list(executor.map(lambda item: exportar(*item), saidas))
+        else:
+            for nome, arquivo_saida in saidas:
+                exportar(nome, arquivo_saida)
+    except ConversaoCancelada:
+        for arquivo_saida in concluidas:
+            os.remove(arquivo_saida)
+        raise
+
+    return saidas
+
+def _nomes_saidas(arquivo_entrada, planilhas, padrao_nome, diretorio_saida):
+    """Monta os CSVs de todas as planilhas, recusando padrões que gerem nomes repetidos"""
+    saidas = [
+        (nome, nome_saida_planilha(arquivo_entrada, nome, indice, padrao_nome, diretorio_saida))
+        for indice, nome in enumerate(planilhas)
+    ]
+    if len(set(saida for _, saida in saidas)) != len(saidas):
+        raise ValueError(f"O padrão de nomes '{padrao_nome}' gera arquivos repetidos; use {{planilha}} ou {{indice}}.")
+    return saidas
@@ -0,0 +1,226 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Manifesto persistente das conversões e consolidações já realizadas.
+
+Para cada arquivo de entrada são registrados o tamanho, a data de modificação e o hash
+do conteúdo, junto com as saídas geradas e os totais extraídos. Em uma nova execução,
+as entradas que não mudaram são ignoradas e os resultados registrados são reaproveitados.
+
+O hash só é recalculado quando o tamanho ou a data de modificação mudam; se o conteúdo
+continuar igual (arquivo copiado ou apenas "tocado"), a entrada é considerada inalterada.
+"""
+
+import os
+import json
+import time
+import hashlib
+
+NOME_MANIFESTO_PADRAO = '.manifesto_conversor.json'
+
+# Política de descarte: entradas sem uso há mais tempo que isso são removidas
+IDADE_MAXIMA_PADRAO = 180 * 24 * 3600
+# Quantidade máxima de entradas; acima disso, as usadas há mais tempo são removidas
+MAX_ENTRADAS_PADRAO = 20000
+
+VERSAO_MANIFESTO = 1
+
+def calcular_hash(arquivo, tamanho_bloco=1024 * 1024):
+    """
+    Calcula o hash SHA-256 do conteúdo de um arquivo, lendo em blocos.
+
+    Args:
+        arquivo (str): Caminho para o arquivo
+        tamanho_bloco (int, opcional): Tamanho dos blocos lidos (padrão: 1 MB)
+
+    Returns:
+        str: Hash hexadecimal do conteúdo
+    """
+    sha = hashlib.sha256()
+    with open(arquivo, 'rb') as f:
+        for bloco in iter(lambda: f.read(tamanho_bloco), b''):
+            sha.update(bloco)
+    return sha.hexdigest()
+
+class Manifesto:
+    """
+    Manifesto de arquivos já processados, gravado em JSON.
+
+    Cada entrada é identificada pela operação ('conversao', 'consolidacao', ...) e pelo
+    caminho absoluto do arquivo de entrada.
+    """
+
+    def __init__(self, caminho=NOME_MANIFESTO_PADRAO, idade_maxima=IDADE_MAXIMA_PADRAO, max_entradas=MAX_ENTRADAS_PADRAO):
+        """
+        Args:
+            caminho (str, opcional): Arquivo JSON do manifesto (None mantém o manifesto só em memória)
+            idade_maxima (float, opcional): Segundos sem uso até a entrada ser descartada (0 desativa)
+            max_entradas (int, opcional): Número máximo de entradas mantidas (0 desativa)
+        """
+        self.caminho = caminho
+        self.idade_maxima = idade_maxima
+        self.max_entradas = max_entradas
+        self.entradas = {}
+        self.alterado = False
+        self.carregar()
+
+    def carregar(self):
+        """Carrega o manifesto do disco; um manifesto ausente ou corrompido é tratado como vazio"""
+        self.entradas = {}
+        if not self.caminho or not os.path.isfile(self.caminho):
+            return
+        try:
+            with open(self.caminho, 'r', encoding='utf-8') as f:
+                dados = json.load(f)
+            if dados.get('versao') == VERSAO_MANIFESTO:
+                self.entradas = dados.get('entradas', {})
+        except (OSError, ValueError) as e:
+            print(f"Aviso: manifesto '{self.caminho}' ignorado ({str(e)}).")
+
+    def salvar(self):
+        """Aplica a política de descarte e grava o manifesto de forma atômica"""
+        self.aplicar_politica()
+        if not self.alterado or not self.caminho:
+            return
+
+        diretorio = os.path.dirname(os.path.abspath(self.caminho))
+        os.makedirs(diretorio, exist_ok=True)
+        temporario = f"{self.caminho}.tmp"
+        with open(temporario, 'w', encoding='utf-8') as f:
+            json.dump({'versao': VERSAO_MANIFESTO, 'entradas': self.entradas}, f, ensure_ascii=False)
+        os.replace(temporario, self.caminho)
+        self.alterado = False
+
+    @staticmethod
+    def _chave(operacao, arquivo):
+        return f"{operacao}:{os.path.abspath(arquivo)}"
+
+    def consultar(self, operacao, arquivo, parametros=None):
+        """
+        Retorna o registro de um arquivo se ele não mudou desde que foi processado.
+
+        Args:
+            operacao (str): Operação registrada ('conversao', 'consolidacao', ...)
+            arquivo (str): Caminho para o arquivo de entrada
+            parametros (dict, opcional): Parâmetros que influenciam o resultado; o registro
+                só é válido se foi gerado com os mesmos parâmetros
+
+        Returns:
+            dict: Registro com 'saidas' e 'totais', ou None se o arquivo precisa ser processado
+        """
+        chave = self._chave(operacao, arquivo)
+        entrada = self.entradas.get(chave)
+        if entrada is None or entrada.get('parametros') != (parametros or {}):
+            return None
+
+        try:
+            info = os.stat(arquivo)
+        except OSError:
+            return None
+
+        if info.st_size != entrada['tamanho']:
+            return None
+
+        if info.st_mtime_ns != entrada['mtime_ns']:
+            # Data diferente mas mesmo tamanho: confirma pelo conteúdo
+            if calcular_hash(arquivo) != entrada['hash']:
+                return None
+            entrada['mtime_ns'] = info.st_mtime_ns
+
+        # As saídas registradas precisam continuar existindo
+        if any(not os.path.exists(saida) for saida in entrada.get('saidas', [])):
+            return None
+
+        entrada['usado_em'] = time.time()
+        self.alterado = True
+        return entrada
+
+    def registrar(self, operacao, arquivo, saidas=None, totais=None, parametros=None):
+        """
+        Registra o resultado do processamento de um arquivo.
+
+        Args:
+            operacao (str): Operação realizada
+            arquivo (str): Caminho para o arquivo de entrada
+            saidas (list, opcional): Arquivos gerados a partir da entrada
+            totais (dict, opcional): Totais extraídos da entrada (valores serializáveis em JSON)
+            parametros (dict, opcional): Parâmetros usados no processamento
+
+        Returns:
+            dict: Registro criado
+        """
+        info = os.stat(arquivo)
+        agora = time.time()
+        entrada = self.entradas[self._chave(operacao, arquivo)] = {
+            'arquivo': os.path.abspath(arquivo),
+            'tamanho': info.st_size,
+            'mtime_ns': info.st_mtime_ns,
+            'hash': calcular_hash(arquivo),
+            'saidas': [os.path.abspath(saida) for saida in (saidas or [])],
+            'totais': totais or {},
+            'parametros': parametros or {},
+            'registrado_em': agora,
+            'usado_em': agora,
+        }
+        self.alterado = True
+        return entrada
+
+    def mesclar(self, entradas):
+        """
+        Incorpora entradas registradas em outro manifesto (ex: em um processo do pool).
+
+        Args:
+            entradas (dict): Entradas de outro Manifesto
+        """
+        if entradas:
+            self.entradas.update(entradas)
+            self.alterado = True
+
+    def invalidar(self, arquivo=None, operacao=None):
+        """
+        Remove entradas do manifesto, forçando o reprocessamento.
+
+        Args:
+            arquivo (str, opcional): Arquivo de entrada a invalidar (padrão: todos)
+            operacao (str, opcional): Operação a invalidar (padrão: todas)
+
+        Returns:
+            int: Número de entradas removidas
+        """
+        caminho_abs = os.path.abspath(arquivo) if arquivo else None
+        removidas = 0
+        for chave, entrada in list(self.entradas.items()):
+            if operacao is not None and not chave.startswith(f"{operacao}:"):
+                continue
+            if caminho_abs is not None and entrada['arquivo'] != caminho_abs:
+                continue
+            del self.entradas[chave]
+            removidas += 1
+
+        if removidas:
+            self.alterado = True
+        return removidas
+
+    def aplicar_politica(self):
+        """
+        Descarta entradas sem uso há mais de idade_maxima e, se ainda houver mais que
+        max_entradas, as usadas há mais tempo.
+
+        Returns:
+            int: Número de entradas descartadas
+        """
+        antes = len(self.entradas)
+
+        if self.idade_maxima:
+            limite = time.time() - self.idade_maxima
+            self.entradas = {c: e for c, e in self.entradas.items() if e['usado_em'] >= limite}
+
+        if self.max_entradas and len(self.entradas) > self.max_entradas:
+            ordenadas = sorted(self.entradas.items(), key=lambda item: item[1]['usado_em'], reverse=True)
+            self.entradas = dict(ordenadas[:self.max_entradas])
+
+        descartadas = antes - len(self.entradas)
+        if descartadas:
+            self.alterado = True
+        return descartadas
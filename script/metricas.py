@@ -0,0 +1,199 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Medição por etapas da conversão e da consolidação.
+
+Os scripts marcam as etapas do trabalho (leitura, escrita, análise, manifesto...) com
+`with etapa('nome'):` e registram as linhas e bytes de cada arquivo com `contar(...)`.
+Enquanto as métricas não são ativadas, etapa() devolve sempre o mesmo contexto vazio e
+contar() retorna imediatamente, de forma que a instrumentação não tem custo perceptível.
+
+Com as métricas ativas, ao final é emitido um relatório (JSON ou texto) com o tempo de
+cada etapa, os contadores por arquivo e o pico de memória do processo. Também é possível
+executar o trabalho sob o cProfile e gravar as estatísticas para análise com pstats.
+"""
+
+import sys
+import json
+import time
+import pstats
+import cProfile
+import threading
+import contextlib
+
+try:
+    import resource
+except ImportError:  # Windows: o pico de memória não é medido
+    resource = None
+
+FORMATOS = ('json', 'texto')
+
+# Funções listadas ao exibir o resumo do cProfile
+LINHAS_PERFIL = 25
+
+_ativa = None
+_CONTEXTO_VAZIO = contextlib.nullcontext()
+
+def pico_rss_mb():
+    """Retorna o pico de memória (RSS) do processo atual em MB, ou None se não disponível"""
+    # No Linux, VmHWM é o pico do próprio processo; ru_maxrss herda o pico do processo pai
+    try:
+        with open('/proc/self/status', 'r') as f:
+            for linha in f:
+                if linha.startswith('VmHWM:'):
+                    return round(int(linha.split()[1]) / 1024, 1)
+    except OSError:
+        pass
+
+    if resource is None:
+        return None
+    pico = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss é dado em bytes no macOS e em KB nos demais sistemas
+    return round(pico / (1024 * 1024 if sys.platform == 'darwin' else 1024), 1)
+
+class Metricas:
+    """Tempos por etapa e contadores por arquivo de uma execução"""
+
+    def __init__(self):
+        self.inicio = time.perf_counter()
+        self.etapas = {}
+        self.arquivos = {}
+        self._trava = threading.Lock()
+
+    @contextlib.contextmanager
+    def etapa(self, nome):
+        """Mede o tempo do bloco, acumulando-o na etapa `nome`"""
+        inicio = time.perf_counter()
+        try:
+            yield
+        finally:
+            duracao = time.perf_counter() - inicio
+            with self._trava:
+                etapa = self.etapas.setdefault(nome, {'tempo_s': 0.0, 'chamadas': 0})
+                etapa['tempo_s'] += duracao
+                etapa['chamadas'] += 1
+
+    def contar(self, arquivo, **valores):
+        """Soma os valores (linhas, bytes...) aos contadores do arquivo"""
+        with self._trava:
+            contadores = self.arquivos.setdefault(arquivo, {})
+            for nome, valor in valores.items():
+                contadores[nome] = contadores.get(nome, 0) + valor
+
+    def relatorio(self):
+        """
+        Monta o relatório da execução.
+
+        Returns:
+            dict: Duração total, pico de memória, etapas, contadores por arquivo e totais
+        """
+        totais = {}
+        for contadores in self.arquivos.values():
+            for nome, valor in contadores.items():
+                totais[nome] = totais.get(nome, 0) + valor
+
+        return {
+            'duracao_total_s': round(time.perf_counter() - self.inicio, 6),
+            'pico_rss_mb': pico_rss_mb(),
+            'etapas': {nome: {'tempo_s': round(e['tempo_s'], 6), 'chamadas': e['chamadas']}
+                       for nome, e in self.etapas.items()},
+            'arquivos': self.arquivos,
+            'totais': dict(totais, arquivos=len(self.arquivos)),
+        }
+
+def ativa():
+    """Indica se as métricas estão sendo coletadas"""
+    return _ativa is not None
+
+def etapa(nome):
+    """
+    Contexto que mede uma etapa, se as métricas estiverem ativas.
+
+    Args:
+        nome (str): Nome da etapa (ex: 'leitura', 'escrita')
+    """
+    if _ativa is None:
+        return _CONTEXTO_VAZIO
+    return _ativa.etapa(nome)
+
+def contar(arquivo, **valores):
+    """Soma contadores (ex: linhas=10, bytes=2048) a um arquivo, se as métricas estiverem ativas"""
+    if _ativa is not None:
+        _ativa.contar(arquivo, **valores)
+
+def formatar_texto(relatorio):
+    """Formata o relatório de métricas para leitura no terminal"""
+    linhas = ["===== MÉTRICAS =====",
+              f"Duração total: {relatorio['duracao_total_s']:.3f}s",
+              f"Pico de memória: {relatorio['pico_rss_mb']} MB",
+              "Etapas:"]
+    for nome, etapa_ in sorted(relatorio['etapas'].items(), key=lambda item: -item[1]['tempo_s']):
+        linhas.append(f"  - {nome}: {etapa_['tempo_s']:.3f}s ({etapa_['chamadas']} vez(es))")
+    linhas.append("Totais: " + ", ".join(f"{nome}={valor:.3f}" if isinstance(valor, float) else f"{nome}={valor}"
+                                         for nome, valor in relatorio['totais'].items()))
+    return "\n".join(linhas)
+
+def emitir_relatorio(relatorio, formato='json', arquivo_saida=None):
+    """
+    Emite o relatório de métricas.
+
+    Args:
+        relatorio (dict): Relatório gerado por Metricas.relatorio
+        formato (str, opcional): 'json' (padrão) ou 'texto'
+        arquivo_saida (str, opcional): Arquivo do relatório (padrão: saída de erro, para
+            não se misturar às mensagens do script)
+    """
+    if formato == 'json':
+        texto = json.dumps(relatorio, ensure_ascii=False, indent=2)
+    else:
+        texto = formatar_texto(relatorio)
+
+    if arquivo_saida:
+        with open(arquivo_saida, 'w', encoding='utf-8') as f:
+            f.write(texto + "\n")
+        print(f"Métricas gravadas em '{arquivo_saida}'.")
+    else:
+        print(texto, file=sys.stderr)
+
+def adicionar_argumentos(parser):
+    """Adiciona a um parser de linha de comando as opções --metricas, --metricas-saida e --perfil"""
+    parser.add_argument('--metricas', '--metrics', choices=FORMATOS,
+                        help="Emite ao final o tempo de cada etapa, linhas e bytes por arquivo e o pico de memória")
+    parser.add_argument('--metricas-saida', metavar='ARQUIVO',
+                        help="Arquivo do relatório de métricas (padrão: saída de erro)")
+    parser.add_argument('--perfil', '--profile', metavar='ARQUIVO',
+                        help="Executa sob o cProfile e grava as estatísticas no arquivo (ver: python -m pstats)")
+
+@contextlib.contextmanager
+def medir(formato=None, arquivo_saida=None, perfil=None):
+    """
+    Coleta as métricas e/ou executa o cProfile durante o bloco, emitindo os resultados ao final.
+
+    Sem formato nem perfil, o bloco é executado sem nenhuma medição.
+
+    Args:
+        formato (str, opcional): 'json' ou 'texto' ativa as métricas
+        arquivo_saida (str, opcional): Arquivo do relatório de métricas
+        perfil (str, opcional): Arquivo onde gravar as estatísticas do cProfile
+    """
+    global _ativa
+
+    if formato:
+        _ativa = Metricas()
+    perfilador = None
+    if perfil:
+        perfilador = cProfile.Profile()
+        perfilador.enable()
+
+    try:
+        yield
+    finally:
+        if perfilador is not None:
+            perfilador.disable()
+            perfilador.dump_stats(perfil)
+            pstats.Stats(perfilador, stream=sys.stderr).sort_stats('cumulative').print_stats(LINHAS_PERFIL)
+            print(f"Perfil gravado em '{perfil}' (use: python -m pstats {perfil}).")
+        if formato:
+            metricas, _ativa = _ativa, None
+            emitir_relatorio(metricas.relatorio(), formato, arquivo_saida)
@@ -0,0 +1,369 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Monitora uma pasta de relatórios em Excel, convertendo os arquivos novos ou alterados e
+mantendo o consolidado atualizado.
+
+As mudanças são detectadas pelo pacote watchdog (inotify no Linux), se instalado, ou por
+varredura periódica das datas de modificação. Um arquivo só é processado depois de ficar
+alguns segundos sem mudar de tamanho nem de data, para não ler arquivos ainda sendo copiados.
+
+Arquivos novos são acrescentados ao final do consolidado, com a linha do Total Geral
+regravada, sem reler os demais relatórios. Se um arquivo já consolidado for alterado,
+apagado ou renomeado, o consolidado é reconstruído a partir dos CSVs (um arquivo renomeado
+volta a ser incluído com o novo nome).
+"""
+
+import os
+import sys
+import time
+import queue
+import fnmatch
+import argparse
+from decimal import Decimal
+from manifesto import Manifesto, NOME_MANIFESTO_PADRAO
+from conversor_streaming import MOTORES, MOTOR_PANDAS
+import dialetos
+from xls_to_csv_interface import converter_xls_para_csv
+from processar_csv_final_ajustado import (consolidar_arquivo, somar_totais, formatar_total_geral,
+                                          LINHA_TOTAL_GERAL, LINHAS_CABECALHO)
+
+PADRAO_ARQUIVOS = '*.xls*'
+
+# Segundos entre as varreduras da pasta (e entre as verificações dos arquivos pendentes)
+INTERVALO_PADRAO = 1.0
+# Segundos que um arquivo precisa ficar sem mudanças antes de ser processado
+ESPERA_PADRAO = 2.0
+
+def _assinatura(arquivo):
+    """Tamanho e data de modificação do arquivo, ou None se ele não existir mais"""
+    try:
+        info = os.stat(arquivo)
+    except OSError:
+        return None
+    return (info.st_size, info.st_mtime_ns)
+
+class ConsolidadoIncremental:
+    """
+    Consolidado mantido em disco e atualizado à medida que novos relatórios chegam.
+
+    O conteúdo é o mesmo gerado pelo processar_csv_final_ajustado.py (cabeçalho do primeiro
+    relatório, linhas de dados de cada relatório e a linha do Total Geral), com os relatórios
+    na ordem em que foram adicionados.
+    """
+
+    def __init__(self, arquivo_saida):
+        """
+        Args:
+            arquivo_saida (str): Caminho para o arquivo consolidado
+        """
+        self.arquivo_saida = arquivo_saida
+        self.totais = {}
+        self.cabecalho_gravado = False
+        self.fim_dados = None
+
+    @property
+    def soma_total(self):
+        return sum(self.totais.values(), Decimal('0'))
+
+    def _acrescentar(self, f_saida, arquivo):
+        """Grava as linhas de um relatório no consolidado aberto e guarda o total dele"""
+        resultado = consolidar_arquivo(arquivo, f_saida, None if self.cabecalho_gravado else f_saida)
+        if len(resultado.cabecalho) == LINHAS_CABECALHO:
+            self.cabecalho_gravado = True
+
+        valor = Decimal('0')
+        if resultado.linhas_dados:
+            valor = somar_totais(resultado.totais_convenio, resultado.total_relatorio)
+        self.totais[arquivo] = valor
+        return valor
+
+    def _gravar_total(self, f_saida):
+        f_saida.flush()
+        self.fim_dados = f_saida.tell()
+        f_saida.write(LINHA_TOTAL_GERAL.format(valor=formatar_total_geral(self.soma_total)))
+
+    def reconstruir(self, arquivos):
+        """
+        Regrava o consolidado inteiro a partir dos CSVs.
+
+        Args:
+            arquivos (list): CSVs dos relatórios, na ordem do consolidado
+        """
+        self.totais = {}
+        self.cabecalho_gravado = False
+
+        arquivo_temporario = f"{self.arquivo_saida}.tmp"
+        with open(arquivo_temporario, 'w', encoding='utf-8') as f_saida:
+            for arquivo in arquivos:
+                self._acrescentar(f_saida, arquivo)
+            self._gravar_total(f_saida)
+        os.replace(arquivo_temporario, self.arquivo_saida)
+
+    def atualizar(self, arquivo):
+        """
+        Inclui no consolidado um relatório novo ou alterado.
+
+        Args:
+            arquivo (str): CSV do relatório
+
+        Returns:
+            Decimal: Total do relatório
+        """
+        # Relatório já consolidado (ou consolidado ausente): reconstrói com a nova versão
+        if arquivo in self.totais or self.fim_dados is None or not os.path.isfile(self.arquivo_saida):
+            self.reconstruir([a for a in self.totais if a != arquivo] + [arquivo])
+            return self.totais[arquivo]
+
+        # Relatório novo: substitui a linha do Total Geral pelas linhas dele e pelo novo total
+        with open(self.arquivo_saida, 'r+', encoding='utf-8') as f_saida:
+            f_saida.seek(self.fim_dados)
+            f_saida.truncate()
+            valor = self._acrescentar(f_saida, arquivo)
+            self._gravar_total(f_saida)
+        return valor
+
+    def remover(self, arquivo):
+        """
+        Retira do consolidado um relatório cujo arquivo foi apagado ou renomeado.
+
+        Args:
+            arquivo (str): CSV do relatório
+
+        Returns:
+            Decimal: Total do relatório retirado, ou None se ele não estava no consolidado
+        """
+        if arquivo not in self.totais:
+            return None
+        valor = self.totais[arquivo]
+        self.reconstruir([a for a in self.totais if a != arquivo])
+        return valor
+
+class MonitorPasta:
+    """Detecta arquivos novos, alterados ou removidos em uma pasta, por eventos do watchdog ou por varredura"""
+
+    def __init__(self, pasta, padrao=PADRAO_ARQUIVOS, intervalo=INTERVALO_PADRAO, espera=ESPERA_PADRAO, usar_eventos=True):
+        """
+        Args:
+            pasta (str): Pasta monitorada
+            padrao (str, opcional): Padrão do nome dos arquivos (padrão: '*.xls*')
+            intervalo (float, opcional): Segundos entre as verificações
+            espera (float, opcional): Segundos sem mudanças até o arquivo ser considerado pronto
+            usar_eventos (bool, opcional): Usa o watchdog, se instalado (padrão: True)
+        """
+        self.pasta = pasta
+        self.padrao = padrao
+        self.intervalo = intervalo
+        self.espera = espera
+        self.vistos = {}
+        self.pendentes = {}
+        self.eventos = None
+        self.observador = None
+
+        if usar_eventos:
+            self._iniciar_watchdog()
+
+    def _iniciar_watchdog(self):
+        try:
+            from watchdog.observers import Observer
+            from watchdog.events import FileSystemEventHandler
+        except ImportError:
+            return
+
+        eventos = queue.Queue()
+
+        class Tratador(FileSystemEventHandler):
+            def on_any_event(self, evento):
+                if not evento.is_directory:
+                    # Em uma renomeação, o nome antigo sai do consolidado e o novo entra
+                    eventos.put(evento.src_path)
+                    if getattr(evento, 'dest_path', None):
+                        eventos.put(evento.dest_path)
+
+        self.observador = Observer()
+        self.observador.schedule(Tratador(), self.pasta, recursive=False)
+        self.observador.start()
+        self.eventos = eventos
+
+    @property
+    def modo(self):
+        return 'eventos (watchdog)' if self.observador is not None else 'varredura'
+
+    def _aceita(self, arquivo):
+        nome = os.path.basename(arquivo)
+        # '~$' são os arquivos de bloqueio criados pelo Excel enquanto o arquivo está aberto
+        return fnmatch.fnmatch(nome, self.padrao) and not nome.startswith('~$')
+
+    def arquivos_atuais(self):
+        """Lista os arquivos da pasta que casam com o padrão, em ordem de nome"""
+        return sorted(os.path.join(self.pasta, nome) for nome in os.listdir(self.pasta)
+                      if self._aceita(nome) and os.path.isfile(os.path.join(self.pasta, nome)))
+
+    def marcar_vistos(self, arquivos):
+        """Registra o estado atual dos arquivos, que não serão tratados como novos"""
+        for arquivo in arquivos:
+            self.vistos[arquivo] = _assinatura(arquivo)
+
+    def _candidatos(self):
+        """Arquivos que podem ter mudado (ou deixado de existir) desde a última verificação"""
+        if self.eventos is None:
+            # Na varredura, os arquivos já vistos que sumiram da listagem também são verificados
+            return sorted(set(self.arquivos_atuais()) | set(self.vistos))
+
+        candidatos = set()
+        while True:
+            try:
+                candidatos.add(os.path.abspath(self.eventos.get_nowait()))
+            except queue.Empty:
+                break
+        pasta = os.path.abspath(self.pasta)
+        return [os.path.join(self.pasta, os.path.basename(c)) for c in candidatos
+                if os.path.dirname(c) == pasta and self._aceita(c)]
+
+    def verificar(self):
+        """
+        Verifica a pasta e retorna os arquivos que mudaram e já estão estáveis, e os que foram
+        apagados ou renomeados.
+
+        Returns:
+            tuple: (arquivos prontos para processamento, arquivos removidos), em ordem de nome
+        """
+        agora = time.monotonic()
+        removidos = []
+        for arquivo in self._candidatos():
+            assinatura = _assinatura(arquivo)
+            if assinatura is None:
+                if arquivo in self.vistos:
+                    del self.vistos[arquivo]
+                    removidos.append(arquivo)
+            elif assinatura != self.vistos.get(arquivo):
+                anterior = self.pendentes.get(arquivo)
+                if anterior is None or anterior[0] != assinatura:
+                    self.pendentes[arquivo] = (assinatura, agora)
+
+        prontos = []
+        for arquivo, (assinatura, desde) in list(self.pendentes.items()):
+            atual = _assinatura(arquivo)
+            if atual is None:
+                del self.pendentes[arquivo]
+            elif atual != assinatura:
+                # Ainda sendo gravado: reinicia a espera
+                self.pendentes[arquivo] = (atual, agora)
+            elif agora - desde >= self.espera:
+                del self.pendentes[arquivo]
+                self.vistos[arquivo] = atual
+                prontos.append(arquivo)
+        return sorted(prontos), sorted(removidos)
+
+    def parar(self):
+        if self.observador is not None:
+            self.observador.stop()
+            self.observador.join()
+
+def _caminho_csv(arquivo, destino):
+    nome_base = os.path.splitext(os.path.basename(arquivo))[0]
+    return os.path.join(destino, f"{nome_base}.csv")
+
+def monitorar(pasta, destino=None, arquivo_saida=None, padrao=PADRAO_ARQUIVOS, intervalo=INTERVALO_PADRAO,
+              espera=ESPERA_PADRAO, motor=MOTOR_PANDAS, manifesto=None, usar_eventos=True, dialeto=None):
+    """
+    Monitora a pasta até ser interrompido (Ctrl+C).
+
+    Args:
+        pasta (str): Pasta dos relatórios em Excel
+        destino (str, opcional): Pasta dos CSVs gerados (padrão: a própria pasta monitorada)
+        arquivo_saida (str, opcional): Arquivo consolidado (padrão: consolidado.csv no destino)
+        padrao (str, opcional): Padrão do nome dos arquivos monitorados (padrão: '*.xls*')
+        intervalo (float, opcional): Segundos entre as verificações
+        espera (float, opcional): Segundos sem mudanças até o arquivo ser processado
+        motor (str, opcional): Motor de conversão ('pandas' ou 'streaming')
+        manifesto (Manifesto, opcional): Manifesto das conversões já realizadas
+        usar_eventos (bool, opcional): Usa o watchdog, se instalado (padrão: True)
+        dialeto (Dialeto, opcional): Formato dos CSVs gerados (padrão: o CSV gerado pelo pandas)
+    """
+    destino = destino or pasta
+    os.makedirs(destino, exist_ok=True)
+    arquivo_saida = arquivo_saida or os.path.join(destino, 'consolidado.csv')
+
+    monitor = MonitorPasta(pasta, padrao, intervalo, espera, usar_eventos)
+    consolidado = ConsolidadoIncremental(arquivo_saida)
+
+    def converter(arquivo):
+        saida = _caminho_csv(arquivo, destino)
+        if converter_xls_para_csv(arquivo, saida, motor=motor, manifesto=manifesto, dialeto=dialeto):
+            return saida
+        return None
+
+    # Situação inicial: converte o que mudou desde a última execução e monta o consolidado
+    arquivos = monitor.arquivos_atuais()
+    monitor.marcar_vistos(arquivos)
+    csvs = [saida for saida in map(converter, arquivos) if saida]
+    consolidado.reconstruir(csvs)
+    if manifesto is not None:
+        manifesto.salvar()
+
+    print(f"\nConsolidado '{arquivo_saida}' com {len(csvs)} relatório(s). "
+          f"Total Geral: {formatar_total_geral(consolidado.soma_total)}")
+    print(f"Monitorando '{pasta}' ({monitor.modo}). Pressione Ctrl+C para encerrar.")
+
+    try:
+        while True:
+            time.sleep(intervalo)
+            prontos, removidos = monitor.verificar()
+            for arquivo in removidos:
+                valor = consolidado.remover(_caminho_csv(arquivo, destino))
+                if valor is not None:
+                    print(f"\nArquivo removido ou renomeado: {arquivo}")
+                    print(f"Total retirado: {valor}; Total Geral: {formatar_total_geral(consolidado.soma_total)}")
+            for arquivo in prontos:
+                print(f"\nArquivo novo ou alterado: {arquivo}")
+                saida = converter(arquivo)
+                if saida is None:
+                    continue
+                valor = consolidado.atualizar(saida)
+                print(f"Total do arquivo {os.path.basename(arquivo)}: {valor}; "
+                      f"Total Geral: {formatar_total_geral(consolidado.soma_total)}")
+                if manifesto is not None:
+                    manifesto.salvar()
+    except KeyboardInterrupt:
+        print("\nMonitoramento encerrado.")
+    finally:
+        monitor.parar()
+
+def criar_parser_argumentos():
+    """Cria o parser dos argumentos de linha de comando"""
+    parser = argparse.ArgumentParser(
+        description="Monitora uma pasta de relatórios em Excel, convertendo e consolidando os arquivos novos.")
+    parser.add_argument('pasta', help="Pasta dos relatórios em Excel")
+    parser.add_argument('--destino', help="Pasta dos CSVs gerados (padrão: a pasta monitorada)")
+    parser.add_argument('--saida', help="Arquivo consolidado (padrão: consolidado.csv no destino)")
+    parser.add_argument('--padrao', default=PADRAO_ARQUIVOS, help=f"Padrão dos arquivos (padrão: {PADRAO_ARQUIVOS})")
+    parser.add_argument('--motor', choices=MOTORES, default=MOTOR_PANDAS, help="Motor de conversão (padrão: pandas)")
+    parser.add_argument('--intervalo', type=float, default=INTERVALO_PADRAO,
+                        help=f"Segundos entre as verificações (padrão: {INTERVALO_PADRAO})")
+    parser.add_argument('--espera', type=float, default=ESPERA_PADRAO,
+                        help=f"Segundos sem mudanças antes de processar um arquivo (padrão: {ESPERA_PADRAO})")
+    parser.add_argument('--varredura', action='store_true', help="Usa varredura periódica mesmo com o watchdog instalado")
+    parser.add_argument('--manifesto', metavar='ARQUIVO',
+                        help=f"Manifesto das conversões (padrão: '{NOME_MANIFESTO_PADRAO}' no destino)")
+    dialetos.adicionar_argumentos(parser)
+    return parser
+
+if __name__ == "__main__":
+    args = criar_parser_argumentos().parse_args()
+
+    if not os.path.isdir(args.pasta):
+        print(f"Erro: A pasta '{args.pasta}' não existe.")
+        sys.exit(1)
+
+    try:
+        dialeto = dialetos.dialeto_dos_argumentos(args)
+    except ValueError as e:
+        print(f"Erro: {str(e)}")
+        sys.exit(1)
+
+    destino = args.destino or args.pasta
+    manifesto = Manifesto(args.manifesto or os.path.join(destino, NOME_MANIFESTO_PADRAO))
+    monitorar(args.pasta, destino, args.saida, args.padrao, args.intervalo, args.espera,
+              args.motor, manifesto, not args.varredura, dialeto)
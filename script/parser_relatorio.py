@@ -0,0 +1,232 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Analisador do relatório "Demonstrativo de Produtividade" (repasse).
+
+O relatório tem o seguinte formato, em CSV separado por ';' (valores com vírgula decimal)
+ou por ',' (valores com ponto decimal, como gravado pelo conversor):
+
+    Usuário Geração: ...;"REPASSE
+    DEMONSTRATIVO DE PRODUTIVIDADE";Impressão: ...;Página...;Empresa...;Período: 01/04/2025 à 30/04/2025
+    Profissional: ANNE MICHELLE COLONO;;;;;
+    Convênio: ASSEFAZ;Cód.Ate;Data;Paciente;Procedimento;Repasse
+    120217 ;13/11/2024;LARISSA ...;COLONOSCOPIA ...;170,95;
+    Total Procedimentos:;1;Total ASSEFAZ:;170,95;;
+    ...
+    Total Procedimentos:;5;Total:;1.024,27;"_____
+    ANNE MICHELLE COLONO";
+
+O arquivo é lido uma única vez, por uma máquina de estados que reconhece o cabeçalho, o
+profissional, cada bloco de convênio, as linhas de procedimento e as linhas de total, e
+gera registros estruturados com os valores em Decimal.
+"""
+
+import os
+import re
+import csv
+import itertools
+from collections import namedtuple, deque
+from decimal import Decimal, InvalidOperation
+import compressao
+
+# Registros gerados pelo analisador
+Cabecalho = namedtuple('Cabecalho', 'campos periodo_inicio periodo_fim')
+Profissional = namedtuple('Profissional', 'nome')
+Convenio = namedtuple('Convenio', 'nome')
+Procedimento = namedtuple('Procedimento', 'profissional convenio codigo data paciente procedimento repasse')
+TotalConvenio = namedtuple('TotalConvenio', 'profissional convenio quantidade valor')
+TotalRelatorio = namedtuple('TotalRelatorio', 'profissional quantidade valor')
+Outro = namedtuple('Outro', 'campos')
+
+_RE_PROFISSIONAL = re.compile(r'^\s*Profissional:\s*(.*?)\s*$')
+_RE_CONVENIO = re.compile(r'^\s*Conv[êe]nio:\s*(.*?)\s*$')
+_RE_TOTAL = re.compile(r'^\s*Total\s*(.*?)\s*:\s*$')
+_RE_CODIGO = re.compile(r'^\s*\d+\s*$')
+_RE_PERIODO = re.compile(r'Per[íi]odo:\s*(\d{2}/\d{2}/\d{4})\s*\S*\s*(\d{2}/\d{2}/\d{4})')
+_RE_NAO_NUMERICO = re.compile(r'[^\d,.\-]')
+
+TOTAL_PROCEDIMENTOS = 'Total Procedimentos:'
+
+# Última linha dos arquivos gerados a partir dos relatórios, que não são relatórios: o
+# consolidado ('Total Geral de Todos os Arquivos:;;Total:;2759,63;') e cada partição
+# ('Subtotal ASSEFAZ:;1 procedimento(s);Total:;170,95;')
+TOTAL_GERAL = 'Total Geral de Todos os Arquivos:'
+_RE_SUBTOTAL_PARTICAO = re.compile(r'^Subtotal .*:[;,]\d+ procedimento\(s\)[;,]')
+
+# Bytes lidos do fim do arquivo para encontrar a última linha
+TAMANHO_FINAL = 4096
+
+def detectar_delimitador(primeira_linha):
+    """
+    Detecta o delimitador do relatório pela primeira linha.
+
+    Args:
+        primeira_linha (str): Primeira linha do arquivo
+
+    Returns:
+        str: ';' (formato do sistema de origem) ou ',' (formato gravado pelo pandas)
+    """
+    return ';' if ';' in primeira_linha else ','
+
+def eh_saida_gerada(arquivo):
+    """
+    Indica se um CSV é um consolidado ou uma partição gerados pelos scripts, e não um relatório.
+
+    Esses arquivos costumam ficar na mesma pasta dos relatórios; incluídos como entrada,
+    as linhas de total deles seriam somadas de novo. São reconhecidos pela última linha (ver
+    TOTAL_GERAL), lida do fim do arquivo (os comprimidos são lidos até o fim).
+
+    Args:
+        arquivo (str): Caminho do CSV (pode estar comprimido, ver compressao.py)
+
+    Returns:
+        bool: True se a última linha é a do Total Geral ou a do subtotal de uma partição
+    """
+    try:
+        with compressao.abrir_arquivo(arquivo, 'rb') as f:
+            if compressao.formato_compressao(arquivo) is None:
+                f.seek(max(0, os.fstat(f.fileno()).st_size - TAMANHO_FINAL))
+                final = f.read()
+            else:
+                final = b''.join(deque(iter(lambda: f.read(TAMANHO_FINAL), b''), maxlen=2))
+    except (OSError, EOFError):
+        return False
+    linhas = [linha for linha in final.decode('utf-8', errors='replace').splitlines() if linha.strip()]
+    if not linhas:
+        return False
+    ultima = linhas[-1].lstrip('\ufeff')
+    return ultima.startswith(TOTAL_GERAL) or _RE_SUBTOTAL_PARTICAO.match(ultima) is not None
+
+def separador_decimal(delimitador):
+    """Retorna o separador decimal usado pelos valores no formato de cada delimitador"""
+    return ',' if delimitador == ';' else '.'
+
+def converter_valor(texto, decimal=','):
+    """
+    Converte um valor monetário do relatório para Decimal.
+
+    Args:
+        texto (str): Valor como aparece no relatório (ex: '1.024,27' ou '1024.27')
+        decimal (str, opcional): Separador decimal (padrão: ',')
+
+    Returns:
+        Decimal: Valor convertido, ou None se o texto não for um número
+    """
+    texto = _RE_NAO_NUMERICO.sub('', texto)
+    if decimal == ',':
+        texto = texto.replace('.', '').replace(',', '.')
+    else:
+        texto = texto.replace(',', '')
+    if not texto:
+        return None
+    try:
+        return Decimal(texto)
+    except InvalidOperation:
+        return None
+
+def _converter_quantidade(texto, decimal):
+    valor = converter_valor(texto, decimal)
+    return int(valor) if valor is not None else None
+
+def analisar_registros(linhas_campos, decimal=','):
+    """
+    Classifica as linhas do relatório, já separadas em campos, em registros estruturados.
+
+    Gera exatamente um registro por linha, na ordem de leitura, sem ler linhas à frente.
+
+    Args:
+        linhas_campos (iterable): Linhas do relatório como listas de campos (str)
+        decimal (str, opcional): Separador decimal dos valores (padrão: ',')
+
+    Yields:
+        namedtuple: Cabecalho, Profissional, Convenio, Procedimento, TotalConvenio,
+            TotalRelatorio ou Outro
+    """
+    profissional = None
+    convenio = None
+
+    for campos in linhas_campos:
+        primeiro = campos[0].strip() if campos else ''
+
+        m = _RE_PROFISSIONAL.match(primeiro)
+        if m:
+            profissional = m.group(1)
+            convenio = None
+            yield Profissional(profissional)
+            continue
+
+        m = _RE_CONVENIO.match(primeiro)
+        if m:
+            convenio = m.group(1)
+            yield Convenio(convenio)
+            continue
+
+        # Linhas de total: 'Total Procedimentos:;N;Total <convênio>:;valor' ou '...;Total:;valor'
+        registro = None
+        for j, campo in enumerate(campos[:-1]):
+            m = _RE_TOTAL.match(campo)
+            if not m or campo.strip() == TOTAL_PROCEDIMENTOS:
+                continue
+            valor = converter_valor(campos[j + 1], decimal)
+            if valor is None:
+                continue
+            quantidade = None
+            if primeiro == TOTAL_PROCEDIMENTOS and len(campos) > 1:
+                quantidade = _converter_quantidade(campos[1], decimal)
+            if m.group(1):
+                registro = TotalConvenio(profissional, m.group(1), quantidade, valor)
+                convenio = None
+            else:
+                registro = TotalRelatorio(profissional, quantidade, valor)
+            break
+        if registro is not None:
+            yield registro
+            continue
+
+        # Linhas de procedimento: Cód.Ate;Data;Paciente;Procedimento;Repasse
+        if convenio is not None and len(campos) >= 5 and _RE_CODIGO.match(primeiro):
+            yield Procedimento(profissional, convenio, primeiro, campos[1].strip(), campos[2].strip(),
+                               campos[3].strip(), converter_valor(campos[4], decimal))
+            continue
+
+        for campo in campos:
+            m = _RE_PERIODO.search(campo)
+            if m:
+                yield Cabecalho(campos, m.group(1), m.group(2))
+                break
+        else:
+            yield Outro(campos)
+
+def analisar_linhas(linhas, delimitador=None):
+    """
+    Analisa as linhas de texto de um relatório em uma única passagem.
+
+    Campos entre aspas que ocupam mais de uma linha (como o título do relatório) são
+    tratados corretamente; cada registro vem acompanhado das linhas de texto que o formam.
+
+    Args:
+        linhas (iterable): Linhas de texto do relatório (ex: um arquivo aberto)
+        delimitador (str, opcional): Delimitador dos campos (padrão: detectado na primeira linha)
+
+    Yields:
+        tuple: (registro, linhas_de_texto)
+    """
+    linhas = iter(linhas)
+    primeira = next(linhas, None)
+    if primeira is None:
+        return
+    if delimitador is None:
+        delimitador = detectar_delimitador(primeira)
+
+    brutas = []
+
+    def alimentar():
+        for linha in itertools.chain([primeira], linhas):
+            brutas.append(linha)
+            yield linha
+
+    leitor = csv.reader(alimentar(), delimiter=delimitador)
+    for registro in analisar_registros(leitor, separador_decimal(delimitador)):
+        yield registro, list(brutas)
+        brutas.clear()
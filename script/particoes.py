@@ -0,0 +1,276 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Divisão da consolidação em arquivos por convênio, por profissional ou por mês.
+
+Durante a leitura dos relatórios (ver processar_csv_final_ajustado.py), cada procedimento
+é encaminhado ao arquivo da sua partição, na mesma passagem que grava o consolidado. Cada
+partição recebe o cabeçalho do primeiro relatório, as linhas 'Profissional:' e 'Convênio:'
+que dão contexto aos procedimentos e, ao final, uma linha de subtotal:
+
+    Subtotal ASSEFAZ:;12 procedimento(s);Total:;2051,40;
+
+As partições ficam no formato do sistema de origem (';' e vírgula decimal): as linhas dos
+relatórios gravados pelo conversor (',' e ponto decimal) são convertidas ao serem copiadas.
+Por padrão, são gravadas em um subdiretório ao lado do consolidado ('consolidado_particoes'),
+fora da pasta dos relatórios.
+
+Os arquivos abertos ficam em um cache LRU limitado: ao passar do limite, o arquivo usado há
+mais tempo é fechado e reaberto para acréscimo quando a partição voltar a aparecer, de forma
+que milhares de partições não esgotam os descritores de arquivo do processo.
+"""
+
+import io
+import os
+import re
+import csv
+import datetime
+from collections import OrderedDict
+from decimal import Decimal
+import compressao
+from dialetos import DIALETO_SISTEMA, formatar_numero
+from parser_relatorio import detectar_delimitador, Profissional, Convenio, Procedimento
+
+CHAVE_CONVENIO = 'convenio'
+CHAVE_PROFISSIONAL = 'profissional'
+CHAVE_MES = 'mes'
+CHAVES = (CHAVE_CONVENIO, CHAVE_PROFISSIONAL, CHAVE_MES)
+
+# Arquivos de partição mantidos abertos ao mesmo tempo
+MAX_ABERTOS_PADRAO = 128
+
+# Partições listadas no resumo final
+MAX_LISTADAS = 20
+
+# Quantidade de linhas do cabeçalho do relatório, copiado no início de cada partição
+LINHAS_CABECALHO = 3
+
+# Partição dos procedimentos sem o campo da chave (ex: data inválida na divisão por mês)
+SEM_CHAVE = 'sem_identificacao'
+
+# Sufixo do subdiretório padrão das partições (ex: 'consolidado_particoes')
+SUFIXO_DIRETORIO = '_particoes'
+
+# Valores com ponto decimal nas linhas dos relatórios gravados pelo conversor (ex: '204.84')
+_RE_VALOR_PONTO = re.compile(r'^-?\d+\.\d+$')
+
+# Linha final de cada partição
+LINHA_SUBTOTAL = "\nSubtotal {particao}:;{quantidade} procedimento(s);Total:;{valor};\n"
+
+def chave_procedimento(procedimento, chave):
+    """
+    Calcula a partição de um procedimento.
+
+    Args:
+        procedimento (Procedimento): Registro gerado pelo parser_relatorio
+        chave (str): 'convenio', 'profissional' ou 'mes'
+
+    Returns:
+        str: Nome da partição (ex: 'ASSEFAZ', 'ANNE MICHELLE COLONO' ou '2024-11')
+    """
+    if chave == CHAVE_MES:
+        try:
+            return datetime.datetime.strptime(procedimento.data, '%d/%m/%Y').strftime('%Y-%m')
+        except (TypeError, ValueError):
+            return SEM_CHAVE
+    valor = procedimento.convenio if chave == CHAVE_CONVENIO else procedimento.profissional
+    return valor or SEM_CHAVE
+
+class _Particao:
+    """Estado de uma partição: arquivo, subtotal e o contexto já gravado"""
+
+    def __init__(self, nome, caminho):
+        self.nome = nome
+        self.caminho = caminho
+        self.quantidade = 0
+        self.valor = Decimal('0')
+        self.criada = False
+        # Linhas 'Profissional:' e 'Convênio:' gravadas por último, repetidas quando mudam
+        self.profissional = None
+        self.convenio = None
+
+class EscritorParticoes:
+    """
+    Grava os procedimentos dos relatórios em um arquivo por partição.
+
+    Usado como gerenciador de contexto; ao sair, grava o subtotal de cada partição e fecha
+    os arquivos.
+    """
+
+    def __init__(self, arquivo_saida, chave, diretorio=None, max_abertos=MAX_ABERTOS_PADRAO):
+        """
+        Args:
+            arquivo_saida (str): Consolidado; as partições recebem o seu nome mais o da partição
+                (ex: 'consolidado_ASSEFAZ.csv'), com a mesma compressão (ver compressao.py)
+            chave (str): 'convenio', 'profissional' ou 'mes'
+            diretorio (str, opcional): Diretório das partições (padrão: o subdiretório
+                '<nome do consolidado>_particoes' ao lado do consolidado)
+            max_abertos (int, opcional): Arquivos de partição abertos ao mesmo tempo
+        """
+        if chave not in CHAVES:
+            raise ValueError(f"Chave de partição inválida: {chave} (use {', '.join(CHAVES)})")
+        if max_abertos < 1:
+            raise ValueError("O limite de arquivos abertos deve ser pelo menos 1.")
+        self.chave = chave
+        self.max_abertos = max_abertos
+        nome_saida = compressao.remover_extensao_compressao(os.path.basename(arquivo_saida))
+        self._base, extensao = os.path.splitext(nome_saida)
+        self._extensao = extensao + arquivo_saida[len(compressao.remover_extensao_compressao(arquivo_saida)):]
+        self.diretorio = diretorio or os.path.join(os.path.dirname(arquivo_saida) or '.', self._base + SUFIXO_DIRETORIO)
+        os.makedirs(self.diretorio, exist_ok=True)
+        self.particoes = {}
+        self.reaberturas = 0
+        self._caminhos = set()
+        self._abertos = OrderedDict()
+        self._cabecalho = None
+        self._cabecalho_arquivo = []
+        self._profissional = None
+        self._convenio = None
+        self._delimitador = None
+
+    def iniciar_arquivo(self, arquivo):
+        """Registra o início de um novo relatório (o contexto do anterior não vale mais)"""
+        self._cabecalho_arquivo = []
+        self._profissional = None
+        self._convenio = None
+        self._delimitador = None
+
+    def _converter(self, linhas):
+        """
+        Converte as linhas de um registro para o formato das partições (';' e vírgula decimal).
+
+        Returns:
+            list: As próprias linhas, se o relatório já está nesse formato, ou uma linha de
+                texto por linha do CSV
+        """
+        if self._delimitador == DIALETO_SISTEMA.delimitador:
+            return linhas
+        saida = io.StringIO()
+        escritor = csv.writer(saida, delimiter=DIALETO_SISTEMA.delimitador, lineterminator='\n')
+        convertidas = []
+        for campos in csv.reader(io.StringIO(''.join(linhas)), delimiter=self._delimitador):
+            escritor.writerow([formatar_numero(Decimal(campo.strip()), DIALETO_SISTEMA)
+                               if _RE_VALOR_PONTO.match(campo.strip()) else campo for campo in campos])
+            convertidas.append(saida.getvalue())
+            saida.seek(0)
+            saida.truncate()
+        return convertidas
+
+    def receber(self, registro, linhas):
+        """
+        Recebe um registro do relatório com as linhas de texto que o formam.
+
+        Os procedimentos são gravados na sua partição; os demais registros só atualizam o
+        contexto (cabeçalho, profissional e convênio atuais).
+
+        Args:
+            registro (namedtuple): Registro gerado pelo parser_relatorio
+            linhas (list): Linhas de texto do registro
+        """
+        if self._delimitador is None and linhas:
+            self._delimitador = detectar_delimitador(linhas[0])
+        if len(self._cabecalho_arquivo) < LINHAS_CABECALHO:
+            self._cabecalho_arquivo.extend(linhas[:LINHAS_CABECALHO - len(self._cabecalho_arquivo)])
+            if self._cabecalho is None and len(self._cabecalho_arquivo) == LINHAS_CABECALHO:
+                self._cabecalho = self._converter(self._cabecalho_arquivo)
+
+        if isinstance(registro, Profissional):
+            self._profissional = self._converter(linhas)
+            self._convenio = None
+        elif isinstance(registro, Convenio):
+            self._convenio = self._converter(linhas)
+        elif isinstance(registro, Procedimento):
+            self._gravar(registro, self._converter(linhas))
+
+    def _gravar(self, procedimento, linhas):
+        """Grava um procedimento na sua partição, repetindo o contexto se ele mudou"""
+        nome = chave_procedimento(procedimento, self.chave)
+        particao = self.particoes.get(nome)
+        if particao is None:
+            particao = self.particoes[nome] = _Particao(nome, self._caminho_particao(nome))
+
+        f = self._abrir(particao)
+        if self._profissional is not None and particao.profissional is not self._profissional:
+            f.writelines(self._profissional)
+            particao.profissional = self._profissional
+            particao.convenio = None
+        if self._convenio is not None and particao.convenio is not self._convenio:
+            f.writelines(self._convenio)
+            particao.convenio = self._convenio
+        f.writelines(linhas)
+
+        particao.quantidade += 1
+        if procedimento.repasse is not None:
+            particao.valor += procedimento.repasse
+
+    def _caminho_particao(self, nome):
+        """Monta o arquivo de uma partição, sem repetir o de outra partição"""
+        # Remove caracteres que não podem fazer parte de nomes de arquivo
+        parte = re.sub(r'[\\/:*?"<>|]', '_', nome).strip() or SEM_CHAVE
+        caminho = os.path.join(self.diretorio, f"{self._base}_{parte}{self._extensao}")
+        sufixo = 1
+        while caminho.lower() in self._caminhos:
+            sufixo += 1
+            caminho = os.path.join(self.diretorio, f"{self._base}_{parte}_{sufixo}{self._extensao}")
+        self._caminhos.add(caminho.lower())
+        return caminho
+
+    def _abrir(self, particao):
+        """Devolve o arquivo aberto da partição, fechando o usado há mais tempo se preciso"""
+        f = self._abertos.get(particao.nome)
+        if f is not None:
+            self._abertos.move_to_end(particao.nome)
+            return f
+
+        if len(self._abertos) >= self.max_abertos:
+            _, antigo = self._abertos.popitem(last=False)
+            antigo.close()
+        if particao.criada:
+            # Reaberta para acréscimo (gzip, bz2 e xz aceitam arquivos com vários trechos)
+            self.reaberturas += 1
+            f = compressao.abrir_arquivo(particao.caminho, 'a', encoding='utf-8')
+        else:
+            f = compressao.abrir_arquivo(particao.caminho, 'w', encoding='utf-8')
+            particao.criada = True
+            if self._cabecalho:
+                f.writelines(self._cabecalho)
+                # A linha 'Profissional:' do primeiro relatório faz parte do cabeçalho
+                if self._profissional and self._cabecalho[-len(self._profissional):] == self._profissional:
+                    particao.profissional = self._profissional
+        self._abertos[particao.nome] = f
+        return f
+
+    def fechar(self):
+        """Grava o subtotal de cada partição e fecha todos os arquivos"""
+        for particao in self.particoes.values():
+            f = self._abrir(particao)
+            valor = f"{particao.valor:.2f}".replace('.', ',')
+            f.write(LINHA_SUBTOTAL.format(particao=particao.nome, quantidade=particao.quantidade, valor=valor))
+        self._fechar_abertos()
+
+    def relatar(self):
+        """Exibe as partições geradas, com a quantidade de procedimentos e o subtotal"""
+        print(f"Partições por {self.chave} em '{self.diretorio}': {len(self.particoes)} arquivo(s)"
+              + (f", {self.reaberturas} reabertura(s) com o limite de {self.max_abertos} abertos" if self.reaberturas else ""))
+        for particao in list(self.particoes.values())[:MAX_LISTADAS]:
+            valor = f"{particao.valor:.2f}".replace('.', ',')
+            print(f"  - {os.path.basename(particao.caminho)}: {particao.quantidade} procedimento(s), subtotal {valor}")
+        if len(self.particoes) > MAX_LISTADAS:
+            print(f"  - ... e mais {len(self.particoes) - MAX_LISTADAS}")
+
+    def _fechar_abertos(self):
+        while self._abertos:
+            _, f = self._abertos.popitem(last=False)
+            f.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, tipo, valor, rastreamento):
+        if tipo is None:
+            self.fechar()
+        else:
+            # Com erro, as partições ficam incompletas e sem subtotal
+            self._fechar_abertos()
+        return False
@@ -0,0 +1,185 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Consolidação direta dos relatórios em Excel (XLS/XLSX), sem gerar CSVs intermediários.
+
+As linhas de cada planilha são lidas em streaming (ver conversor_streaming), formatadas no
+padrão do sistema de origem (campos separados por ';' e vírgula decimal) e passadas, ainda
+em memória, para o analisador do relatório, que extrai os totais enquanto as linhas são
+gravadas no consolidado. Cada relatório é lido uma única vez e os valores numéricos vão da
+célula para o consolidado sem passar por float -> texto -> float.
+"""
+
+import os
+import csv
+import sys
+import glob
+import argparse
+from decimal import Decimal
+import compressao
+from dialetos import DIALETO_SISTEMA, formatar_valor
+from conversor_streaming import abrir_livro, fechar_livro, iterar_linhas, normalizar_linhas
+from parser_relatorio import analisar_registros, TotalConvenio, TotalRelatorio
+from processar_csv_final_ajustado import ResultadoArquivo, LINHA_TOTAL_GERAL, somar_totais, formatar_total_geral
+
+# Formato do consolidado gerado: o mesmo do relatório exportado pelo sistema de origem
+# (valores com duas casas e separador de milhar, ex: 1.024,27)
+DIALETO = DIALETO_SISTEMA
+DELIMITADOR = DIALETO.delimitador
+SEPARADOR_DECIMAL = DIALETO.decimal
+
+# Linhas do cabeçalho do relatório (título e profissional), gravadas apenas uma vez
+LINHAS_CABECALHO = 2
+
+PADRAO_ARQUIVOS = '*.xls*'
+
+def formatar_celula(valor):
+    """
+    Converte o valor de uma célula para o texto gravado no consolidado.
+
+    Args:
+        valor: Valor lido da planilha (ver conversor_streaming.iterar_linhas)
+
+    Returns:
+        str: Texto da célula (valores como 1.024,27, datas em dd/mm/aaaa)
+    """
+    return formatar_valor(valor, DIALETO)
+
+def linhas_relatorio(arquivo, planilha=0):
+    """
+    Gera as linhas de um relatório em Excel como listas de textos, lendo a planilha em streaming.
+
+    Args:
+        arquivo (str): Caminho para o arquivo XLS/XLSX
+        planilha (int|str, opcional): Índice ou nome da planilha (padrão: 0)
+
+    Yields:
+        list: Campos da linha, já formatados (ver formatar_celula)
+    """
+    livro = abrir_livro(arquivo)
+    try:
+        for linha in normalizar_linhas(iterar_linhas(livro, planilha)):
+            yield [formatar_celula(valor) for valor in linha]
+    finally:
+        fechar_livro(livro)
+
+def consolidar_planilha(arquivo, escritor, gravar_cabecalho=False, planilha=0):
+    """
+    Grava as linhas de um relatório em Excel no consolidado, coletando os totais na mesma passagem.
+
+    Args:
+        arquivo (str): Caminho para o arquivo XLS/XLSX
+        escritor (csv.writer): Escritor do consolidado
+        gravar_cabecalho (bool, opcional): Grava também as linhas do cabeçalho (primeiro arquivo)
+        planilha (int|str, opcional): Índice ou nome da planilha (padrão: 0)
+
+    Returns:
+        ResultadoArquivo: Cabeçalho, quantidade de linhas de dados e totais encontrados
+    """
+    cabecalho = []
+    linhas_dados = 0
+    totais_convenio = []
+    total_relatorio = None
+
+    def alimentar():
+        nonlocal linhas_dados
+        for campos in linhas_relatorio(arquivo, planilha):
+            if len(cabecalho) < LINHAS_CABECALHO:
+                cabecalho.append(campos)
+                if len(cabecalho) == LINHAS_CABECALHO and gravar_cabecalho:
+                    escritor.writerows(cabecalho)
+            else:
+                escritor.writerow(campos)
+                linhas_dados += 1
+            yield campos
+
+    for registro in analisar_registros(alimentar(), SEPARADOR_DECIMAL):
+        if isinstance(registro, TotalConvenio):
+            totais_convenio.append(registro)
+        elif isinstance(registro, TotalRelatorio):
+            total_relatorio = registro
+
+    return ResultadoArquivo(cabecalho, linhas_dados, totais_convenio, total_relatorio, None)
+
+def processar_planilhas(diretorio, padrao_arquivos, arquivo_saida, planilha=0):
+    """
+    Consolida os relatórios em Excel de um diretório em um único CSV, com a soma dos totais.
+
+    Args:
+        diretorio (str): Diretório dos arquivos Excel
+        padrao_arquivos (str): Padrão dos arquivos (ex: 'anne colono *.xls')
+        arquivo_saida (str): Caminho para o arquivo consolidado (comprimido se terminar em .gz, .bz2 ou .xz)
+        planilha (int|str, opcional): Índice ou nome da planilha de cada arquivo (padrão: 0)
+
+    Returns:
+        bool: True se a consolidação foi bem-sucedida, False caso contrário
+    """
+    arquivos = sorted(glob.glob(os.path.join(diretorio, padrao_arquivos)))
+
+    if not arquivos:
+        print(f"Nenhum arquivo encontrado com o padrão: {padrao_arquivos}")
+        return False
+
+    soma_total = Decimal('0')
+    cabecalho_gravado = False
+
+    arquivo_temporario = f"{arquivo_saida}.tmp"
+    try:
+        with compressao.abrir_arquivo(arquivo_temporario, 'w', encoding='utf-8',
+                                      formato=compressao.formato_compressao(arquivo_saida)) as f_saida:
+            escritor = csv.writer(f_saida, delimiter=DELIMITADOR, lineterminator='\n')
+
+            for arquivo in arquivos:
+                print(f"Processando arquivo: {arquivo}")
+
+                resultado = consolidar_planilha(arquivo, escritor, not cabecalho_gravado, planilha)
+                if len(resultado.cabecalho) == LINHAS_CABECALHO:
+                    cabecalho_gravado = True
+
+                if resultado.linhas_dados:
+                    for total in resultado.totais_convenio:
+                        print(f"  - Total {total.convenio}: {total.valor}")
+                    valor = somar_totais(resultado.totais_convenio, resultado.total_relatorio)
+                    soma_total += valor
+                    print(f"Valor total extraído do arquivo {os.path.basename(arquivo)}: {valor}, Soma acumulada: {soma_total}")
+
+            valor_formatado = formatar_total_geral(soma_total)
+            f_saida.write(LINHA_TOTAL_GERAL.format(valor=valor_formatado))
+    except Exception as e:
+        # O arquivo em que o erro ocorreu é o último exibido em 'Processando arquivo'
+        print(f"Erro durante a consolidação: {str(e)}")
+        if os.path.exists(arquivo_temporario):
+            os.remove(arquivo_temporario)
+        return False
+
+    os.replace(arquivo_temporario, arquivo_saida)
+
+    print(f"\nProcessamento concluído!")
+    print(f"Arquivo consolidado gerado: {arquivo_saida}")
+    print(f"Soma total de todos os arquivos: {valor_formatado}")
+    return True
+
+def criar_parser_argumentos():
+    """Cria o parser dos argumentos de linha de comando"""
+    parser = argparse.ArgumentParser(
+        description="Consolida os relatórios de repasse em Excel (XLS/XLSX) diretamente, sem CSVs intermediários.")
+    parser.add_argument('diretorio', nargs='?', default=os.getcwd(), help="Diretório dos arquivos Excel")
+    parser.add_argument('padrao_arquivos', nargs='?', default=PADRAO_ARQUIVOS,
+                        help=f"Padrão dos arquivos (padrão: {PADRAO_ARQUIVOS})")
+    parser.add_argument('arquivo_saida', nargs='?', default="consolidado.csv",
+                        help="Arquivo consolidado (padrão: consolidado.csv no diretório)")
+    parser.add_argument('--planilha', type=int, default=0, help="Índice da planilha de cada arquivo (padrão: 0)")
+    compressao.adicionar_argumentos(parser)
+    return parser
+
+if __name__ == "__main__":
+    args = criar_parser_argumentos().parse_args()
+    compressao.definir_nivel(args.nivel_compressao)
+
+    arquivo_saida = args.arquivo_saida
+    if not os.path.isabs(arquivo_saida):
+        arquivo_saida = os.path.join(args.diretorio, arquivo_saida)
+
+    sucesso = processar_planilhas(args.diretorio, args.padrao_arquivos, arquivo_saida, args.planilha)
+    sys.exit(0 if sucesso else 1)
@@ -1,100 +1,782 @@
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
 
+import io
 import os
 import csv
-import re
+import mmap
 import sys
-import glob
-from datetime import datetime
+import argparse
+import itertools
+import contextlib
+from collections import namedtuple, deque
+from concurrent.futures import ThreadPoolExecutor
+from decimal import Decimal
+import metricas
+import compressao
+from manifesto import Manifesto, NOME_MANIFESTO_PADRAO
+from parser_relatorio import (analisar_linhas, analisar_registros, detectar_delimitador, separador_decimal, eh_saida_gerada,
+                              Procedimento, TotalConvenio, TotalRelatorio, TOTAL_GERAL)
+from dialetos import DIALETO_SISTEMA
+from esquemas import ESQUEMA_REPASSE, carregar_esquema, tipar_procedimentos, TabelaCSV
+from duplicados import IndiceDuplicados, MODOS as MODOS_DUPLICADOS, LIMITE_MEMORIA_PADRAO, MAX_LISTADOS
+from particoes import EscritorParticoes, CHAVES as CHAVES_PARTICAO, MAX_ABERTOS_PADRAO
+
+# Operações registradas no manifesto: totais de cada arquivo e o consolidado gerado
+OPERACAO_CONSOLIDACAO = 'consolidacao'
+OPERACAO_CONSOLIDADO = 'consolidado'
+# Versão da extração de totais; mudar a extração invalida os totais guardados no manifesto
+VERSAO_EXTRACAO = 2
+# Parâmetros registrados com os totais de cada arquivo
+PARAMETROS_CONSOLIDACAO = {'versao': VERSAO_EXTRACAO}
+
+# Quantidade de linhas do cabeçalho do relatório (copiado apenas do primeiro arquivo)
+LINHAS_CABECALHO = 3
+
+# Marca de ordem de bytes do UTF-8, descartada dos relatórios (lidos como utf-8-sig)
+BOM_UTF8 = b'\xef\xbb\xbf'
+
+# Trecho do arquivo mapeado contado de uma vez ao contar as linhas de dados
+BLOCO_CONTAGEM = 64 * 1024 * 1024
+
+# Linha final do consolidado, com a soma dos totais de todos os arquivos
+LINHA_TOTAL_GERAL = "\n" + TOTAL_GERAL + ";;Total:;{valor};\n"
+
+# Resultado da leitura de um arquivo: linhas do cabeçalho, quantidade de linhas de dados
+# copiadas, os registros de total encontrados e, se pedidos, os registros de procedimento
+ResultadoArquivo = namedtuple('ResultadoArquivo', 'cabecalho linhas_dados totais_convenio total_relatorio procedimentos')
+
+def somar_totais(totais_convenio, total_relatorio=None):
+    """
+    Calcula o total de um relatório a partir das linhas 'Total <convênio>:'.
+
+    Se o relatório não tiver totais por convênio, usa a linha 'Total:' do relatório.
+
+    Args:
+        totais_convenio (list): Registros TotalConvenio do relatório
+        total_relatorio (TotalRelatorio, opcional): Registro da linha 'Total:'
+
+    Returns:
+        Decimal: Total do relatório
+    """
+    if totais_convenio:
+        return sum((total.valor for total in totais_convenio), Decimal('0'))
+    if total_relatorio is not None:
+        return total_relatorio.valor
+    return Decimal('0')
+
+def formatar_total_geral(soma_total):
+    """Formata a soma total com duas casas e vírgula decimal (ex: '2759,63')"""
+    return f"{soma_total:.2f}".replace('.', ',')
 
 def extrair_valores_totais(linhas):
-    """Extrai e soma todos os valores monetários de linhas que contenham 'Total'"""
-    soma_valores = 0.0
-    
-    # Verificar as últimas 10 linhas do arquivo (ou todas, se tiver menos de 10)
-    linhas_verificar = min(10, len(linhas))
-    for i in range(len(linhas) - linhas_verificar, len(linhas)):
-        if i >= 0 and "Total" in linhas[i]:
-            partes = linhas[i].split(';')
-            
-            # Procura por valores após qualquer padrão "Total X:"
-            for j, parte in enumerate(partes):
-                if "Total" in parte and ":" in parte and j + 1 < len(partes):
-                    # Ignora se for "Total Procedimentos:"
-                    if "Total Procedimentos:" == parte.strip():
-                        continue
-                    
-                    # Pega o valor e converte para formato numérico
-                    valor_str = partes[j + 1].strip().replace('.', '').replace(',', '.')
-                    # Remove aspas ou outros caracteres não numéricos
-                    valor_str = re.sub(r'[^\d.]', '', valor_str)
-                    if valor_str:
-                        try:
-                            valor = float(valor_str)
-                            print(f"  - Valor encontrado: {valor} (linha: {linhas[i].strip()})")
-                            soma_valores += valor
-                        except ValueError:
-                            print(f"  - Erro ao converter valor: {partes[j + 1]}")
-    
-    return soma_valores
+    """Extrai e soma os totais por convênio ('Total <convênio>:') de um relatório"""
+    totais_convenio = []
+    total_relatorio = None
+    with metricas.etapa('extracao_totais'):
+        for registro, _ in analisar_linhas(linhas):
+            if isinstance(registro, TotalConvenio):
+                totais_convenio.append(registro)
+            elif isinstance(registro, TotalRelatorio):
+                total_relatorio = registro
+        return somar_totais(totais_convenio, total_relatorio)
 
-def processar_arquivos_csv(diretorio, padrao_arquivos, arquivo_saida):
-    """Processa múltiplos arquivos CSV e gera um arquivo consolidado"""
-    arquivos = glob.glob(os.path.join(diretorio, padrao_arquivos))
-    
+def consolidar_arquivo(arquivo, saida_dados, saida_cabecalho=None, analisar=True, procedimentos=False, destinos=None):
+    """
+    Lê um relatório em uma única passagem, copiando as linhas para a saída e coletando os totais.
+
+    Os argumentos e o retorno são os de consolidar_linhas.
+
+    Args:
+        arquivo (str): Caminho para o relatório em CSV
+    """
+    with compressao.abrir_arquivo(arquivo, 'r', encoding='utf-8-sig') as f:
+        return consolidar_linhas(f, saida_dados, saida_cabecalho, analisar, procedimentos, destinos)
+
+def consolidar_linhas(linhas_arquivo, saida_dados, saida_cabecalho=None, analisar=True, procedimentos=False, destinos=None):
+    """
+    Copia as linhas de um relatório para a saída, coletando os totais na mesma passagem.
+
+    Args:
+        linhas_arquivo (iterable): Linhas do relatório (ex: o arquivo aberto)
+        saida_dados (file): Arquivo que recebe as linhas a partir da quarta linha
+        saida_cabecalho (file, opcional): Arquivo que recebe as três primeiras linhas, antes
+            de qualquer linha de dados
+        analisar (bool, opcional): Se False, apenas copia as linhas, sem procurar os totais
+            (usado quando os totais já estão no manifesto)
+        procedimentos (bool, opcional): Guarda também os registros de procedimento (usados
+            na tabela tipada, ver esquemas.py)
+        destinos (DestinosProcedimentos, opcional): Destinos abertos que recebem também cada
+            registro; os duplicados a remover não são copiados
+
+    Returns:
+        ResultadoArquivo: Cabeçalho, quantidade de linhas de dados, totais encontrados e
+            procedimentos (None se não pedidos)
+    """
+    cabecalho = []
+    linhas_dados = 0
+    totais_convenio = []
+    total_relatorio = None
+    registros_procedimento = [] if procedimentos else None
+
+    if analisar:
+        registros = analisar_linhas(linhas_arquivo)
+    else:
+        registros = ((None, [linha]) for linha in linhas_arquivo)
+
+    for registro, linhas in registros:
+        if destinos is not None and not destinos.receber(registro, linhas):
+            continue
+
+        for linha in linhas:
+            if len(cabecalho) < LINHAS_CABECALHO:
+                cabecalho.append(linha)
+                if len(cabecalho) == LINHAS_CABECALHO and saida_cabecalho is not None:
+                    saida_cabecalho.writelines(cabecalho)
+            else:
+                saida_dados.write(linha)
+                linhas_dados += 1
+
+        if isinstance(registro, TotalConvenio):
+            totais_convenio.append(registro)
+        elif isinstance(registro, TotalRelatorio):
+            total_relatorio = registro
+        elif isinstance(registro, Procedimento) and registros_procedimento is not None:
+            registros_procedimento.append(registro)
+
+    return ResultadoArquivo(cabecalho, linhas_dados, totais_convenio, total_relatorio, registros_procedimento)
+
+def _ler_arquivo_em_memoria(arquivo, analisar=True, procedimentos=False):
+    """Lê um relatório com consolidar_arquivo, guardando as linhas de dados em memória"""
+    dados = io.StringIO()
+    with metricas.etapa('leitura_analise'):
+        resultado = consolidar_arquivo(arquivo, dados, analisar=analisar, procedimentos=procedimentos)
+    return resultado, dados.getvalue()
+
+def pode_mapear(arquivo_saida=None):
+    """
+    Indica se a cópia direta dos bytes dos relatórios (ver analisar_mapeado) pode ser usada.
+
+    Os relatórios são lidos em modo texto, com as quebras de linha convertidas para '\n';
+    a cópia direta só produz o mesmo consolidado onde '\n' é a quebra de linha gravada, e
+    não se aplica a um consolidado comprimido.
+    """
+    return os.linesep == '\n' and not (arquivo_saida and compressao.formato_compressao(arquivo_saida))
+
+def analisar_mapeado(arquivo, analisar=True):
+    """
+    Analisa um relatório mapeado em memória, sem decodificar as linhas de dados.
+
+    O fim do cabeçalho e as linhas com 'Total' são localizados por buscas nos bytes do
+    arquivo; só o cabeçalho e as linhas de total são decodificados e analisados, cada linha
+    por si. Os valores encontrados são os mesmos da leitura completa (consolidar_arquivo),
+    mas os totais não trazem o profissional, que a consolidação não usa.
+
+    Args:
+        arquivo (str): Caminho para o relatório em CSV
+        analisar (bool, opcional): Se False, não procura os totais
+
+    Returns:
+        tuple: (ResultadoArquivo, (início, fim) do trecho de dados no arquivo), ou None se o
+            arquivo for comprimido ou tiver quebras de linha '\r\n' e precisar da leitura normal
+    """
+    if compressao.formato_compressao(arquivo):
+        return None
+    with open(arquivo, 'rb') as f:
+        tamanho = os.fstat(f.fileno()).st_size
+        if tamanho == 0:
+            return ResultadoArquivo([], 0, [], None, None), (0, 0)
+
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapa:
+            if mapa.find(b'\r') != -1:
+                return None
+            inicio = len(BOM_UTF8) if mapa[:len(BOM_UTF8)] == BOM_UTF8 else 0
+
+            # Cabeçalho: as primeiras linhas físicas do arquivo
+            fim_cabecalho = inicio
+            for _ in range(LINHAS_CABECALHO):
+                fim_linha = mapa.find(b'\n', fim_cabecalho)
+                fim_cabecalho = tamanho if fim_linha == -1 else fim_linha + 1
+                if fim_linha == -1:
+                    break
+            cabecalho = mapa[inicio:fim_cabecalho].decode('utf-8').splitlines(keepends=True)
+
+            linhas_dados = 0
+            for bloco in range(fim_cabecalho, tamanho, BLOCO_CONTAGEM):
+                linhas_dados += mapa[bloco:min(bloco + BLOCO_CONTAGEM, tamanho)].count(b'\n')
+            if fim_cabecalho < tamanho and mapa[tamanho - 1:tamanho] != b'\n':
+                linhas_dados += 1
+
+            totais_convenio = []
+            total_relatorio = None
+            if analisar:
+                linhas_total = []
+                posicao = mapa.find(b'Total', inicio)
+                while posicao != -1:
+                    comeco = mapa.rfind(b'\n', inicio, posicao) + 1 or inicio
+                    fim_linha = mapa.find(b'\n', posicao)
+                    fim_linha = tamanho if fim_linha == -1 else fim_linha
+                    linhas_total.append(mapa[comeco:fim_linha].decode('utf-8'))
+                    posicao = mapa.find(b'Total', fim_linha)
+
+                primeira_linha = cabecalho[0] if cabecalho else ''
+                delimitador = detectar_delimitador(primeira_linha)
+                campos = (next(csv.reader([linha], delimiter=delimitador), []) for linha in linhas_total)
+                for registro in analisar_registros(campos, separador_decimal(delimitador)):
+                    if isinstance(registro, TotalConvenio):
+                        totais_convenio.append(registro)
+                    elif isinstance(registro, TotalRelatorio):
+                        total_relatorio = registro
+
+    resultado = ResultadoArquivo(cabecalho, linhas_dados if len(cabecalho) == LINHAS_CABECALHO else 0,
+                                 totais_convenio, total_relatorio, None)
+    return resultado, (fim_cabecalho, tamanho)
+
+def copiar_trecho(arquivo, saida, inicio, fim):
+    """
+    Copia um trecho de um arquivo para a saída sem passar os bytes pelo Python.
+
+    Usa os.sendfile (cópia dentro do kernel) quando disponível; senão, ou se o sistema de
+    arquivos não a suportar, grava fatias do arquivo mapeado em memória.
+
+    Args:
+        arquivo (str): Arquivo de origem
+        saida (file): Arquivo de saída aberto (texto ou binário)
+        inicio (int): Posição inicial do trecho
+        fim (int): Posição final do trecho (exclusiva)
+    """
+    if fim <= inicio:
+        return
+    # O que já foi gravado pelo Python precisa chegar ao arquivo antes dos bytes copiados
+    saida.flush()
+    posicao = inicio
+    with open(arquivo, 'rb') as f:
+        if hasattr(os, 'sendfile'):
+            try:
+                while posicao < fim:
+                    enviados = os.sendfile(saida.fileno(), f.fileno(), posicao, fim - posicao)
+                    if not enviados:
+                        break
+                    posicao += enviados
+            except OSError:
+                pass  # Ex: sistema de arquivos sem suporte; o restante é copiado abaixo
+        if posicao < fim:
+            destino = getattr(saida, 'buffer', saida)
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapa, memoryview(mapa) as bytes_mapa:
+                destino.write(bytes_mapa[posicao:fim])
+            destino.flush()
+
+def _ler_mapeado(arquivo, analisar=True):
+    """Analisa um relatório mapeado em memória (ver analisar_mapeado) ou, se não for possível, o lê em memória"""
+    with metricas.etapa('analise_mapeada'):
+        mapeado = analisar_mapeado(arquivo, analisar)
+    if mapeado is None:
+        return _ler_arquivo_em_memoria(arquivo, analisar)
+    return mapeado
+
+def _ler_texto(arquivo):
+    """Lê o conteúdo de um relatório, sem analisá-lo"""
+    with metricas.etapa('leitura'):
+        with compressao.abrir_arquivo(arquivo, 'r', encoding='utf-8-sig') as f:
+            return f.read()
+
+def _ler_em_paralelo(arquivos, ler, jobs):
+    """
+    Lê os relatórios em um pool de threads, sobrepondo a espera de E/S de vários arquivos.
+
+    Os resultados são gerados na ordem da lista de arquivos; no máximo 2 * jobs arquivos
+    ficam lidos à frente do que já foi consumido, limitando a memória usada.
+
+    Args:
+        arquivos (list): Arquivos na ordem de consolidação
+        ler (callable): Função que lê um arquivo (ex: _ler_arquivo_em_memoria)
+        jobs (int): Número de threads
+
+    Yields:
+        tuple: (arquivo, resultado de ler(arquivo))
+    """
+    restantes = iter(arquivos)
+    pendentes = deque()
+    with ThreadPoolExecutor(max_workers=jobs) as executor:
+        def enviar(arquivo):
+            pendentes.append((arquivo, executor.submit(ler, arquivo)))
+
+        for arquivo in itertools.islice(restantes, 2 * jobs):
+            enviar(arquivo)
+
+        while pendentes:
+            arquivo, futuro = pendentes.popleft()
+            proximo = next(restantes, None)
+            if proximo is not None:
+                enviar(proximo)
+            yield arquivo, futuro.result()
+
+def _parametros_consolidado(arquivos, registros, modo_duplicados=None):
+    """Identifica um consolidado pelas entradas (caminho e hash) usadas para gerá-lo"""
+    parametros = {
+        'versao': VERSAO_EXTRACAO,
+        'entradas': [[os.path.abspath(arquivo), registros[arquivo]['hash']] for arquivo in arquivos],
+    }
+    # Sem a detecção de duplicados, mantém válidos os consolidados já registrados
+    if modo_duplicados:
+        parametros['duplicados'] = modo_duplicados
+    return parametros
+
+class DestinosProcedimentos:
+    """
+    Destinos opcionais dos procedimentos lidos na consolidação, além do consolidado: a
+    tabela tipada (ver esquemas.py), o índice de duplicados (ver duplicados.py) e as
+    partições (ver particoes.py).
+
+    Guarda as opções de cada destino; processar_arquivos_csv os abre com abrir() e os
+    fecha ao final da consolidação.
+    """
+
+    def __init__(self, tabela=None, esquema=ESQUEMA_REPASSE, duplicados=None, limite_duplicados=LIMITE_MEMORIA_PADRAO,
+                 particionar=None, diretorio_particoes=None, max_abertos=MAX_ABERTOS_PADRAO):
+        """
+        Args:
+            tabela (str, opcional): Grava também os procedimentos nesse CSV, com as colunas e
+                os tipos do esquema
+            esquema (Esquema, opcional): Esquema da tabela (padrão: 'repasse')
+            duplicados (str, opcional): 'remover' ou 'marcar' os procedimentos que já
+                apareceram em um arquivo anterior (mesmo Cód.Ate, data, paciente e procedimento)
+            limite_duplicados (int, opcional): Chaves mantidas em memória antes de o índice
+                de duplicados passar para o disco
+            particionar (str, opcional): Grava também um arquivo por 'convenio',
+                'profissional' ou 'mes'
+            diretorio_particoes (str, opcional): Diretório das partições
+            max_abertos (int, opcional): Arquivos de partição abertos ao mesmo tempo
+        """
+        self.arquivo_tabela = tabela
+        self.esquema = esquema
+        self.modo_duplicados = duplicados
+        self.limite_duplicados = limite_duplicados
+        self.particionar = particionar
+        self.diretorio_particoes = diretorio_particoes
+        self.max_abertos = max_abertos
+        # Destinos abertos por abrir() (mantidos depois de fechados, para o resumo final)
+        self.tabela = None
+        self.indice = None
+        self.particoes = None
+
+    @property
+    def analisar_todos(self):
+        """Indica se todos os arquivos precisam ser analisados, mesmo os que não mudaram"""
+        return bool(self.arquivo_tabela or self.modo_duplicados or self.particionar)
+
+    @property
+    def em_ordem(self):
+        """Indica se a análise precisa acontecer na ordem dos arquivos (duplicados e partições)"""
+        return bool(self.modo_duplicados or self.particionar)
+
+    @property
+    def procedimentos(self):
+        """Indica se os registros de procedimento de cada arquivo precisam ser guardados"""
+        return bool(self.arquivo_tabela)
+
+    @contextlib.contextmanager
+    def abrir(self, arquivo_saida):
+        """
+        Abre os destinos pedidos; ao sair, fecha todos (com erro, sem concluí-los).
+
+        Args:
+            arquivo_saida (str): Consolidado, que dá o nome e o diretório das partições e o
+                diretório do banco temporário de duplicados
+        """
+        with contextlib.ExitStack() as pilha:
+            if self.arquivo_tabela:
+                self.tabela = pilha.enter_context(TabelaCSV(self.arquivo_tabela, self.esquema, DIALETO_SISTEMA))
+            if self.modo_duplicados:
+                self.indice = pilha.enter_context(IndiceDuplicados(self.modo_duplicados, self.limite_duplicados,
+                                                                   os.path.dirname(arquivo_saida) or None))
+            if self.particionar:
+                self.particoes = pilha.enter_context(EscritorParticoes(arquivo_saida, self.particionar,
+                                                                       self.diretorio_particoes, self.max_abertos))
+            yield self
+
+    def iniciar_arquivo(self, arquivo):
+        """Registra o início de um novo relatório no índice de duplicados e nas partições"""
+        if self.indice is not None:
+            self.indice.iniciar_arquivo(arquivo)
+        if self.particoes is not None:
+            self.particoes.iniciar_arquivo(arquivo)
+
+    def receber(self, registro, linhas):
+        """
+        Recebe um registro do relatório, com as linhas de texto que o formam.
+
+        Returns:
+            bool: False se o registro é um duplicado a retirar do consolidado
+        """
+        if self.indice is not None and isinstance(registro, Procedimento):
+            if self.indice.verificar(registro) and self.indice.remover:
+                return False
+        if self.particoes is not None:
+            self.particoes.receber(registro, linhas)
+        return True
+
+    def concluir_arquivo(self, arquivo, resultado):
+        """
+        Grava os procedimentos do arquivo na tabela e lista os seus duplicados.
+
+        Returns:
+            Decimal: Valor dos duplicados retirados do consolidado, a descontar do Total Geral
+        """
+        if self.tabela is not None:
+            with metricas.etapa('escrita_tabela'):
+                self.tabela.escrever(tipar_procedimentos(resultado.procedimentos, self.esquema))
+        if self.indice is None or not resultado.linhas_dados:
+            return Decimal('0')
+        valor = _relatar_duplicados(self.indice)
+        metricas.contar(arquivo, duplicados=len(self.indice.encontrados))
+        return valor if self.indice.remover else Decimal('0')
+
+    def relatar(self):
+        """Exibe o resumo dos destinos ao final da consolidação"""
+        if self.indice is not None:
+            acao = "removidos do consolidado" if self.indice.remover else "mantidos no consolidado"
+            print(f"Procedimentos duplicados {acao}: {self.indice.duplicados} "
+                  f"(valor {formatar_total_geral(self.indice.valor)})")
+        if self.tabela is not None:
+            print(f"Tabela de procedimentos gerada: {self.arquivo_tabela} ({self.tabela.linhas} linha(s))")
+        if self.particoes is not None:
+            self.particoes.relatar()
+
+def _relatar_duplicados(indice):
+    """Exibe os duplicados encontrados no arquivo atual e retorna o valor deles"""
+    encontrados = indice.encontrados
+    valor = sum((procedimento.repasse for procedimento, _ in encontrados if procedimento.repasse is not None), Decimal('0'))
+    if encontrados:
+        acao = "removido(s)" if indice.remover else "marcado(s)"
+        print(f"  - {len(encontrados)} procedimento(s) duplicado(s) {acao}, valor {formatar_total_geral(valor)}")
+        if not indice.remover:
+            for procedimento, origem in encontrados[:MAX_LISTADOS]:
+                print(f"    * {procedimento.codigo.strip()} {procedimento.data} {procedimento.paciente} "
+                      f"({procedimento.procedimento}): já consta em {os.path.basename(origem)}")
+            if len(encontrados) > MAX_LISTADOS:
+                print(f"    * ... e mais {len(encontrados) - MAX_LISTADOS}")
+    return valor
+
+def listar_relatorios(diretorio, padrao_arquivos):
+    """
+    Lista, em ordem de nome, os relatórios a consolidar.
+
+    Inclui as versões comprimidas (ex: '*.csv' encontra também 'a.csv.gz'). Consolidados e
+    partições gravados por execuções anteriores (terminados pelo Total Geral ou por um
+    subtotal de partição) não são relatórios e ficam de fora.
+
+    Returns:
+        list: Relatórios encontrados
+    """
+    arquivos = compressao.expandir_padrao(os.path.join(diretorio, padrao_arquivos))
+
+    gerados = [arquivo for arquivo in arquivos if eh_saida_gerada(arquivo)]
+    if gerados:
+        print(f"Ignorando {len(gerados)} consolidado(s) ou partição(ões) de execuções anteriores:")
+        for arquivo in gerados[:MAX_LISTADOS]:
+            print(f"  - {os.path.basename(arquivo)}")
+        ignorados = set(gerados)
+        arquivos = [arquivo for arquivo in arquivos if arquivo not in ignorados]
+
+    # Ordenar arquivos pelo nome para processamento consistente
+    return sorted(arquivos)
+
+def _consultar_manifesto(manifesto, arquivos, arquivo_saida, destinos, reconciliar):
+    """
+    Consulta no manifesto os arquivos que não mudaram desde a última execução.
+
+    Returns:
+        dict: Registro de cada arquivo (None se ele precisa ser lido de novo), ou None se
+            nenhuma entrada nem o consolidado mudaram e não há o que refazer
+    """
+    with metricas.etapa('consulta_manifesto'):
+        registros = {arquivo: manifesto.consultar(OPERACAO_CONSOLIDACAO, arquivo, PARAMETROS_CONSOLIDACAO)
+                     for arquivo in arquivos}
+        if not all(registros.values()) or destinos.arquivo_tabela or destinos.particionar or reconciliar:
+            return registros
+        parametros_saida = _parametros_consolidado(arquivos, registros, destinos.modo_duplicados)
+        registro_saida = manifesto.consultar(OPERACAO_CONSOLIDADO, arquivo_saida, parametros_saida)
+
+    if not registro_saida:
+        return registros
+    print(f"Nenhum arquivo mudou desde a última execução; '{arquivo_saida}' está atualizado.")
+    print(f"Soma total de todos os arquivos: {registro_saida['totais']['soma']}")
+    return None
+
+def _preparar_leituras(arquivos, jobs, registros, destinos, mapear):
+    """
+    Define como os relatórios são lidos antes da consolidação de cada um.
+
+    Com jobs > 1, as threads leem à frente: só o conteúdo, se a análise precisa acontecer
+    na ordem dos arquivos; senão, a análise completa (mapeada em memória ou em texto).
+
+    Yields:
+        tuple: (arquivo, leitura já feita ou None se o arquivo ainda precisa ser lido), na
+            ordem dos arquivos (ver _consolidar_relatorio)
+    """
+    if jobs <= 1 or len(arquivos) <= 1:
+        return ((arquivo, None) for arquivo in arquivos)
+    if destinos.em_ordem:
+        # As threads só leem o conteúdo; a análise acontece na ordem dos arquivos
+        return _ler_em_paralelo(arquivos, _ler_texto, jobs)
+    if mapear:
+        return _ler_em_paralelo(arquivos, lambda arquivo: _ler_mapeado(arquivo, not registros.get(arquivo)), jobs)
+    return _ler_em_paralelo(arquivos, lambda arquivo: _ler_arquivo_em_memoria(
+        arquivo, destinos.analisar_todos or not registros.get(arquivo), destinos.procedimentos), jobs)
+
+def _consolidar_relatorio(arquivo, lido, f_saida, gravar_cabecalho, analisar, destinos, mapear):
+    """
+    Grava um relatório no consolidado e encaminha os seus registros aos destinos.
+
+    Args:
+        arquivo (str): Relatório
+        lido (object): Leitura feita por _preparar_leituras (texto, ou resultado e dados já
+            analisados), ou None para ler o arquivo aqui
+        f_saida (file): Consolidado
+        gravar_cabecalho (bool): Grava também o cabeçalho do relatório (o do primeiro arquivo)
+        analisar (bool): Procura os totais (False se eles já estão no manifesto)
+        destinos (DestinosProcedimentos): Destinos abertos dos procedimentos
+        mapear (bool): Analisa o arquivo mapeado em memória, copiando os dados sem decodificar
+
+    Returns:
+        ResultadoArquivo: Resultado da leitura do relatório
+    """
+    saida_cabecalho = f_saida if gravar_cabecalho else None
+    if lido is None and mapear:
+        with metricas.etapa('analise_mapeada'):
+            lido = analisar_mapeado(arquivo, analisar)
+    if lido is None:
+        # Leitura, análise e cópia acontecem na mesma passagem, por isso são medidas juntas
+        with metricas.etapa('leitura_analise_escrita'):
+            return consolidar_arquivo(arquivo, f_saida, saida_cabecalho, analisar=analisar,
+                                      procedimentos=destinos.procedimentos, destinos=destinos)
+    if destinos.em_ordem:
+        # Conteúdo já lido por uma thread: análise e cópia, na ordem dos arquivos
+        with metricas.etapa('analise_escrita'):
+            return consolidar_linhas(io.StringIO(lido), f_saida, saida_cabecalho,
+                                     procedimentos=destinos.procedimentos, destinos=destinos)
+
+    # Arquivo já analisado (por uma thread ou mapeado em memória): grava o cabeçalho (se for
+    # o primeiro) e os dados
+    resultado, dados = lido
+    with metricas.etapa('escrita'):
+        if gravar_cabecalho and len(resultado.cabecalho) == LINHAS_CABECALHO:
+            f_saida.writelines(resultado.cabecalho)
+        if isinstance(dados, tuple):
+            # Trecho de dados localizado no arquivo mapeado: cópia direta dos bytes
+            copiar_trecho(arquivo, f_saida, *dados)
+        else:
+            f_saida.write(dados)
+    return resultado
+
+def _valor_relatorio(resultado, registro):
+    """Soma os totais por convênio do relatório, ou reaproveita o total guardado no manifesto"""
+    if registro:
+        print(f"  - Arquivo sem alterações; total reaproveitado do manifesto")
+        return Decimal(registro['totais']['valor'])
+    for total in resultado.totais_convenio:
+        print(f"  - Total {total.convenio}: {total.valor}")
+    with metricas.etapa('soma_totais'):
+        return somar_totais(resultado.totais_convenio, resultado.total_relatorio)
+
+def processar_arquivos_csv(diretorio, padrao_arquivos, arquivo_saida, manifesto=None, jobs=1, destinos=None,
+                           reconciliar=False):
+    """
+    Processa múltiplos arquivos CSV e gera um arquivo consolidado.
+
+    Com um manifesto, os totais de arquivos que não mudaram desde a última execução são
+    reaproveitados e, se nenhuma entrada nem o consolidado mudaram, nada é reprocessado.
+
+    Com jobs > 1, os arquivos são lidos em paralelo e juntados na ordem dos nomes, de
+    forma que o consolidado é idêntico ao de uma execução sequencial.
+
+    Sem tabela, duplicados nem partições, cada arquivo é mapeado em memória: apenas o
+    cabeçalho e as linhas de total são decodificados, e as linhas de dados são copiadas
+    diretamente para o consolidado (ver analisar_mapeado). Arquivos comprimidos ou com
+    quebras de linha '\r\n', assim como um consolidado comprimido, usam a leitura normal.
+
+    Arquivos .gz, .bz2 e .xz são lidos descomprimindo em streaming (o padrão '*.csv' encontra
+    também 'a.csv.gz'), e um arquivo_saida com uma dessas extensões é gravado comprimido
+    (ver compressao.py). Consolidados e partições de execuções anteriores ficam fora da
+    consolidação (ver listar_relatorios).
+
+    Os destinos opcionais dos procedimentos (ver DestinosProcedimentos) recebem os
+    procedimentos de todos os arquivos, que são então analisados, mesmo os que não mudaram:
+    a tabela tipada, a detecção de duplicados, que retira do consolidado e do Total Geral (ou
+    apenas lista) os procedimentos que já apareceram em um arquivo anterior, e as partições,
+    gravadas na mesma passagem que grava o consolidado.
+
+    Com reconciliar, as linhas de total de cada arquivo são conferidas com a soma e a
+    quantidade dos procedimentos, e as divergências são listadas (ver reconciliacao.py).
+    """
+    destinos = destinos or DestinosProcedimentos()
+    arquivos = listar_relatorios(diretorio, padrao_arquivos)
     if not arquivos:
         print(f"Nenhum arquivo encontrado com o padrão: {padrao_arquivos}")
         return
-    
-    # Ordenar arquivos pelo nome para processamento consistente
-    arquivos.sort()
-    
-    # Inicializar variáveis
-    linhas_consolidadas = []
-    soma_total = 0.0
-    cabecalhos = []
-    
-    # Processar cada arquivo
-    for arquivo in arquivos:
-        print(f"Processando arquivo: {arquivo}")
-        
-        with open(arquivo, 'r', encoding='utf-8-sig') as f:
-            linhas = f.readlines()
-            
-            # Guardar os cabeçalhos do primeiro arquivo
-            if not cabecalhos and len(linhas) >= 3:
-                cabecalhos = linhas[:3]
-            
-            # Extrair linhas a partir da quarta linha
-            if len(linhas) >= 4:
-                dados = linhas[3:]
-                
-                # Extrair e somar todos os valores de total
-                valor = extrair_valores_totais(dados)
+
+    # Consultar no manifesto os arquivos que não mudaram
+    registros = {}
+    if manifesto is not None:
+        registros = _consultar_manifesto(manifesto, arquivos, arquivo_saida, destinos, reconciliar)
+        if registros is None:
+            return
+
+    soma_total = Decimal('0')
+    cabecalho_gravado = False
+
+    conferencias = None
+    com_divergencia = 0
+    if reconciliar:
+        # Importado aqui: só a conferência precisa do pandas e do NumPy
+        from reconciliacao import conferir_arquivos, relatar_conferencia
+        conferencias = conferir_arquivos(arquivos)
+
+    # Sem destinos, basta localizar os totais: as linhas de dados são copiadas sem decodificar
+    mapear = not destinos.analisar_todos and pode_mapear(arquivo_saida)
+
+    # O consolidado é gravado em um arquivo temporário e só substitui a saída ao final,
+    # pois a própria saída pode estar entre os arquivos de entrada
+    arquivo_temporario = f"{arquivo_saida}.tmp"
+    with compressao.abrir_arquivo(arquivo_temporario, 'w', encoding='utf-8',
+                                  formato=compressao.formato_compressao(arquivo_saida)) as f_saida, \
+         destinos.abrir(arquivo_saida):
+        # Processar cada arquivo em uma única leitura, copiando as linhas para a saída
+        for arquivo, lido in _preparar_leituras(arquivos, jobs, registros, destinos, mapear):
+            print(f"Processando arquivo: {arquivo}")
+
+            if conferencias is not None:
+                # Os arquivos são conferidos em lotes, lidos à frente na primeira chamada de cada lote
+                with metricas.etapa('reconciliacao'):
+                    conferencia = next(conferencias)
+                relatar_conferencia(conferencia)
+                if conferencia.divergencias:
+                    com_divergencia += 1
+                    metricas.contar(arquivo, divergencias=len(conferencia.divergencias))
+
+            registro = registros.get(arquivo)
+            destinos.iniciar_arquivo(arquivo)
+            resultado = _consolidar_relatorio(arquivo, lido, f_saida, not cabecalho_gravado,
+                                              destinos.analisar_todos or not registro, destinos, mapear)
+            if metricas.ativa():
+                metricas.contar(arquivo, linhas=resultado.linhas_dados, bytes=os.path.getsize(arquivo))
+            if len(resultado.cabecalho) == LINHAS_CABECALHO:
+                cabecalho_gravado = True
+
+            valor = Decimal('0')
+            if resultado.linhas_dados:
+                valor = _valor_relatorio(resultado, registro)
                 soma_total += valor
+            soma_total -= destinos.concluir_arquivo(arquivo, resultado)
+            if resultado.linhas_dados:
                 print(f"Valor total extraído do arquivo {os.path.basename(arquivo)}: {valor}, Soma acumulada: {soma_total}")
-                
-                # Adicionar linhas de dados ao consolidado
-                linhas_consolidadas.extend(dados)
-    
-    # Criar arquivo de saída
-    with open(arquivo_saida, 'w', encoding='utf-8') as f_saida:
-        # Escrever cabeçalhos
-        f_saida.writelines(cabecalhos)
-        
-        # Escrever linhas consolidadas
-        f_saida.writelines(linhas_consolidadas)
-        
+
+            if manifesto is not None and not registro:
+                with metricas.etapa('registro_manifesto'):
+                    registros[arquivo] = manifesto.registrar(
+                        OPERACAO_CONSOLIDACAO, arquivo, totais={'valor': str(valor)}, parametros=PARAMETROS_CONSOLIDACAO)
+
         # Adicionar linha com a soma total
-        valor_formatado = f"{soma_total:.2f}".replace('.', ',')
-        f_saida.write(f"\nTotal Geral de Todos os Arquivos:;;Total:;{valor_formatado};\n")
-    
+        valor_formatado = formatar_total_geral(soma_total)
+        with metricas.etapa('gravacao_total'):
+            f_saida.write(LINHA_TOTAL_GERAL.format(valor=valor_formatado))
+
+    os.replace(arquivo_temporario, arquivo_saida)
+
+    if manifesto is not None:
+        with metricas.etapa('registro_manifesto'):
+            manifesto.registrar(OPERACAO_CONSOLIDADO, arquivo_saida, totais={'soma': valor_formatado},
+                                parametros=_parametros_consolidado(arquivos, registros, destinos.modo_duplicados))
+
     print(f"\nProcessamento concluído!")
     print(f"Arquivo consolidado gerado: {arquivo_saida}")
     print(f"Soma total de todos os arquivos: {valor_formatado}")
+    destinos.relatar()
+    if conferencias is not None:
+        print(f"Arquivos com totais divergentes dos procedimentos: {com_divergencia} de {len(arquivos)}")
 
-if __name__ == "__main__":
+def criar_parser_argumentos():
+    """Cria o parser dos argumentos de linha de comando"""
+    parser = argparse.ArgumentParser(description="Consolida os relatórios de repasse em CSV em um único arquivo.")
+    parser.add_argument('diretorio', nargs='?', default=os.getcwd(), help="Diretório dos arquivos CSV")
+    parser.add_argument('padrao_arquivos', nargs='?', default="*.csv", help="Padrão dos arquivos (padrão: *.csv)")
+    parser.add_argument('arquivo_saida', nargs='?', default="consolidado.csv", help="Arquivo consolidado (padrão: consolidado.csv)")
+    parser.add_argument('--cache', action='store_true',
+                        help=f"Reaproveita os totais de arquivos sem alterações (manifesto '{NOME_MANIFESTO_PADRAO}' no diretório)")
+    parser.add_argument('--manifesto', metavar='ARQUIVO', help="Arquivo do manifesto (implica --cache)")
+    parser.add_argument('--invalidar-cache', action='store_true', help="Descarta o manifesto antes de processar")
+    parser.add_argument('-j', '--jobs', type=int, default=1,
+                        help="Número de arquivos lidos em paralelo (padrão: 1)")
+    parser.add_argument('--tabela', metavar='ARQUIVO',
+                        help="Grava também a tabela tipada dos procedimentos de todos os arquivos")
+    parser.add_argument('--esquema', default=ESQUEMA_REPASSE.nome, metavar='NOME|ARQUIVO',
+                        help="Esquema da tabela: 'repasse' (padrão) ou um arquivo JSON")
+    parser.add_argument('--duplicados', choices=MODOS_DUPLICADOS,
+                        help="Procedimentos repetidos entre relatórios: 'remover' do consolidado e do "
+                             "Total Geral, ou apenas 'marcar' (listar)")
+    parser.add_argument('--limite-duplicados', type=int, default=LIMITE_MEMORIA_PADRAO, metavar='N',
+                        help=f"Chaves mantidas em memória antes de o índice de duplicados passar para o "
+                             f"disco (padrão: {LIMITE_MEMORIA_PADRAO})")
+    parser.add_argument('--reconciliar', action='store_true',
+                        help="Confere as linhas de total de cada arquivo com a soma e a quantidade dos procedimentos")
+    parser.add_argument('--particionar', choices=CHAVES_PARTICAO,
+                        help="Grava também um arquivo por convênio, profissional ou mês, com o subtotal de cada um")
+    parser.add_argument('--diretorio-particoes', metavar='DIR',
+                        help="Diretório dos arquivos de partição (padrão: o subdiretório '<consolidado>_particoes' ao lado do consolidado)")
+    parser.add_argument('--max-abertos', type=int, default=MAX_ABERTOS_PADRAO, metavar='N',
+                        help=f"Arquivos de partição abertos ao mesmo tempo (padrão: {MAX_ABERTOS_PADRAO})")
+    compressao.adicionar_argumentos(parser)
+    metricas.adicionar_argumentos(parser)
+    return parser
+
+def executar_linha_comando(args):
+    """
+    Executa a consolidação pedida pelos argumentos de linha de comando.
+
+    Args:
+        args (argparse.Namespace): Argumentos lidos por criar_parser_argumentos
+
+    Returns:
+        bool: True se a consolidação foi executada, False se os argumentos são inválidos
+    """
+    if args.jobs < 1:
+        print("Erro: --jobs deve ser pelo menos 1.")
+        return False
+    if args.max_abertos < 1:
+        print("Erro: --max-abertos deve ser pelo menos 1.")
+        return False
+    try:
+        esquema = carregar_esquema(args.esquema)
+    except ValueError as e:
+        print(f"Erro: {str(e)}")
+        return False
+    # Definido sempre, pois o servidor de conversão executa vários trabalhos no mesmo processo
+    compressao.definir_nivel(args.nivel_compressao)
+    
+    # Manifesto de arquivos já processados (consolidação incremental)
+    manifesto = None
+    if args.cache or args.manifesto or args.invalidar_cache:
+        manifesto = Manifesto(args.manifesto or os.path.join(args.diretorio, NOME_MANIFESTO_PADRAO))
+        if args.invalidar_cache:
+            removidas = manifesto.invalidar(operacao=OPERACAO_CONSOLIDACAO) + manifesto.invalidar(operacao=OPERACAO_CONSOLIDADO)
+            print(f"Cache de consolidação invalidado ({removidas} entrada(s) removida(s)).")
+    
+    # Garantir que o arquivo de saída tenha caminho absoluto
+    arquivo_saida = args.arquivo_saida
+    if not os.path.isabs(arquivo_saida):
+        arquivo_saida = os.path.join(args.diretorio, arquivo_saida)
+    
+    destinos = DestinosProcedimentos(args.tabela, esquema, args.duplicados, args.limite_duplicados,
+                                     args.particionar, args.diretorio_particoes, args.max_abertos)
+    processar_arquivos_csv(args.diretorio, args.padrao_arquivos, arquivo_saida, manifesto, args.jobs, destinos,
+                           args.reconciliar)
+    
+    if manifesto is not None:
+        manifesto.salvar()
+    return True
+
+def main():
     # Verificar argumentos da linha de comando
     if len(sys.argv) < 2:
         diretorio = input("Digite o diretório dos arquivos CSV (ou pressione Enter para usar o diretório atual): ").strip()
@@ -108,14 +790,19 @@ if __name__ == "__main__":
         arquivo_saida = input("Digite o nome do arquivo de saída (ou pressione Enter para usar 'consolidado.csv'): ").strip()
         if not arquivo_saida:
             arquivo_saida = "consolidado.csv"
+        
+        # Garantir que o arquivo de saída tenha caminho absoluto
+        if not os.path.isabs(arquivo_saida):
+            arquivo_saida = os.path.join(diretorio, arquivo_saida)
+        
+        processar_arquivos_csv(diretorio, padrao_arquivos, arquivo_saida)
+        sucesso = True
     else:
-        diretorio = sys.argv[1] if len(sys.argv) > 1 else os.getcwd()
-        padrao_arquivos = sys.argv[2] if len(sys.argv) > 2 else "*.csv"
-        arquivo_saida = sys.argv[3] if len(sys.argv) > 3 else "consolidado.csv"
-    
-    # Garantir que o arquivo de saída tenha caminho absoluto
-    if not os.path.isabs(arquivo_saida):
-        arquivo_saida = os.path.join(diretorio, arquivo_saida)
+        args = criar_parser_argumentos().parse_args()
+        with metricas.medir(args.metricas, args.metricas_saida, args.perfil):
+            sucesso = executar_linha_comando(args)
     
-    # Processar os arquivos
-    processar_arquivos_csv(diretorio, padrao_arquivos, arquivo_saida)
+    sys.exit(0 if sucesso else 1)
+
+if __name__ == "__main__":
+    main()
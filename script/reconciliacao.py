@@ -0,0 +1,344 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Conferência dos totais dos relatórios com os valores de repasse dos procedimentos.
+
+A consolidação confia nas linhas 'Total <convênio>:' dos relatórios. A conferência soma o
+Repasse dos procedimentos de cada bloco de convênio e compara a soma e a quantidade de
+procedimentos com a linha de total do bloco ('Total Procedimentos:;N;Total <convênio>:;valor'),
+e a soma de cada profissional com a linha 'Total:' do relatório.
+
+Cada relatório é lido pelo pandas de uma vez e as colunas são tratadas de forma vetorizada:
+os valores com vírgula decimal ('1.024,27') são convertidos em centavos inteiros e somados
+por bloco com groupby, sem float nem laço por linha em Python. Vários relatórios são
+juntados em uma só tabela e conferidos juntos, para que milhares de relatórios pequenos não
+paguem, cada um, o custo fixo das operações do pandas. O formato gravado pelo conversor
+(',' e ponto decimal) também é aceito, assim como CSVs comprimidos.
+
+Uso: python reconciliacao.py [diretorio] [padrao_arquivos]
+"""
+
+import io
+import os
+import sys
+import argparse
+import numpy as np
+from collections import namedtuple
+from decimal import Decimal
+import compressao
+from parser_relatorio import detectar_delimitador, separador_decimal, eh_saida_gerada, TOTAL_PROCEDIMENTOS
+
+# Colunas lidas de cada linha do relatório (as linhas têm no máximo 6 campos)
+MAX_COLUNAS = 16
+
+COLUNA_PRIMEIRA = 0
+COLUNA_QUANTIDADE = 1
+COLUNA_ROTULO_TOTAL = 2
+COLUNA_VALOR_TOTAL = 3
+COLUNA_REPASSE = 4
+
+# Coluna acrescentada às linhas com o número do relatório no lote
+COLUNA_ARQUIVO = 'relatorio'
+
+# Relatórios conferidos de uma vez (ver conferir_arquivos)
+TAMANHO_LOTE = 256
+
+# Divergências listadas por arquivo
+MAX_LISTADAS = 20
+
+# Divergência entre uma linha de total e os procedimentos que ela resume; convenio é None
+# na linha 'Total:' do profissional. Valores em centavos; None se a linha não existe (um
+# bloco sem procedimentos e sem linha de total legíveis também é uma divergência)
+Divergencia = namedtuple('Divergencia', 'profissional convenio quantidade_informada quantidade '
+                                        'centavos_informados centavos')
+
+# Resultado da conferência de um relatório
+Conferencia = namedtuple('Conferencia', 'arquivo blocos procedimentos centavos divergencias')
+
+def ler_relatorio(arquivo):
+    """
+    Lê um relatório em CSV com o pandas, todas as células como texto.
+
+    Returns:
+        tuple: (DataFrame com uma linha por linha do relatório, separador decimal)
+    """
+    import pandas as pd
+
+    with compressao.abrir_arquivo(arquivo, 'r', encoding='utf-8-sig', newline='') as f:
+        texto = f.read()
+    delimitador = detectar_delimitador(texto[:texto.find('\n') + 1] or texto)
+    try:
+        tabela = pd.read_csv(io.StringIO(texto), sep=delimitador, header=None, names=range(MAX_COLUNAS), index_col=False,
+                             dtype=object, keep_default_na=False, skip_blank_lines=True, on_bad_lines='skip')
+    except pd.errors.EmptyDataError:
+        tabela = pd.DataFrame(columns=range(MAX_COLUNAS), dtype=object)
+    return tabela, separador_decimal(delimitador)
+
+def converter_centavos(textos, decimal=','):
+    """
+    Converte uma coluna de valores do relatório em centavos inteiros, de forma vetorizada.
+
+    Os textos são copiados para uma matriz de caracteres do NumPy (uma linha por valor) e
+    cada dígito é multiplicado pela potência de 10 da sua posição em relação ao separador
+    decimal, sem laço por valor em Python. A interpretação é a de
+    parser_relatorio.converter_valor: os demais caracteres (como o separador de milhar) são
+    ignorados, e os valores com mais de duas casas são arredondados (meio para cima).
+
+    Args:
+        textos (pd.Series): Valores como aparecem no relatório (ex: '1.024,27' ou '1024.27')
+        decimal (str, opcional): Separador decimal (padrão: ',')
+
+    Returns:
+        pd.Series: Centavos (Int64), <NA> onde o texto não tem nenhum dígito
+    """
+    import pandas as pd
+
+    valores = textos.to_numpy(dtype=object)
+    if len(valores) == 0:
+        return pd.Series([], index=textos.index, dtype='Int64')
+    caracteres = np.array(np.where(pd.notna(valores), valores, ''), dtype=str)
+    codigos = caracteres.view(np.uint32).reshape(len(valores), -1)
+    largura = codigos.shape[1]
+
+    digito = (codigos >= ord('0')) & (codigos <= ord('9'))
+    separador = codigos == ord(decimal)
+    posicao = np.arange(largura)
+    # Posição do último separador decimal de cada valor (largura se não houver)
+    ultimo = np.where(separador.any(axis=1), largura - 1 - np.argmax(separador[:, ::-1], axis=1), largura)
+    antes = digito & (posicao < ultimo[:, None])
+    depois = digito & (posicao > ultimo[:, None])
+
+    # Expoente de cada dígito em centavos: o último antes do separador vale 10^2, o primeiro
+    # depois 10^1 e o segundo 10^0; o terceiro só arredonda
+    ordem_antes = np.cumsum(antes[:, ::-1], axis=1)[:, ::-1]
+    ordem_depois = np.cumsum(depois, axis=1)
+    expoente = np.where(antes, ordem_antes + 1, np.where(depois & (ordem_depois <= 2), 2 - ordem_depois, -1))
+    algarismos = np.where(digito, codigos.astype(np.int64) - ord('0'), 0)
+    potencias = np.where(expoente >= 0, 10 ** np.clip(expoente, 0, 18), 0)
+    centavos = (algarismos * potencias).sum(axis=1)
+    centavos += (algarismos * (depois & (ordem_depois == 3))).sum(axis=1) >= 5
+    centavos = np.where((codigos == ord('-')).any(axis=1), -centavos, centavos)
+
+    return pd.Series(pd.array(centavos, dtype='Int64'), index=textos.index).where(digito.any(axis=1))
+
+def conferir_tabela(tabela, decimal=','):
+    """
+    Confere as linhas de total de um ou mais relatórios já lidos por ler_relatorio.
+
+    Args:
+        tabela (pd.DataFrame): Linhas dos relatórios, com a coluna COLUNA_ARQUIVO numerando o
+            relatório de cada linha (ver conferir_arquivos)
+        decimal (str, opcional): Separador decimal dos valores
+
+    Returns:
+        dict: Para cada número de relatório, (blocos de convênio, procedimentos, centavos
+            somados, lista de Divergencia)
+    """
+    import pandas as pd
+
+    relatorio = tabela[COLUNA_ARQUIVO]
+    inicio_relatorio = relatorio.ne(relatorio.shift())
+    primeira = tabela[COLUNA_PRIMEIRA].fillna('').str.strip()
+
+    # Cada profissional e cada bloco de convênio recebe um número, propagado às linhas
+    # seguintes; os nomes são extraídos só das linhas que abrem o profissional ou o bloco
+    inicio_profissional = primeira.str.startswith('Profissional:')
+    segmento = (inicio_profissional | inicio_relatorio).cumsum()
+    profissional = primeira[inicio_profissional].str.extract(r'^Profissional:\s*(.*?)\s*$', expand=False) \
+        .reindex(tabela.index).where(~inicio_relatorio | inicio_profissional).ffill()
+    inicio_bloco = primeira.str.match(r'Conv[êe]nio:')
+    bloco = inicio_bloco.cumsum()
+    convenio = primeira[inicio_bloco].str.extract(r'^Conv[êe]nio:\s*(.*?)\s*$', expand=False)
+
+    # Como no parser_relatorio, o bloco termina na sua linha de total ou em um novo
+    # profissional (e, aqui, também no fim do relatório)
+    linha_total = primeira == TOTAL_PROCEDIMENTOS
+    aberto = pd.Series(np.nan, index=tabela.index)
+    aberto[inicio_relatorio] = 0
+    aberto[inicio_bloco] = bloco[inicio_bloco]
+    aberto[linha_total | inicio_profissional] = 0
+    aberto = aberto.ffill().fillna(0).astype(np.int64)
+
+    procedimento = primeira.str.fullmatch(r'\d+') & (aberto > 0) & tabela[COLUNA_REPASSE].notna()
+    repasse = converter_centavos(tabela.loc[procedimento, COLUNA_REPASSE], decimal)
+    procedimentos = pd.DataFrame({'relatorio': relatorio[procedimento], 'bloco': aberto[procedimento],
+                                  'segmento': segmento[procedimento], 'centavos': repasse})
+    por_bloco = procedimentos.groupby('bloco').agg(quantidade=('centavos', 'size'), centavos=('centavos', 'sum'))
+    por_segmento = procedimentos.groupby('segmento').agg(quantidade=('centavos', 'size'), centavos=('centavos', 'sum'))
+
+    # Linhas de total: 'Total <convênio>:' fecha o bloco aberto; 'Total:' fecha o profissional
+    rotulo = tabela.loc[linha_total, COLUNA_ROTULO_TOTAL].fillna('').str.strip()
+    rotulo_total = rotulo.str.extract(r'^Total\s*(.*?)\s*:$', expand=False).dropna()
+    totais = pd.DataFrame({
+        'aberto': aberto.shift(fill_value=0).where(~inicio_relatorio, 0)[rotulo_total.index],
+        'segmento': segmento[rotulo_total.index],
+        'convenio': rotulo_total,
+        'quantidade': converter_centavos(tabela.loc[rotulo_total.index, COLUNA_QUANTIDADE], decimal) // 100,
+        'centavos': converter_centavos(tabela.loc[rotulo_total.index, COLUNA_VALOR_TOTAL], decimal),
+    })
+    totais_convenio = totais[totais['convenio'] != ''].set_index('aberto')
+    totais_relatorio = totais[totais['convenio'] == ''].set_index('segmento')
+
+    # Relatório, profissional e convênio de cada bloco e de cada segmento, para as mensagens
+    blocos = pd.DataFrame({'relatorio': relatorio, 'profissional': profissional, 'convenio': convenio})[inicio_bloco] \
+        .set_axis(bloco[inicio_bloco])
+    segmentos = pd.DataFrame({'relatorio': relatorio, 'profissional': profissional}).groupby(segmento).first()
+    segmentos['convenio'] = None
+    divergencias = _comparar(por_bloco, totais_convenio, blocos) + \
+        _comparar(por_segmento, totais_relatorio, segmentos, exigir_total=False)
+
+    resultados = {}
+    contagem_blocos = relatorio[inicio_bloco].value_counts()
+    somas = procedimentos.groupby('relatorio')['centavos'].agg(['size', 'sum'])
+    for numero in relatorio.unique():
+        resultados[numero] = (int(contagem_blocos.get(numero, 0)),
+                              int(somas['size'].get(numero, 0)), int(somas['sum'].get(numero, 0)), [])
+    for numero, divergencia in sorted(divergencias, key=lambda item: item[0]):
+        resultados[numero][3].append(divergencia)
+    return resultados
+
+def _comparar(somas, totais, origens, exigir_total=True):
+    """
+    Compara as somas dos procedimentos (por bloco ou profissional) com as linhas de total.
+
+    Args:
+        somas (pd.DataFrame): quantidade e centavos somados, indexados pelo bloco/segmento
+        totais (pd.DataFrame): quantidade e centavos informados, pelo mesmo índice
+        origens (pd.DataFrame): relatorio, profissional e convenio de cada índice
+        exigir_total (bool, opcional): Se True, procedimentos sem linha de total são divergência,
+            assim como os índices de origens sem procedimentos nem linha de total (blocos que
+            não puderam ser lidos, ex: linhas em outro formato de CSV)
+
+    Returns:
+        list: (número do relatório, Divergencia) encontradas, na ordem dos relatórios
+    """
+    import pandas as pd
+
+    totais = totais[~totais.index.duplicated(keep='last')]
+    juntos = somas.join(totais[['quantidade', 'centavos']], how='outer', rsuffix='_informados')
+    if exigir_total:
+        juntos = juntos.reindex(juntos.index.union(origens.index))
+    else:
+        juntos = juntos[juntos['centavos_informados'].notna()]
+    juntos = juntos.astype({'quantidade': 'Int64', 'centavos': 'Int64'})
+    juntos[['quantidade', 'centavos']] = juntos[['quantidade', 'centavos']].fillna(0)
+    diferentes = juntos['quantidade'].ne(juntos['quantidade_informados']).fillna(True) | \
+                 juntos['centavos'].ne(juntos['centavos_informados']).fillna(True)
+
+    # Só as divergências (normalmente nenhuma) são percorridas uma a uma
+    divergencias = []
+    for indice, linha in juntos[diferentes.astype(bool)].join(origens).iterrows():
+        divergencias.append((linha['relatorio'], Divergencia(
+            None if pd.isna(linha['profissional']) else linha['profissional'],
+            None if pd.isna(linha['convenio']) else linha['convenio'],
+            None if pd.isna(linha['quantidade_informados']) else int(linha['quantidade_informados']),
+            int(linha['quantidade']),
+            None if pd.isna(linha['centavos_informados']) else int(linha['centavos_informados']),
+            int(linha['centavos']))))
+    return divergencias
+
+def conferir_arquivos(arquivos, tamanho_lote=TAMANHO_LOTE):
+    """
+    Confere os totais de vários relatórios em CSV com os procedimentos.
+
+    Os relatórios são lidos um a um, mas conferidos em lotes de até tamanho_lote arquivos,
+    juntados em uma única tabela: o custo fixo de cada operação do pandas é pago uma vez por
+    lote, e não uma vez por relatório.
+
+    Args:
+        arquivos (list): Relatórios (podem estar comprimidos, ver compressao.py)
+        tamanho_lote (int, opcional): Relatórios conferidos de uma vez
+
+    Yields:
+        Conferencia: Uma por relatório, na ordem da lista
+    """
+    import pandas as pd
+
+    for inicio in range(0, len(arquivos), tamanho_lote):
+        lote = arquivos[inicio:inicio + tamanho_lote]
+        lidos = [ler_relatorio(arquivo) for arquivo in lote]
+        resultados = {}
+        # Os valores de cada formato (vírgula ou ponto decimal) são convertidos separadamente
+        for decimal in {decimal for _, decimal in lidos}:
+            numeros = [i for i, (_, formato) in enumerate(lidos) if formato == decimal]
+            tabela = pd.concat([lidos[i][0].assign(**{COLUNA_ARQUIVO: i}) for i in numeros], ignore_index=True)
+            resultados.update(conferir_tabela(tabela, decimal))
+        for i, arquivo in enumerate(lote):
+            yield Conferencia(arquivo, *resultados.get(i, (0, 0, 0, [])))
+
+def conferir_arquivo(arquivo):
+    """
+    Confere os totais de um relatório em CSV com os procedimentos.
+
+    Args:
+        arquivo (str): Caminho para o relatório (pode estar comprimido, ver compressao.py)
+
+    Returns:
+        Conferencia: Blocos, procedimentos e centavos conferidos e as divergências encontradas
+    """
+    return next(conferir_arquivos([arquivo]))
+
+def formatar_centavos(centavos):
+    """Formata centavos como no Total Geral (ex: 102427 -> '1024,27'); '-' se ausente"""
+    if centavos is None:
+        return '-'
+    return f"{Decimal(centavos) / 100:.2f}".replace('.', ',')
+
+def descrever_divergencia(divergencia):
+    """Descreve uma divergência em uma linha de texto"""
+    local = "Total:" if divergencia.convenio is None else f"Total {divergencia.convenio}:"
+    if divergencia.profissional:
+        local += f" ({divergencia.profissional})"
+    if divergencia.centavos_informados is None and not divergencia.quantidade:
+        return f"{local.replace('Total', 'Convênio', 1)} bloco sem procedimentos nem linha de total legíveis"
+    if divergencia.centavos_informados is None:
+        return (f"{local} sem linha de total ({divergencia.quantidade} procedimento(s), "
+                f"{formatar_centavos(divergencia.centavos)})")
+    return (f"{local} informa {divergencia.quantidade_informada} procedimento(s) e "
+            f"{formatar_centavos(divergencia.centavos_informados)}; os procedimentos somam "
+            f"{divergencia.quantidade} e {formatar_centavos(divergencia.centavos)}")
+
+def relatar_conferencia(conferencia):
+    """Exibe as divergências de um relatório (até MAX_LISTADAS)"""
+    for divergencia in conferencia.divergencias[:MAX_LISTADAS]:
+        print(f"  - Divergência: {descrever_divergencia(divergencia)}")
+    if len(conferencia.divergencias) > MAX_LISTADAS:
+        print(f"  - ... e mais {len(conferencia.divergencias) - MAX_LISTADAS} divergência(s)")
+
+def criar_parser_argumentos():
+    """Cria o parser dos argumentos de linha de comando"""
+    parser = argparse.ArgumentParser(description="Confere os totais dos relatórios em CSV com os procedimentos.")
+    parser.add_argument('diretorio', nargs='?', default=os.getcwd(), help="Diretório dos arquivos CSV")
+    parser.add_argument('padrao_arquivos', nargs='?', default="*.csv", help="Padrão dos arquivos (padrão: *.csv)")
+    return parser
+
+def main():
+    args = criar_parser_argumentos().parse_args()
+    arquivos = sorted(compressao.expandir_padrao(os.path.join(args.diretorio, args.padrao_arquivos)))
+    # O consolidado e as partições repetem os relatórios, em blocos que não são conferíveis
+    for arquivo in [arquivo for arquivo in arquivos if eh_saida_gerada(arquivo)]:
+        print(f"{arquivo}: consolidado ou partição gerado pelos scripts, ignorado")
+        arquivos.remove(arquivo)
+    if not arquivos:
+        print(f"Nenhum arquivo encontrado com o padrão: {args.padrao_arquivos}")
+        return 1
+
+    com_divergencia = 0
+    procedimentos = 0
+    for conferencia in conferir_arquivos(arquivos):
+        arquivo = conferencia.arquivo
+        procedimentos += conferencia.procedimentos
+        situacao = f"{len(conferencia.divergencias)} divergência(s)" if conferencia.divergencias else "ok"
+        print(f"{arquivo}: {conferencia.blocos} convênio(s), {conferencia.procedimentos} procedimento(s), "
+              f"{formatar_centavos(conferencia.centavos)}: {situacao}")
+        relatar_conferencia(conferencia)
+        if conferencia.divergencias:
+            com_divergencia += 1
+
+    print(f"\n{len(arquivos)} arquivo(s) conferido(s), {procedimentos} procedimento(s); "
+          f"{com_divergencia} com divergência")
+    return 1 if com_divergencia else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,341 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Servidor de conversão que mantém o pandas carregado entre um trabalho e outro.
+
+Cada execução de `python xls_to_csv_interface.py entrada.xls saida.csv 0` paga a
+inicialização do Python e a importação do pandas, do xlrd e do openpyxl, que em relatórios
+pequenos demoram mais que a própria conversão. O servidor fica em execução, com um pool de
+processos que já importou essas bibliotecas, e recebe os trabalhos por um socket local
+(Unix, ou TCP em 127.0.0.1 nos sistemas sem sockets Unix):
+
+    python servidor_conversao.py [--endereco CAMINHO|HOST:PORTA] [--processos N]
+
+Os trabalhos são enviados pelo cliente_conversao.py com os mesmos argumentos de linha de
+comando do xls_to_csv_interface.py (conversão) ou do processar_csv_final_ajustado.py
+(consolidação). Cada trabalho roda em um processo do pool, no diretório de trabalho do
+cliente, com o mesmo tempo limite por arquivo do modo lote, e as mensagens que o script
+exibiria são devolvidas ao cliente.
+
+Como os trabalhos gravam arquivos com as permissões de quem executa o servidor, só o próprio
+usuário pode enviá-los: o socket Unix fica em um diretório privado (permissão 0700), o modo
+TCP só aceita endereços de loopback, e toda requisição precisa do token gerado na partida do
+servidor, gravado em um arquivo que só o usuário pode ler (ver arquivo_token).
+
+Protocolo: uma linha JSON por requisição ({"operacao", "argumentos", "diretorio", "token"})
+e uma linha JSON por resposta ({"sucesso", "saida"}).
+"""
+
+import io
+import os
+import re
+import sys
+import hmac
+import json
+import stat
+import time
+import signal
+import socket
+import secrets
+import argparse
+import tempfile
+import ipaddress
+import contextlib
+import socketserver
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as TempoFuturoEsgotado
+
+OPERACAO_CONVERSAO = 'conversao'
+OPERACAO_CONSOLIDACAO = 'consolidacao'
+OPERACOES = (OPERACAO_CONVERSAO, OPERACAO_CONSOLIDACAO)
+
+# Porta usada quando não há sockets Unix (ex: Windows)
+PORTA_PADRAO = 8765
+
+# Tamanho máximo de uma requisição (os argumentos de linha de comando de um trabalho)
+TAMANHO_MAXIMO_REQUISICAO = 1024 * 1024
+
+# Segundos além do tempo limite que o servidor espera por um trabalho antes de desistir dele
+# (nos sistemas sem SIGALRM, em que o próprio processo do pool não interrompe o trabalho)
+FOLGA_TEMPO_LIMITE = 5
+
+def diretorio_privado():
+    """Diretório do usuário, no diretório temporário, com o socket e o token do servidor"""
+    usuario = os.getuid() if hasattr(os, 'getuid') else os.environ.get('USERNAME', '0')
+    return os.path.join(tempfile.gettempdir(), f"conversor_csv_{usuario}")
+
+def preparar_diretorio_privado(diretorio=None):
+    """
+    Cria o diretório privado com permissão 0700, ou confere um já existente.
+
+    Raises:
+        OSError: Se o diretório pertence a outro usuário ou pode ser acessado por outros
+    """
+    diretorio = diretorio or diretorio_privado()
+    try:
+        os.mkdir(diretorio, 0o700)
+    except FileExistsError:
+        pass
+    info = os.lstat(diretorio)
+    if not stat.S_ISDIR(info.st_mode):
+        raise OSError(f"'{diretorio}' não é um diretório")
+    if hasattr(os, 'getuid') and (info.st_uid != os.getuid() or info.st_mode & 0o077):
+        raise OSError(f"o diretório '{diretorio}' pertence a outro usuário ou pode ser acessado por outros")
+    return diretorio
+
+def endereco_padrao():
+    """
+    Endereço padrão do servidor: um socket Unix no diretório privado do usuário, ou
+    127.0.0.1:8765 nos sistemas sem sockets Unix.
+    """
+    if hasattr(socket, 'AF_UNIX'):
+        return os.path.join(diretorio_privado(), 'servidor.sock')
+    return f"127.0.0.1:{PORTA_PADRAO}"
+
+def arquivo_token(endereco):
+    """Arquivo com o token do servidor em um endereço (no diretório privado do usuário)"""
+    return os.path.join(diretorio_privado(), "token_" + re.sub(r'[^A-Za-z0-9._-]', '_', endereco))
+
+def eh_loopback(host):
+    """Indica se o host é um endereço de loopback (ex: 127.0.0.1, ::1 ou localhost)"""
+    if host == 'localhost':
+        return True
+    try:
+        return ipaddress.ip_address(host).is_loopback
+    except ValueError:
+        return False
+
+def interpretar_endereco(endereco):
+    """
+    Interpreta o endereço do servidor.
+
+    Args:
+        endereco (str): Caminho de um socket Unix ou 'host:porta'
+
+    Returns:
+        tuple: (família do socket, endereço no formato do módulo socket)
+    """
+    host, separador, porta = endereco.rpartition(':')
+    if separador and porta.isdigit() and os.sep not in endereco:
+        return socket.AF_INET, (host or '127.0.0.1', int(porta))
+    return socket.AF_UNIX, endereco
+
+def _aquecer():
+    """Importa as bibliotecas de leitura no processo do pool, antes do primeiro trabalho"""
+    # O Ctrl+C é tratado pelo processo principal, que encerra o pool
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    for modulo in ('pandas', 'xlrd', 'openpyxl'):
+        try:
+            __import__(modulo)
+        except ImportError:
+            pass
+    # Também os próprios scripts, que importam o resto das dependências
+    import xls_to_csv_interface
+    import processar_csv_final_ajustado
+
+def executar_trabalho(operacao, argumentos, diretorio, timeout=None):
+    """
+    Executa um trabalho como se o script tivesse sido chamado na linha de comando.
+
+    Args:
+        operacao (str): 'conversao' ou 'consolidacao'
+        argumentos (list): Argumentos de linha de comando do script
+        diretorio (str): Diretório de trabalho do cliente
+        timeout (float, opcional): Tempo máximo do trabalho, em segundos (0 ou None desativa)
+
+    Returns:
+        tuple: (sucesso, mensagens exibidas pelo script)
+    """
+    import metricas
+    from xls_to_csv_interface import TempoEsgotado, _estourar_tempo
+    if operacao == OPERACAO_CONVERSAO:
+        import xls_to_csv_interface as script
+    else:
+        import processar_csv_final_ajustado as script
+
+    # Como no modo lote, o próprio processo interrompe o trabalho ao estourar o tempo (POSIX)
+    usar_alarme = bool(timeout) and hasattr(signal, 'SIGALRM')
+    saida = io.StringIO()
+    with contextlib.redirect_stdout(saida), contextlib.redirect_stderr(saida):
+        if usar_alarme:
+            signal.signal(signal.SIGALRM, _estourar_tempo)
+            signal.setitimer(signal.ITIMER_REAL, timeout)
+        try:
+            # Cada processo do pool executa um trabalho por vez, então pode mudar de diretório
+            os.chdir(diretorio)
+            sys.argv = [script.__file__] + argumentos
+            args = script.criar_parser_argumentos().parse_args(argumentos)
+            with metricas.medir(args.metricas, args.metricas_saida, args.perfil):
+                sucesso = script.executar_linha_comando(args)
+        except SystemExit as e:
+            # Erro nos argumentos (ou --help): o argparse já exibiu a mensagem
+            sucesso = e.code in (0, None)
+        except TempoEsgotado:
+            print(f"Erro: tempo limite de {timeout}s excedido")
+            sucesso = False
+        except Exception as e:
+            print(f"Erro durante o trabalho: {str(e)}")
+            sucesso = False
+        finally:
+            if usar_alarme:
+                signal.setitimer(signal.ITIMER_REAL, 0)
+    return sucesso, saida.getvalue()
+
+class _ManipuladorTrabalho(socketserver.StreamRequestHandler):
+    """Recebe uma requisição, executa o trabalho no pool e devolve a resposta"""
+
+    def handle(self):
+        linha = self.rfile.readline(TAMANHO_MAXIMO_REQUISICAO)
+        if not linha:
+            return
+        inicio = time.perf_counter()
+        operacao, argumentos = '?', []
+        try:
+            requisicao = json.loads(linha)
+            if not hmac.compare_digest(str(requisicao.get('token', '')), self.server.token):
+                raise PermissionError("token ausente ou inválido")
+            operacao = requisicao['operacao']
+            if operacao not in OPERACOES:
+                raise ValueError(f"operação inválida: {operacao}")
+            argumentos = [str(argumento) for argumento in requisicao.get('argumentos', [])]
+            diretorio = requisicao.get('diretorio') or os.getcwd()
+            timeout = self.server.timeout_trabalho
+            futuro = self.server.executor.submit(executar_trabalho, operacao, argumentos, diretorio, timeout)
+            sucesso, saida = futuro.result(timeout=timeout + FOLGA_TEMPO_LIMITE if timeout else None)
+        except PermissionError as e:
+            sucesso, saida = False, f"Erro: requisição recusada ({str(e)})\n"
+        except TempoFuturoEsgotado:
+            sucesso, saida = False, f"Erro: tempo limite de {self.server.timeout_trabalho}s excedido\n"
+        except (ValueError, KeyError, TypeError) as e:
+            sucesso, saida = False, f"Erro: requisição inválida ({str(e)})\n"
+        except Exception as e:
+            # Ex: um processo do pool foi encerrado durante o trabalho
+            sucesso, saida = False, f"Erro no servidor: {str(e)}\n"
+
+        resposta = json.dumps({'sucesso': sucesso, 'saida': saida}, ensure_ascii=False) + "\n"
+        try:
+            self.wfile.write(resposta.encode('utf-8'))
+        except OSError:
+            pass  # Cliente desconectado
+        situacao = "ok" if sucesso else "falha"
+        print(f"[{time.strftime('%H:%M:%S')}] {operacao} {' '.join(argumentos)}: {situacao} "
+              f"({time.perf_counter() - inicio:.3f}s)", flush=True)
+
+class _ServidorTCP(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+def _encerrar(signum, frame):
+    raise KeyboardInterrupt
+
+def _servidor_ativo(familia, endereco):
+    """Indica se já há um servidor respondendo no endereço"""
+    try:
+        with socket.socket(familia, socket.SOCK_STREAM) as s:
+            s.settimeout(1)
+            s.connect(endereco)
+        return True
+    except OSError:
+        return False
+
+def _gravar_token(caminho):
+    """Gera o token do servidor e o grava em um arquivo que só o usuário pode ler"""
+    token = secrets.token_hex(32)
+    with contextlib.suppress(FileNotFoundError):
+        os.remove(caminho)
+    descritor = os.open(caminho, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+    with os.fdopen(descritor, 'w', encoding='utf-8') as f:
+        f.write(token)
+    return token
+
+def iniciar_servidor(endereco=None, processos=None, timeout=None):
+    """
+    Executa o servidor até ser interrompido (Ctrl+C).
+
+    Args:
+        endereco (str, opcional): Socket Unix ou 'host:porta' de loopback (padrão: endereco_padrao())
+        processos (int, opcional): Processos do pool (padrão: número de núcleos)
+        timeout (float, opcional): Tempo máximo de cada trabalho, em segundos (0 ou None desativa)
+
+    Returns:
+        bool: False se o servidor não pôde ser iniciado
+    """
+    endereco = endereco or endereco_padrao()
+    familia, endereco_socket = interpretar_endereco(endereco)
+
+    if familia == socket.AF_INET and not eh_loopback(endereco_socket[0]):
+        print(f"Erro: O servidor só aceita endereços de loopback (ex: 127.0.0.1:{PORTA_PADRAO}), e não '{endereco}'.")
+        return False
+    try:
+        # Também guarda o token; um socket fora dele é protegido pela máscara no bind (abaixo)
+        preparar_diretorio_privado()
+    except OSError as e:
+        print(f"Erro: {str(e)}")
+        return False
+    if _servidor_ativo(familia, endereco_socket):
+        print(f"Erro: Já há um servidor em execução em '{endereco}'.")
+        return False
+    if familia != socket.AF_INET and os.path.exists(endereco_socket):
+        # Socket deixado por um servidor que não foi encerrado corretamente
+        os.remove(endereco_socket)
+    caminho_token = arquivo_token(endereco)
+    token = _gravar_token(caminho_token)
+
+    processos = processos or os.cpu_count() or 1
+    executor = ProcessPoolExecutor(max_workers=processos, initializer=_aquecer)
+    # Inicia os processos do pool já na partida, e não no primeiro trabalho (cada espera
+    # ocupa um processo, forçando a criação dos demais)
+    for futuro in [executor.submit(time.sleep, 0.1) for _ in range(processos)]:
+        futuro.result()
+
+    if familia == socket.AF_INET:
+        servidor = _ServidorTCP(endereco_socket, _ManipuladorTrabalho)
+    else:
+        # O socket já nasce com permissão 0600 (sem intervalo entre o bind e um chmod)
+        mascara = os.umask(0o177)
+        try:
+            servidor = socketserver.ThreadingUnixStreamServer(endereco_socket, _ManipuladorTrabalho)
+        finally:
+            os.umask(mascara)
+        servidor.daemon_threads = True
+    servidor.executor = executor
+    servidor.token = token
+    servidor.timeout_trabalho = timeout
+
+    print(f"Servidor de conversão em '{endereco}' com {processos} processo(s). Pressione Ctrl+C para encerrar.", flush=True)
+    # Encerrado pelo sistema (ex: kill, systemd): remove o socket como no Ctrl+C
+    signal.signal(signal.SIGTERM, _encerrar)
+    try:
+        servidor.serve_forever()
+    except KeyboardInterrupt:
+        print("\nEncerrando o servidor...")
+    finally:
+        servidor.server_close()
+        executor.shutdown(wait=True, cancel_futures=True)
+        if familia != socket.AF_INET and os.path.exists(endereco_socket):
+            os.remove(endereco_socket)
+        with contextlib.suppress(FileNotFoundError):
+            os.remove(caminho_token)
+    return True
+
+def criar_parser_argumentos():
+    """Cria o parser dos argumentos de linha de comando"""
+    from xls_to_csv_interface import TIMEOUT_PADRAO_LOTE
+    parser = argparse.ArgumentParser(description="Servidor que executa conversões e consolidações com o pandas já carregado.")
+    parser.add_argument('--endereco', default=None,
+                        help=f"Socket Unix ou host:porta de loopback (padrão: {endereco_padrao()})")
+    parser.add_argument('--processos', type=int, default=None,
+                        help="Número de processos do pool (padrão: número de núcleos)")
+    parser.add_argument('--timeout', type=float, default=TIMEOUT_PADRAO_LOTE,
+                        help=f"Tempo máximo de cada trabalho, em segundos (padrão: {TIMEOUT_PADRAO_LOTE}; 0 desativa)")
+    return parser
+
+def main():
+    args = criar_parser_argumentos().parse_args()
+    if args.processos is not None and args.processos < 1:
+        print("Erro: --processos deve ser pelo menos 1.")
+        return 1
+    return 0 if iniciar_servidor(args.endereco, args.processos, args.timeout) else 1
+
+if __name__ == "__main__":
+    sys.exit(main())
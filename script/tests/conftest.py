@@ -0,0 +1,37 @@
+import os
+import sys
+import glob
+import shutil
+from decimal import Decimal
+
+import pytest
+
+# Os scripts ficam na pasta acima e são importados pelo nome (ex: import parser_relatorio)
+PASTA_SCRIPTS = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, PASTA_SCRIPTS)
+
+PASTA_CSV = os.path.join(PASTA_SCRIPTS, 'arq csv')
+PASTA_XLS = os.path.join(PASTA_SCRIPTS, 'arq xls')
+
+# Total Geral do consolidado dos relatórios de exemplo ('anne colono 1..5.csv')
+TOTAL_EXEMPLOS = Decimal('2759.63')
+
+@pytest.fixture
+def relatorios(tmp_path):
+    """Cópia dos relatórios de exemplo em um diretório temporário"""
+    diretorio = tmp_path / 'relatorios'
+    diretorio.mkdir()
+    for arquivo in glob.glob(os.path.join(PASTA_CSV, 'anne colono *.csv')):
+        shutil.copy(arquivo, diretorio)
+    return str(diretorio)
+
+def ler_total_geral(arquivo):
+    """Lê o valor da linha 'Total Geral de Todos os Arquivos:' de um consolidado"""
+    import compressao
+    from parser_relatorio import converter_valor, TOTAL_GERAL
+
+    with compressao.abrir_arquivo(arquivo, 'r', encoding='utf-8') as f:
+        for linha in f:
+            if linha.startswith(TOTAL_GERAL):
+                return converter_valor(linha.split(';')[3])
+    return None
@@ -0,0 +1,65 @@
+import glob
+import os
+
+import pytest
+
+import compressao
+from conftest import TOTAL_EXEMPLOS, ler_total_geral
+from parser_relatorio import eh_saida_gerada
+from processar_csv_final_ajustado import processar_arquivos_csv
+
+TEXTO = 'Convênio: CAMED;Cód.Ate;Data;Paciente;Procedimento;Repasse\n120700 ;27/11/2024;KATIA;COLONOSCOPIA;151,50;\n'
+
+EXTENSOES = sorted(compressao.EXTENSOES)
+
+@pytest.mark.parametrize('extensao', EXTENSOES)
+def test_ida_e_volta(tmp_path, extensao):
+    arquivo = str(tmp_path / ('a.csv' + extensao))
+    with compressao.abrir_arquivo(arquivo, 'w', encoding='utf-8') as f:
+        f.write(TEXTO)
+    # Reaberto para acréscimo, como as partições: o arquivo passa a ter dois trechos
+    with compressao.abrir_arquivo(arquivo, 'a', encoding='utf-8') as f:
+        f.write(TEXTO)
+
+    with open(arquivo, 'rb') as f:
+        assert TEXTO.encode('utf-8') not in f.read()
+    with compressao.abrir_arquivo(arquivo, 'r', encoding='utf-8') as f:
+        assert f.read() == TEXTO * 2
+
+@pytest.mark.parametrize('nivel', [1, 9])
+def test_nivel(tmp_path, nivel):
+    arquivo = str(tmp_path / 'a.csv.gz')
+    compressao.definir_nivel(nivel)
+    try:
+        with compressao.abrir_arquivo(arquivo, 'wb') as f:
+            f.write(TEXTO.encode('utf-8') * 100)
+    finally:
+        compressao.definir_nivel(None)
+    with compressao.abrir_arquivo(arquivo, 'rb') as f:
+        assert f.read() == TEXTO.encode('utf-8') * 100
+
+def test_nivel_invalido():
+    with pytest.raises(ValueError):
+        compressao.definir_nivel(10)
+
+def test_expandir_padrao(tmp_path):
+    for nome in ['a.csv', 'b.csv.gz', 'c.csv.bz2', 'd.csv.xz', 'e.txt.gz']:
+        (tmp_path / nome).write_bytes(b'')
+    encontrados = compressao.expandir_padrao(str(tmp_path / '*.csv'))
+    assert sorted(os.path.basename(arquivo) for arquivo in encontrados) == ['a.csv', 'b.csv.gz', 'c.csv.bz2', 'd.csv.xz']
+    assert compressao.remover_extensao_compressao('b.csv.gz') == 'b.csv'
+
+def test_consolidacao_comprimida(relatorios):
+    # Cada relatório em um formato; o consolidado gravado em xz
+    for arquivo, extensao in zip(sorted(glob.glob(os.path.join(relatorios, '*.csv'))), EXTENSOES * 2):
+        with open(arquivo, 'rb') as origem, compressao.abrir_arquivo(arquivo + extensao, 'wb') as destino:
+            destino.write(origem.read())
+        os.remove(arquivo)
+    saida = os.path.join(relatorios, 'consolidado.csv.xz')
+    processar_arquivos_csv(relatorios, '*.csv', saida)
+
+    assert ler_total_geral(saida) == TOTAL_EXEMPLOS
+    assert eh_saida_gerada(saida)
+    # Uma nova execução não soma o consolidado comprimido
+    processar_arquivos_csv(relatorios, '*.csv', saida)
+    assert ler_total_geral(saida) == TOTAL_EXEMPLOS
@@ -0,0 +1,50 @@
+import os
+import shutil
+
+from conftest import TOTAL_EXEMPLOS, ler_total_geral
+from duplicados import IndiceDuplicados, MODO_MARCAR
+from parser_relatorio import Procedimento
+from processar_csv_final_ajustado import processar_arquivos_csv, DestinosProcedimentos
+
+def _procedimento(codigo, repasse=None):
+    return Procedimento('ANNE', 'CAMED', str(codigo), '27/11/2024', 'PACIENTE', 'COLONOSCOPIA', repasse)
+
+def _verificar_todos(indice, arquivos):
+    resultado = []
+    for arquivo, codigos in arquivos:
+        indice.iniciar_arquivo(arquivo)
+        resultado.extend(indice.verificar(_procedimento(codigo)) for codigo in codigos)
+    return resultado
+
+def test_disco_igual_a_memoria(tmp_path):
+    # Repetidos no próprio arquivo não contam; entre arquivos apontam o primeiro arquivo
+    arquivos = [('a.csv', [1, 2, 3, 3]), ('b.csv', [2, 4, 5, 1]), ('c.csv', [5, 6, 6, 4, 7])]
+    with IndiceDuplicados() as memoria:
+        esperado = _verificar_todos(memoria, arquivos)
+        assert memoria._banco is None
+    with IndiceDuplicados(limite_memoria=2, diretorio=str(tmp_path)) as disco:
+        assert _verificar_todos(disco, arquivos) == esperado
+        assert disco._banco is not None
+        assert disco.duplicados == memoria.duplicados == 4
+    assert esperado == [None] * 4 + ['a.csv', None, None, 'a.csv', 'b.csv', None, None, 'b.csv', None]
+    # O banco temporário é removido ao sair
+    assert os.listdir(tmp_path) == []
+
+def _consolidar(relatorios, saida, **opcoes):
+    processar_arquivos_csv(relatorios, '*.csv', saida, destinos=DestinosProcedimentos(**opcoes))
+    with open(saida, 'rb') as f:
+        return f.read()
+
+def test_consolidado_igual_com_e_sem_disco(relatorios, tmp_path):
+    # Um relatório repetido com outro nome: todos os seus procedimentos são duplicados
+    shutil.copy(os.path.join(relatorios, 'anne colono 2.csv'), os.path.join(relatorios, 'anne colono 6.csv'))
+
+    memoria = _consolidar(relatorios, str(tmp_path / 'memoria.csv'), duplicados='remover')
+    disco = _consolidar(relatorios, str(tmp_path / 'disco.csv'), duplicados='remover', limite_duplicados=1)
+    assert memoria == disco
+    assert ler_total_geral(str(tmp_path / 'disco.csv')) == TOTAL_EXEMPLOS
+
+    # Marcados, os duplicados continuam no Total Geral
+    marcado = str(tmp_path / 'marcado.csv')
+    _consolidar(relatorios, marcado, duplicados=MODO_MARCAR, limite_duplicados=1)
+    assert ler_total_geral(marcado) > TOTAL_EXEMPLOS
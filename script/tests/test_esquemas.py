@@ -0,0 +1,56 @@
+import pytest
+
+pd = pytest.importorskip('pandas')
+
+from esquemas import Coluna, Esquema, ESQUEMA_REPASSE, tipar_procedimentos, tipar_dataframe, linhas_dataframe
+from parser_relatorio import analisar_registros
+
+# Coluna 'inteiro' lida do campo Paciente, para exercitar textos que não são códigos
+ESQUEMA_TESTE = Esquema('teste', ESQUEMA_REPASSE.colunas + (Coluna('numero', 'inteiro', 2),), '%d/%m/%Y')
+
+NUMEROS = [' 12 ', '-5', '+7', '007', '1.5', 'abc', '', '  -42']
+
+def _linhas_relatorio():
+    linhas = [
+        ['Profissional: ANNE MICHELLE COLONO', '', '', '', ''],
+        ['Convênio: CAMED', 'Cód.Ate', 'Data', 'Paciente', 'Procedimento', 'Repasse'],
+    ]
+    for i, numero in enumerate(NUMEROS):
+        linhas.append([f' {120700 + i} ', '27/11/2024', numero, 'COLONOSCOPIA', '151,50', ''])
+    linhas.append(['Total Procedimentos:', str(len(NUMEROS)), 'Total CAMED:', '1212,00', '', ''])
+    return linhas
+
+def test_inteiro_igual_nos_dois_caminhos():
+    linhas = _linhas_relatorio()
+    puro = list(tipar_procedimentos(analisar_registros(linhas), ESQUEMA_TESTE))
+
+    # No pandas, os valores chegam como o texto da planilha (dtype=object), centavos como número
+    bruto = pd.DataFrame([(campos + [''] * 6)[:6] for campos in linhas], dtype=object)
+    bruto[4] = bruto[4].map(lambda texto: float(texto.replace(',', '.')) if texto[:1].isdigit() else texto)
+    tabela = tipar_dataframe(bruto, ESQUEMA_TESTE)
+    vetorizado = list(linhas_dataframe(tabela, ESQUEMA_TESTE))
+
+    assert vetorizado == puro
+    assert [linha[-1] for linha in puro] == [12, -5, 7, 7, None, None, None, -42]
+    assert [linha[2] for linha in puro] == list(range(120700, 120700 + len(NUMEROS)))
+
+# Meios centavos: o arredondamento é sempre para cima (em módulo), nos dois caminhos
+REPASSES = ['1,005', '0,125', '0,145', '-0,125', '2,675', '170,95', '154']
+CENTAVOS = [101, 13, 15, -13, 268, 17095, 15400]
+
+def test_centavos_iguais_nos_dois_caminhos():
+    linhas = [
+        ['Profissional: ANNE MICHELLE COLONO', '', '', '', ''],
+        ['Convênio: CAMED', 'Cód.Ate', 'Data', 'Paciente', 'Procedimento', 'Repasse'],
+    ]
+    for i, repasse in enumerate(REPASSES):
+        linhas.append([str(120700 + i), '27/11/2024', 'PACIENTE', 'COLONOSCOPIA', repasse, ''])
+    puro = list(tipar_procedimentos(analisar_registros(linhas), ESQUEMA_REPASSE))
+
+    bruto = pd.DataFrame([(campos + [''] * 6)[:6] for campos in linhas], dtype=object)
+    bruto[4] = bruto[4].map(lambda texto: float(texto.replace(',', '.')) if texto.lstrip('-')[:1].isdigit() else texto)
+    vetorizado = list(linhas_dataframe(tipar_dataframe(bruto, ESQUEMA_REPASSE), ESQUEMA_REPASSE))
+
+    indice = [coluna.tipo for coluna in ESQUEMA_REPASSE.colunas].index('centavos')
+    assert [linha[indice] for linha in puro] == CENTAVOS
+    assert vetorizado == puro
@@ -0,0 +1,28 @@
+import glob
+import os
+
+import pytest
+
+pytest.importorskip('pandas')
+pytest.importorskip('xlrd')
+
+from conftest import PASTA_XLS
+from conversor_streaming import MOTORES
+from leitor_excel import converter_planilha
+
+@pytest.mark.parametrize('motor', MOTORES)
+def test_erro_ao_criar_a_saida_nao_e_mascarado(tmp_path, motor):
+    planilha = sorted(glob.glob(os.path.join(PASTA_XLS, '*.xls')))[0]
+    saida = str(tmp_path / 'inexistente' / 'saida.csv')
+    # O erro original chega sem o FileNotFoundError da limpeza encadeado
+    with pytest.raises(FileNotFoundError) as erro:
+        converter_planilha(planilha, saida, motor=motor)
+    assert erro.value.filename == saida
+    assert erro.value.__context__ is None
+
+@pytest.mark.parametrize('motor', MOTORES)
+def test_conversao(tmp_path, motor):
+    planilha = sorted(glob.glob(os.path.join(PASTA_XLS, '*.xls')))[0]
+    saida = str(tmp_path / 'saida.csv')
+    assert converter_planilha(planilha, saida, motor=motor) > 0
+    assert os.path.getsize(saida) > 0
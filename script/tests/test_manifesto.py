@@ -0,0 +1,71 @@
+import os
+
+from conftest import TOTAL_EXEMPLOS, ler_total_geral
+from manifesto import Manifesto
+from processar_csv_final_ajustado import processar_arquivos_csv
+
+PARAMETROS = {'versao': 1}
+
+def _gravar(caminho, texto):
+    with open(caminho, 'w', encoding='utf-8') as f:
+        f.write(texto)
+
+def test_acerto_e_falha(tmp_path):
+    arquivo = str(tmp_path / 'a.csv')
+    _gravar(arquivo, 'conteudo original\n')
+    manifesto = Manifesto(str(tmp_path / 'manifesto.json'))
+    manifesto.registrar('consolidacao', arquivo, totais={'soma': '1,00'}, parametros=PARAMETROS)
+
+    assert manifesto.consultar('consolidacao', arquivo, PARAMETROS)['totais'] == {'soma': '1,00'}
+    # Outros parâmetros ou outra operação não aproveitam o registro
+    assert manifesto.consultar('consolidacao', arquivo, {'versao': 2}) is None
+    assert manifesto.consultar('conversao', arquivo, PARAMETROS) is None
+
+    # Data diferente com o mesmo conteúdo: confirmado pelo hash
+    info = os.stat(arquivo)
+    os.utime(arquivo, ns=(info.st_atime_ns, info.st_mtime_ns + 10 ** 9))
+    assert manifesto.consultar('consolidacao', arquivo, PARAMETROS) is not None
+
+    # Mesmo tamanho com outro conteúdo
+    _gravar(arquivo, 'conteudo alterado\n')
+    os.utime(arquivo, ns=(info.st_atime_ns, info.st_mtime_ns + 2 * 10 ** 9))
+    assert manifesto.consultar('consolidacao', arquivo, PARAMETROS) is None
+
+def test_saida_removida_invalida_o_registro(tmp_path):
+    arquivo = str(tmp_path / 'a.xls')
+    saida = str(tmp_path / 'a.csv')
+    _gravar(arquivo, 'planilha\n')
+    _gravar(saida, 'csv\n')
+    manifesto = Manifesto(None)
+    manifesto.registrar('conversao', arquivo, saidas=[saida])
+    assert manifesto.consultar('conversao', arquivo) is not None
+    os.remove(saida)
+    assert manifesto.consultar('conversao', arquivo) is None
+
+def test_manifesto_gravado_e_recarregado(tmp_path):
+    arquivo = str(tmp_path / 'a.csv')
+    caminho = str(tmp_path / 'manifesto.json')
+    _gravar(arquivo, 'conteudo\n')
+    manifesto = Manifesto(caminho)
+    manifesto.registrar('consolidacao', arquivo, parametros=PARAMETROS)
+    manifesto.salvar()
+    assert Manifesto(caminho).consultar('consolidacao', arquivo, PARAMETROS) is not None
+
+def test_consolidacao_reaproveita_o_manifesto(relatorios, capsys):
+    saida = os.path.join(relatorios, 'consolidado.csv')
+    manifesto = Manifesto(os.path.join(relatorios, 'manifesto.json'))
+
+    processar_arquivos_csv(relatorios, '*.csv', saida, manifesto)
+    assert ler_total_geral(saida) == TOTAL_EXEMPLOS
+    capsys.readouterr()
+
+    # Nada mudou: o consolidado não é refeito
+    processar_arquivos_csv(relatorios, '*.csv', saida, manifesto)
+    assert 'está atualizado' in capsys.readouterr().out
+
+    # Um relatório mudou: só ele é lido de novo
+    with open(os.path.join(relatorios, 'anne colono 5.csv'), 'a', encoding='utf-8') as f:
+        f.write('\n')
+    processar_arquivos_csv(relatorios, '*.csv', saida, manifesto)
+    assert capsys.readouterr().out.count('total reaproveitado do manifesto') == 4
+    assert ler_total_geral(saida) == TOTAL_EXEMPLOS
@@ -0,0 +1,50 @@
+import glob
+import os
+from decimal import Decimal
+
+from conftest import PASTA_CSV
+from parser_relatorio import (analisar_linhas, converter_valor, detectar_delimitador, eh_saida_gerada,
+                              Procedimento, TotalConvenio)
+
+# Soma das linhas 'Total <convênio>:' dos relatórios de exemplo ('anne colono 1..5.csv')
+TOTAL_EXEMPLOS = Decimal('2759.63')
+
+def _relatorios():
+    return sorted(glob.glob(os.path.join(PASTA_CSV, 'anne colono *.csv')))
+
+def _registros(arquivo):
+    with open(arquivo, 'r', encoding='utf-8-sig', newline='') as f:
+        return [registro for registro, _ in analisar_linhas(f)]
+
+def test_total_dos_exemplos():
+    relatorios = _relatorios()
+    assert len(relatorios) == 5
+    total = sum((registro.valor for arquivo in relatorios for registro in _registros(arquivo)
+                 if isinstance(registro, TotalConvenio)), Decimal('0'))
+    assert total == TOTAL_EXEMPLOS
+
+def test_procedimentos_somam_o_total_de_cada_convenio():
+    for arquivo in _relatorios():
+        somas = {}
+        for registro in _registros(arquivo):
+            if isinstance(registro, Procedimento):
+                somas[registro.convenio] = somas.get(registro.convenio, Decimal('0')) + registro.repasse
+            elif isinstance(registro, TotalConvenio):
+                assert somas.pop(registro.convenio) == registro.valor, (arquivo, registro.convenio)
+
+def test_exemplos_nos_dois_delimitadores():
+    delimitadores = set()
+    for arquivo in _relatorios():
+        with open(arquivo, 'r', encoding='utf-8-sig') as f:
+            delimitadores.add(detectar_delimitador(f.readline()))
+    assert delimitadores == {';', ','}
+
+def test_converter_valor():
+    assert converter_valor('1.024,27') == Decimal('1024.27')
+    assert converter_valor('1024.27', '.') == Decimal('1024.27')
+    assert converter_valor(' 170,95 ') == Decimal('170.95')
+    assert converter_valor('') is None
+
+def test_saida_gerada():
+    assert eh_saida_gerada(os.path.join(PASTA_CSV, 'consolidado.csv'))
+    assert not any(eh_saida_gerada(arquivo) for arquivo in _relatorios())
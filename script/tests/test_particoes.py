@@ -0,0 +1,57 @@
+import glob
+import os
+import re
+from decimal import Decimal
+
+import pytest
+
+from conftest import TOTAL_EXEMPLOS, ler_total_geral
+from parser_relatorio import analisar_linhas, converter_valor, Procedimento
+from particoes import SUFIXO_DIRETORIO
+from processar_csv_final_ajustado import processar_arquivos_csv, DestinosProcedimentos
+
+_RE_SUBTOTAL = re.compile(r'^Subtotal (.*):;(\d+) procedimento\(s\);Total:;([^;]*);$')
+
+def _subtotais(diretorio):
+    subtotais = {}
+    for arquivo in glob.glob(os.path.join(diretorio, '*')):
+        with open(arquivo, 'r', encoding='utf-8') as f:
+            linhas = f.read().splitlines()
+        m = _RE_SUBTOTAL.match(linhas[-1])
+        assert m, arquivo
+        subtotais[arquivo] = (int(m.group(2)), converter_valor(m.group(3)))
+    return subtotais
+
+@pytest.mark.parametrize('chave', ['convenio', 'profissional', 'mes'])
+def test_subtotais_somam_o_total_geral(relatorios, chave):
+    saida = os.path.join(relatorios, 'consolidado.csv')
+    processar_arquivos_csv(relatorios, '*.csv', saida, destinos=DestinosProcedimentos(particionar=chave))
+
+    subtotais = _subtotais(os.path.join(relatorios, 'consolidado' + SUFIXO_DIRETORIO))
+    assert sum((valor for _, valor in subtotais.values()), Decimal('0')) == ler_total_geral(saida) == TOTAL_EXEMPLOS
+
+    # Cada partição, lida como relatório, tem os procedimentos que o subtotal conta
+    for arquivo, (quantidade, valor) in subtotais.items():
+        with open(arquivo, 'r', encoding='utf-8') as f:
+            procedimentos = [registro for registro, _ in analisar_linhas(f) if isinstance(registro, Procedimento)]
+        assert len(procedimentos) == quantidade
+        assert sum((procedimento.repasse for procedimento in procedimentos), Decimal('0')) == valor
+
+def test_particoes_no_formato_do_sistema(relatorios):
+    saida = os.path.join(relatorios, 'consolidado.csv')
+    processar_arquivos_csv(relatorios, '*.csv', saida, destinos=DestinosProcedimentos(particionar='convenio'))
+
+    # 'anne colono 3.csv' é separado por ',' com ponto decimal
+    with open(os.path.join(relatorios, 'consolidado' + SUFIXO_DIRETORIO, 'consolidado_BRADESCO.csv'),
+              'r', encoding='utf-8') as f:
+        texto = f.read()
+    assert '118874;09/10/2024;EDNALDO ANDRADE DOS SANTOS;POLIPECTOMIA DE COLON;204,84;' in texto
+    assert '204.84' not in texto
+
+def test_nova_execucao_ignora_as_particoes(relatorios):
+    # Partições e consolidado no mesmo diretório dos relatórios
+    saida = os.path.join(relatorios, 'consolidado.csv')
+    processar_arquivos_csv(relatorios, '*.csv', saida,
+                           destinos=DestinosProcedimentos(particionar='convenio', diretorio_particoes=relatorios))
+    processar_arquivos_csv(relatorios, '*.csv', saida)
+    assert ler_total_geral(saida) == TOTAL_EXEMPLOS
@@ -0,0 +1,43 @@
+import glob
+import os
+from decimal import Decimal, ROUND_HALF_UP
+
+import pytest
+
+pd = pytest.importorskip('pandas')
+
+from conftest import PASTA_CSV
+from parser_relatorio import converter_valor
+from reconciliacao import converter_centavos, conferir_arquivo, conferir_arquivos
+
+VALORES_VIRGULA = ['170,95', ' 151,50 ', '1.024,27', '154', '0,5', '-12,30', '1,999', '0,005', '-0,015',
+                   '12.345.678,90', 'R$ 7,00', '', 'abc']
+VALORES_PONTO = ['170.95', '1,024.27', '154', '0.5', '-12.30', '1.999', '0.005', '12,345,678.90', '', 'abc']
+
+def _centavos_esperados(texto, decimal):
+    valor = converter_valor(texto, decimal)
+    if valor is None:
+        return None
+    return int((valor * 100).quantize(Decimal('1'), rounding=ROUND_HALF_UP))
+
+@pytest.mark.parametrize('decimal, textos', [(',', VALORES_VIRGULA), ('.', VALORES_PONTO)])
+def test_centavos_iguais_a_converter_valor(decimal, textos):
+    serie = pd.Series(textos + [None], dtype=object)
+    centavos = converter_centavos(serie, decimal)
+    obtidos = [None if pd.isna(valor) else int(valor) for valor in centavos]
+    assert obtidos == [_centavos_esperados(texto, decimal) for texto in textos] + [None]
+
+def test_centavos_de_serie_vazia():
+    assert converter_centavos(pd.Series([], dtype=object)).empty
+
+def test_exemplos_sem_divergencias():
+    arquivos = sorted(glob.glob(os.path.join(PASTA_CSV, 'anne colono *.csv')))
+    # Lotes de 2 juntam relatórios com vírgula e com ponto decimal
+    conferencias = list(conferir_arquivos(arquivos, tamanho_lote=2))
+    assert [conferencia.arquivo for conferencia in conferencias] == arquivos
+    assert all(conferencia.divergencias == [] for conferencia in conferencias)
+    assert sum(conferencia.procedimentos for conferencia in conferencias) == 15
+
+def test_consolidado_tem_blocos_sem_linhas_legiveis():
+    # O consolidado não é um relatório: seus blocos não têm procedimentos legíveis
+    assert conferir_arquivo(os.path.join(PASTA_CSV, 'consolidado.csv')).divergencias
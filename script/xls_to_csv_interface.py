@@ -4,16 +4,41 @@
 """
 Script para converter arquivos XLS/XLSX para CSV.
 Uso: python3 xls_to_csv.py [arquivo_entrada.xls] [arquivo_saida.csv] [numero_planilha]
+     python3 xls_to_csv.py --lote <diretorio_ou_padrao> [--destino DIR] [--processos N] [--timeout S]
 
 Se executado sem argumentos, o script entrará no modo interativo.
 Se o arquivo de saída não for especificado, será usado o mesmo nome do arquivo de entrada com extensão .csv
+Se o arquivo de saída terminar em .gz, .bz2 ou .xz, o CSV é gravado comprimido (ver compressao.py)
 Se o número da planilha não for especificado, será usada a primeira planilha (índice 0)
+No modo lote, todos os arquivos Excel do diretório (ou que casem com o padrão glob)
+são convertidos em paralelo, um processo por núcleo.
 """
 
 import sys
 import os
-import pandas as pd
+import time
+import signal
+import argparse
 import glob
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+from leitor_excel import abrir_excel, converter_planilha, converter_tabela, listar_nomes_planilhas, exportar_todas_planilhas, TODAS_PLANILHAS, PADRAO_NOME_PLANILHAS
+from manifesto import Manifesto, NOME_MANIFESTO_PADRAO
+from conversor_streaming import MOTORES, MOTOR_PANDAS, MOTOR_STREAMING, abrir_livro, fechar_livro, nomes_planilhas, converter_planilha_streaming
+import metricas
+import dialetos
+import compressao
+from dialetos import eh_padrao, parametros_dialeto
+from esquemas import carregar_esquema, parametros_esquema
+
+# Tempo máximo (em segundos) para converter cada arquivo no modo lote
+TIMEOUT_PADRAO_LOTE = 300
+
+# Tolerância (em segundos) da vigia do tempo limite, usada sem SIGALRM, além do timeout
+FOLGA_VIGIA_LOTE = 5
+
+# Nome da operação registrada no manifesto de arquivos já convertidos
+OPERACAO_CONVERSAO = 'conversao'
 
 def listar_arquivos_excel(diretorio='.'):
     """
@@ -40,29 +65,89 @@ def listar_planilhas(arquivo_excel):
         list: Lista de nomes das planilhas
     """
     try:
-        xl = pd.ExcelFile(arquivo_excel)
-        return xl.sheet_names
+        return listar_nomes_planilhas(arquivo_excel)
     except Exception as e:
         print(f"Erro ao listar planilhas: {str(e)}")
         return []
 
-def converter_xls_para_csv(arquivo_entrada, arquivo_saida=None, numero_planilha=0):
+def _parametros_conversao(arquivo_entrada, arquivo_saida, numero_planilha, padrao_nome, motor, dialeto=None, esquema=None):
+    """Parâmetros que determinam o resultado de uma conversão, registrados no manifesto"""
+    if numero_planilha == TODAS_PLANILHAS:
+        saida = arquivo_saida or os.path.dirname(arquivo_entrada)
+    else:
+        saida = arquivo_saida or f"{os.path.splitext(arquivo_entrada)[0]}.csv"
+    parametros = {
+        'planilha': numero_planilha,
+        'saida': os.path.abspath(saida),
+        'padrao_nome': padrao_nome if numero_planilha == TODAS_PLANILHAS else None,
+        'motor': motor,
+    }
+    # O dialeto padrão não é registrado, para manter válidas as entradas já existentes
+    if not eh_padrao(dialeto):
+        parametros['dialeto'] = parametros_dialeto(dialeto)
+    if esquema is not None:
+        parametros['esquema'] = parametros_esquema(esquema)
+    return parametros
+
+def converter_xls_para_csv(arquivo_entrada, arquivo_saida=None, numero_planilha=0, padrao_nome=PADRAO_NOME_PLANILHAS, paralelo=False, motor=MOTOR_PANDAS, manifesto=None, dialeto=None, esquema=None):
     """
     Converte um arquivo XLS/XLSX para CSV.
     
     Args:
         arquivo_entrada (str): Caminho para o arquivo XLS/XLSX de entrada
         arquivo_saida (str, opcional): Caminho para o arquivo CSV de saída
-        numero_planilha (int, opcional): Número da planilha a ser convertida (padrão: 0)
+            (ao converter todas as planilhas, é o diretório de saída)
+        numero_planilha (int, opcional): Número da planilha a ser convertida (padrão: 0);
+            use TODAS_PLANILHAS para gerar um CSV por planilha
+        padrao_nome (str, opcional): Padrão do nome dos CSVs ao converter todas as planilhas
+        paralelo (bool, opcional): Lê as planilhas em paralelo ao converter todas as planilhas
+        motor (str, opcional): 'pandas' (padrão) ou 'streaming', que grava o CSV linha a linha
+            sem carregar a planilha inteira na memória
+        manifesto (Manifesto, opcional): Manifesto de conversões já realizadas; se o arquivo
+            não mudou desde a última conversão com os mesmos parâmetros, nada é feito
+        dialeto (Dialeto, opcional): Formato do CSV (padrão: o CSV gerado pelo pandas); use
+            dialetos.DIALETO_SISTEMA para gravar direto no formato dos relatórios do sistema
+        esquema (Esquema, opcional): Grava, em vez da planilha como está, a tabela tipada dos
+            procedimentos declarada no esquema (ver esquemas.py)
     
     Returns:
         bool: True se a conversão foi bem-sucedida, False caso contrário
     """
+    livro = None
     try:
         # Verifica se o arquivo de entrada existe
         if not os.path.isfile(arquivo_entrada):
             print(f"Erro: O arquivo '{arquivo_entrada}' não existe.")
             return False
+        if esquema is not None and numero_planilha == TODAS_PLANILHAS:
+            print("Erro: A leitura com esquema converte uma única planilha por arquivo.")
+            return False
+        
+        # Ignora arquivos que não mudaram desde a última conversão
+        parametros = _parametros_conversao(arquivo_entrada, arquivo_saida, numero_planilha, padrao_nome, motor, dialeto, esquema)
+        if manifesto is not None:
+            with metricas.etapa('consulta_manifesto'):
+                inalterado = manifesto.consultar(OPERACAO_CONVERSAO, arquivo_entrada, parametros)
+            if inalterado:
+                print(f"Arquivo '{arquivo_entrada}' sem alterações desde a última conversão; nada a fazer.")
+                return True
+        
+        # Converte todas as planilhas, um CSV por planilha, lendo o arquivo uma única vez
+        if numero_planilha == TODAS_PLANILHAS:
+            print(f"Lendo o arquivo '{arquivo_entrada}' e convertendo todas as planilhas...")
+            linhas = {}
+            with metricas.etapa('exportacao_planilhas'):
+                saidas = exportar_todas_planilhas(arquivo_entrada, padrao_nome, arquivo_saida, paralelo, motor=motor, linhas=linhas,
+                                                  dialeto=dialeto)
+            for nome_planilha, saida in saidas:
+                print(f"  - Planilha '{nome_planilha}' salva como '{saida}'")
+            if metricas.ativa():
+                metricas.contar(arquivo_entrada, linhas=sum(linhas.values()), bytes_entrada=os.path.getsize(arquivo_entrada),
+                                bytes_saida=sum(os.path.getsize(saida) for _, saida in saidas))
+            print(f"Conversão concluída com sucesso! {len(saidas)} planilha(s) convertida(s).")
+            if manifesto is not None:
+                manifesto.registrar(OPERACAO_CONVERSAO, arquivo_entrada, [saida for _, saida in saidas], parametros=parametros)
+            return True
         
         # Se o arquivo de saída não for especificado, usa o mesmo nome do arquivo de entrada com extensão .csv
         if arquivo_saida is None:
@@ -73,7 +158,12 @@ def converter_xls_para_csv(arquivo_entrada, arquivo_saida=None, numero_planilha=
         print(f"Lendo o arquivo '{arquivo_entrada}'...")
         
         # Obtém os nomes das planilhas
-        planilhas = listar_planilhas(arquivo_entrada)
+        with metricas.etapa('listagem_planilhas'):
+            if motor == MOTOR_STREAMING:
+                livro = abrir_livro(arquivo_entrada)
+                planilhas = nomes_planilhas(livro)
+            else:
+                planilhas = listar_planilhas(arquivo_entrada)
         if not planilhas:
             print("Erro: Não foi possível ler as planilhas do arquivo.")
             return False
@@ -91,19 +181,272 @@ def converter_xls_para_csv(arquivo_entrada, arquivo_saida=None, numero_planilha=
                 return False
             sheet_name = numero_planilha
         
-        # Lê a planilha especificada
-        df = pd.read_excel(arquivo_entrada, sheet_name=sheet_name)
-        
-        # Salva como CSV
-        print(f"Convertendo para CSV e salvando como '{arquivo_saida}'...")
-        df.to_csv(arquivo_saida, index=False, encoding='utf-8')
+        if esquema is not None:
+            # Lê só as colunas do esquema, já com os tipos declarados, e grava os procedimentos
+            print(f"Lendo os procedimentos com o esquema '{esquema.nome}' e salvando como '{arquivo_saida}'...")
+            with metricas.etapa('leitura_tipada'):
+                linhas = converter_tabela(arquivo_entrada, arquivo_saida, esquema, sheet_name, motor, dialeto)
+        elif motor == MOTOR_STREAMING:
+            # Lê e grava a planilha linha a linha, sem montar um DataFrame
+            print(f"Convertendo para CSV em streaming e salvando como '{arquivo_saida}'...")
+            # Leitura e escrita são intercaladas linha a linha, por isso são medidas juntas
+            with metricas.etapa('conversao_streaming'):
+                linhas = converter_planilha_streaming(arquivo_entrada, arquivo_saida, sheet_name, livro, dialeto=dialeto)
+        elif not eh_padrao(dialeto):
+            # Lê a planilha e grava cada linha já no formato do dialeto, em uma única passagem
+            print(f"Convertendo para CSV e salvando como '{arquivo_saida}'...")
+            with metricas.etapa('leitura_escrita'):
+                linhas = converter_planilha(arquivo_entrada, arquivo_saida, sheet_name, dialeto=dialeto)
+        else:
+            # Lê a planilha especificada reaproveitando o arquivo já aberto na listagem
+            with metricas.etapa('leitura'):
+                df = abrir_excel(arquivo_entrada).parse(sheet_name=sheet_name)
+            
+            # Salva como CSV
+            print(f"Convertendo para CSV e salvando como '{arquivo_saida}'...")
+            with metricas.etapa('escrita'):
+                with compressao.abrir_arquivo(arquivo_saida, 'w', encoding='utf-8', newline='') as f:
+                    df.to_csv(f, index=False)
+            linhas = len(df)
         
+        if metricas.ativa():
+            metricas.contar(arquivo_entrada, linhas=linhas, bytes_entrada=os.path.getsize(arquivo_entrada),
+                            bytes_saida=os.path.getsize(arquivo_saida))
         print(f"Conversão concluída com sucesso! O arquivo foi salvo como '{arquivo_saida}'.")
+        if manifesto is not None:
+            with metricas.etapa('registro_manifesto'):
+                manifesto.registrar(OPERACAO_CONVERSAO, arquivo_entrada, [arquivo_saida], parametros=parametros)
         return True
     
     except Exception as e:
         print(f"Erro durante a conversão: {str(e)}")
         return False
+    
+    finally:
+        if livro is not None:
+            fechar_livro(livro)
+
+class TempoEsgotado(BaseException):
+    """
+    Sinaliza que a conversão de um arquivo do lote excedeu o tempo limite.
+
+    Herda de BaseException para não ser capturada pelo tratamento genérico
+    de erros de converter_xls_para_csv.
+    """
+
+def _estourar_tempo(signum, frame):
+    raise TempoEsgotado()
+
+def expandir_entrada_lote(entrada):
+    """
+    Expande um diretório ou padrão glob na lista de arquivos Excel a converter.
+
+    Args:
+        entrada (str): Diretório ou padrão glob (ex: 'arq xls/anne *.xls')
+
+    Returns:
+        list: Lista ordenada de arquivos Excel encontrados
+    """
+    if os.path.isdir(entrada):
+        return listar_arquivos_excel(entrada)
+
+    arquivos = glob.glob(entrada)
+    return sorted(a for a in arquivos if os.path.splitext(a)[1].lower() in ('.xls', '.xlsx'))
+
+def _caminho_saida_lote(arquivo_entrada, diretorio_saida=None):
+    """Define o CSV de saída de um arquivo do lote (mesmo nome, extensão .csv)"""
+    nome_base = os.path.splitext(os.path.basename(arquivo_entrada))[0]
+    diretorio = diretorio_saida or os.path.dirname(arquivo_entrada)
+    return os.path.join(diretorio, f"{nome_base}.csv")
+
+def _converter_arquivo_lote(arquivo_entrada, arquivo_saida, numero_planilha, timeout, padrao_nome=PADRAO_NOME_PLANILHAS, motor=MOTOR_PANDAS, registrar=False, dialeto=None, esquema=None, iniciados=None):
+    """
+    Converte um arquivo dentro de um processo do pool, respeitando o tempo limite.
+
+    Args:
+        iniciados (dict, opcional): Dicionário compartilhado (multiprocessing.Manager) onde o
+            worker registra quando começou a converter o arquivo, para a vigia do tempo limite
+
+    Returns:
+        tuple: (arquivo_entrada, sucesso, mensagem, duracao_em_segundos, entradas_manifesto)
+    """
+    if iniciados is not None:
+        iniciados[arquivo_entrada] = time.time()
+    inicio = time.perf_counter()
+    # O manifesto é gravado apenas pelo processo principal; aqui o registro fica em memória
+    manifesto = Manifesto(None) if registrar else None
+
+    # Em sistemas POSIX o próprio worker interrompe a conversão ao estourar o tempo
+    usar_alarme = bool(timeout) and hasattr(signal, 'SIGALRM')
+    if usar_alarme:
+        signal.signal(signal.SIGALRM, _estourar_tempo)
+        signal.setitimer(signal.ITIMER_REAL, timeout)
+
+    try:
+        sucesso = converter_xls_para_csv(arquivo_entrada, arquivo_saida, numero_planilha, padrao_nome,
+                                         motor=motor, manifesto=manifesto, dialeto=dialeto, esquema=esquema)
+        mensagem = "" if sucesso else "falha na conversão"
+    except TempoEsgotado:
+        sucesso = False
+        mensagem = f"tempo limite de {timeout}s excedido"
+    finally:
+        if usar_alarme:
+            signal.setitimer(signal.ITIMER_REAL, 0)
+
+    entradas = manifesto.entradas if manifesto is not None else None
+    return arquivo_entrada, sucesso, mensagem, time.perf_counter() - inicio, entradas
+
+def converter_lote(arquivos, diretorio_saida=None, numero_planilha=0, processos=None, timeout=TIMEOUT_PADRAO_LOTE, padrao_nome=PADRAO_NOME_PLANILHAS, motor=MOTOR_PANDAS, manifesto=None, dialeto=None, esquema=None):
+    """
+    Converte vários arquivos XLS/XLSX para CSV usando um pool de processos.
+
+    Cada processo do pool importa o pandas uma única vez e converte vários
+    arquivos. Uma falha (ou estouro de tempo) em um arquivo não interrompe os demais.
+
+    Args:
+        arquivos (list): Arquivos Excel a converter
+        diretorio_saida (str, opcional): Diretório dos CSVs (padrão: o diretório de cada arquivo)
+        numero_planilha (int, opcional): Número da planilha a ser convertida (padrão: 0);
+            use TODAS_PLANILHAS para gerar um CSV por planilha de cada arquivo
+        processos (int, opcional): Tamanho do pool (padrão: número de núcleos)
+        timeout (float, opcional): Tempo máximo por arquivo, em segundos (0 ou None desativa)
+        padrao_nome (str, opcional): Padrão do nome dos CSVs ao converter todas as planilhas
+        motor (str, opcional): Motor de conversão, 'pandas' (padrão) ou 'streaming'
+        manifesto (Manifesto, opcional): Manifesto de conversões já realizadas; arquivos que
+            não mudaram desde a última conversão são ignorados
+        dialeto (Dialeto, opcional): Formato dos CSVs (padrão: o CSV gerado pelo pandas)
+        esquema (Esquema, opcional): Grava a tabela tipada dos procedimentos de cada arquivo
+
+    Returns:
+        bool: True se todos os arquivos foram convertidos, False caso contrário
+    """
+    if not arquivos:
+        print("Erro: Nenhum arquivo Excel para converter.")
+        return False
+
+    if diretorio_saida:
+        os.makedirs(diretorio_saida, exist_ok=True)
+
+    def saida_do_arquivo(arquivo):
+        if numero_planilha == TODAS_PLANILHAS:
+            return diretorio_saida
+        return _caminho_saida_lote(arquivo, diretorio_saida)
+
+    # Ignora os arquivos que não mudaram desde a última conversão
+    inalterados = []
+    if manifesto is not None:
+        for arquivo in arquivos:
+            parametros = _parametros_conversao(arquivo, saida_do_arquivo(arquivo), numero_planilha, padrao_nome, motor, dialeto, esquema)
+            if manifesto.consultar(OPERACAO_CONVERSAO, arquivo, parametros):
+                inalterados.append(arquivo)
+        ignorar = set(inalterados)
+        arquivos = [arquivo for arquivo in arquivos if arquivo not in ignorar]
+        if inalterados:
+            print(f"{len(inalterados)} arquivo(s) sem alterações desde a última conversão serão ignorados.")
+
+    if not arquivos:
+        print("\nTodos os arquivos já estão convertidos.")
+        return True
+
+    processos = min(processos or os.cpu_count() or 1, len(arquivos))
+    print(f"Convertendo {len(arquivos)} arquivo(s) com {processos} processo(s)...")
+
+    inicio = time.perf_counter()
+    sucessos = []
+    falhas = []
+    travados = False
+
+    # Com SIGALRM, cada worker interrompe a própria conversão (ver _converter_arquivo_lote).
+    # Sem ele (ex: Windows), o processo principal vigia o tempo de cada arquivo a partir do
+    # instante registrado pelo worker: o pool entrega arquivos aos workers antes de eles
+    # ficarem livres, e um futuro já aparece como running() enquanto ainda espera na fila.
+    gerenciador = None
+    iniciados = None
+    if timeout and not hasattr(signal, 'SIGALRM'):
+        gerenciador = multiprocessing.Manager()
+        iniciados = gerenciador.dict()
+
+    # Os processos gravam as saídas comprimidas com o mesmo nível do processo principal
+    executor = ProcessPoolExecutor(max_workers=processos, initializer=compressao.definir_nivel,
+                                   initargs=(compressao.nivel_atual(),))
+    try:
+        futuros = {}
+        for arquivo in arquivos:
+            futuro = executor.submit(_converter_arquivo_lote, arquivo, saida_do_arquivo(arquivo), numero_planilha,
+                                     timeout, padrao_nome, motor, manifesto is not None, dialeto, esquema, iniciados)
+            futuros[futuro] = arquivo
+
+        pendentes = set(futuros)
+        while pendentes:
+            concluidos, pendentes = wait(pendentes, timeout=0.5, return_when=FIRST_COMPLETED)
+
+            for futuro in concluidos:
+                try:
+                    arquivo, sucesso, mensagem, duracao, entradas = futuro.result()
+                except Exception as e:
+                    arquivo, sucesso, mensagem, duracao, entradas = futuros[futuro], False, str(e), 0.0, None
+
+                if sucesso and manifesto is not None:
+                    manifesto.mesclar(entradas)
+
+                if sucesso:
+                    sucessos.append((arquivo, duracao))
+                    # As conversões rodam em outros processos; aqui só se conhece a duração de cada uma
+                    metricas.contar(arquivo, tempo_s=duracao)
+                else:
+                    falhas.append((arquivo, mensagem))
+
+            # Vigia do tempo limite para plataformas sem SIGALRM
+            if iniciados is not None:
+                agora = time.time()
+                for futuro in list(pendentes):
+                    iniciado = iniciados.get(futuros[futuro])
+                    if iniciado is not None and agora - iniciado > timeout + FOLGA_VIGIA_LOTE:
+                        pendentes.discard(futuro)
+                        falhas.append((futuros[futuro], f"tempo limite de {timeout}s excedido"))
+                        travados = True
+    finally:
+        if travados:
+            # ProcessPoolExecutor não oferece API pública para encerrar workers travados
+            for processo in list(getattr(executor, '_processes', {}).values()):
+                processo.terminate()
+        executor.shutdown(wait=not travados, cancel_futures=True)
+        if gerenciador is not None:
+            gerenciador.shutdown()
+
+    duracao_total = time.perf_counter() - inicio
+
+    print("\n===== RESUMO DO LOTE =====")
+    print(f"Arquivos processados: {len(arquivos)}")
+    if inalterados:
+        print(f"Sem alterações (ignorados): {len(inalterados)}")
+    print(f"Sucessos: {len(sucessos)}")
+    print(f"Falhas: {len(falhas)}")
+    for arquivo, mensagem in sorted(falhas):
+        print(f"  - {arquivo}: {mensagem}")
+    print(f"Tempo total: {duracao_total:.2f}s")
+
+    return not falhas
+
+def _converter_todos_interativo(arquivos_excel):
+    """
+    Converte no modo lote todos os arquivos listados no modo interativo.
+
+    Args:
+        arquivos_excel (list): Arquivos Excel listados para o usuário
+
+    Returns:
+        bool: True se todos os arquivos foram convertidos, False caso contrário
+    """
+    diretorio_saida = input("\nDiretório de saída dos CSVs (ou pressione Enter para usar o mesmo dos arquivos): ").strip()
+
+    print(f"\nSerão convertidos {len(arquivos_excel)} arquivo(s), usando a primeira planilha de cada um.")
+    confirmacao = input("Confirmar conversão? (s/n): ")
+    if confirmacao.lower() not in ['s', 'sim', 'y', 'yes']:
+        print("Conversão cancelada pelo usuário.")
+        return False
+
+    return converter_lote(arquivos_excel, diretorio_saida or None)
 
 def modo_interativo():
     """
@@ -128,7 +471,10 @@ def modo_interativo():
                 
                 while True:
                     try:
-                        escolha = int(input("\nEscolha o número do arquivo (ou 0 para informar outro caminho): "))
+                        escolha = input("\nEscolha o número do arquivo (0 para informar outro caminho, T para converter todos): ").strip()
+                        if escolha.lower() == 't':
+                            return _converter_todos_interativo(arquivos_excel)
+                        escolha = int(escolha)
                         if escolha == 0:
                             arquivo_entrada = input("Informe o caminho completo do arquivo Excel: ")
                             break
@@ -148,7 +494,10 @@ def modo_interativo():
         
         while True:
             try:
-                escolha = int(input("\nEscolha o número do arquivo (ou 0 para informar outro caminho): "))
+                escolha = input("\nEscolha o número do arquivo (0 para informar outro caminho, T para converter todos): ").strip()
+                if escolha.lower() == 't':
+                    return _converter_todos_interativo(arquivos_excel)
+                escolha = int(escolha)
                 if escolha == 0:
                     arquivo_entrada = input("Informe o caminho completo do arquivo Excel: ")
                     break
@@ -178,10 +527,13 @@ def modo_interativo():
     # Solicita a escolha da planilha
     while True:
         try:
-            escolha_planilha = input("\nEscolha o número da planilha (ou pressione Enter para usar a primeira): ")
+            escolha_planilha = input("\nEscolha o número da planilha (Enter para usar a primeira, T para converter todas): ").strip()
             if escolha_planilha == "":
                 numero_planilha = 0
                 break
+            elif escolha_planilha.lower() == 't':
+                numero_planilha = TODAS_PLANILHAS
+                break
             else:
                 escolha_planilha = int(escolha_planilha)
                 if 1 <= escolha_planilha <= len(planilhas):
@@ -192,19 +544,31 @@ def modo_interativo():
         except ValueError:
             print("Por favor, digite um número válido.")
     
-    # Solicita o nome do arquivo de saída
     nome_base = os.path.splitext(os.path.basename(arquivo_entrada))[0]
-    sugestao_saida = f"{nome_base}.csv"
     
-    arquivo_saida = input(f"\nNome do arquivo CSV de saída (ou pressione Enter para usar '{sugestao_saida}'): ")
-    if arquivo_saida == "":
-        arquivo_saida = sugestao_saida
+    if numero_planilha == TODAS_PLANILHAS:
+        # Solicita o diretório e o padrão de nome dos arquivos de saída
+        arquivo_saida = input("\nDiretório dos arquivos CSV (ou pressione Enter para usar o diretório atual): ").strip() or "."
+        padrao_nome = input(f"Padrão de nome dos arquivos (ou pressione Enter para usar '{PADRAO_NOME_PLANILHAS}'): ").strip()
+        padrao_nome = padrao_nome or PADRAO_NOME_PLANILHAS
+        descricao_planilha = f"Todas ({len(planilhas)} planilha(s))"
+        descricao_saida = f"{arquivo_saida} ({padrao_nome})"
+    else:
+        # Solicita o nome do arquivo de saída
+        sugestao_saida = f"{nome_base}.csv"
+        
+        arquivo_saida = input(f"\nNome do arquivo CSV de saída (ou pressione Enter para usar '{sugestao_saida}'): ")
+        if arquivo_saida == "":
+            arquivo_saida = sugestao_saida
+        padrao_nome = PADRAO_NOME_PLANILHAS
+        descricao_planilha = f"{planilhas[numero_planilha]} (índice {numero_planilha})"
+        descricao_saida = arquivo_saida
     
     # Confirma as escolhas
     print("\nResumo da conversão:")
     print(f"Arquivo de entrada: {arquivo_entrada}")
-    print(f"Planilha: {planilhas[numero_planilha]} (índice {numero_planilha})")
-    print(f"Arquivo de saída: {arquivo_saida}")
+    print(f"Planilha: {descricao_planilha}")
+    print(f"Arquivo de saída: {descricao_saida}")
     
     confirmacao = input("\nConfirmar conversão? (s/n): ")
     if confirmacao.lower() not in ['s', 'sim', 'y', 'yes']:
@@ -212,7 +576,113 @@ def modo_interativo():
         return False
     
     # Realiza a conversão
-    return converter_xls_para_csv(arquivo_entrada, arquivo_saida, numero_planilha)
+    return converter_xls_para_csv(arquivo_entrada, arquivo_saida, numero_planilha, padrao_nome)
+
+def criar_parser_argumentos():
+    """
+    Cria o parser dos argumentos de linha de comando.
+
+    Returns:
+        argparse.ArgumentParser: Parser configurado
+    """
+    parser = argparse.ArgumentParser(description="Converte arquivos XLS/XLSX para CSV.")
+    parser.add_argument('arquivo_entrada', nargs='?', help="Arquivo Excel de entrada")
+    parser.add_argument('arquivo_saida', nargs='?', help="Arquivo CSV de saída")
+    parser.add_argument('numero_planilha', nargs='?', help="Índice da planilha (começando em 0)")
+    parser.add_argument('--todas-planilhas', action='store_true',
+                        help="Gera um CSV por planilha (o arquivo de saída passa a ser o diretório de saída)")
+    parser.add_argument('--padrao-nome', default=PADRAO_NOME_PLANILHAS,
+                        help=f"Padrão do nome dos CSVs com --todas-planilhas (padrão: '{PADRAO_NOME_PLANILHAS}')")
+    parser.add_argument('--paralelo', action='store_true',
+                        help="Lê as planilhas em paralelo com --todas-planilhas")
+    parser.add_argument('--motor', choices=MOTORES, default=MOTOR_PANDAS,
+                        help="Motor de conversão: 'pandas' (padrão) ou 'streaming' (memória constante)")
+    parser.add_argument('--cache', action='store_true',
+                        help=f"Ignora arquivos sem alterações desde a última conversão (manifesto '{NOME_MANIFESTO_PADRAO}')")
+    parser.add_argument('--manifesto', metavar='ARQUIVO',
+                        help="Arquivo do manifesto de conversões (implica --cache)")
+    parser.add_argument('--invalidar-cache', action='store_true',
+                        help="Descarta o manifesto de conversões antes de converter")
+    parser.add_argument('--lote', metavar='ENTRADA',
+                        help="Converte todos os arquivos Excel de um diretório ou padrão glob")
+    parser.add_argument('--destino', metavar='DIR', help="Diretório dos CSVs gerados no modo lote")
+    parser.add_argument('--planilha', type=int, default=0,
+                        help="Índice da planilha convertida em cada arquivo do lote (padrão: 0)")
+    parser.add_argument('--processos', type=int, default=None,
+                        help="Número de processos do modo lote (padrão: número de núcleos)")
+    parser.add_argument('--timeout', type=float, default=TIMEOUT_PADRAO_LOTE,
+                        help=f"Tempo máximo por arquivo no modo lote, em segundos (padrão: {TIMEOUT_PADRAO_LOTE})")
+    parser.add_argument('--esquema', metavar='NOME|ARQUIVO',
+                        help="Grava a tabela tipada dos procedimentos, com as colunas do esquema "
+                             "('repasse' ou um arquivo JSON), em vez da planilha como está")
+    compressao.adicionar_argumentos(parser)
+    dialetos.adicionar_argumentos(parser)
+    metricas.adicionar_argumentos(parser)
+    return parser
+
+def executar_linha_comando(args):
+    """
+    Executa a conversão pedida pelos argumentos de linha de comando.
+
+    Args:
+        args (argparse.Namespace): Argumentos lidos por criar_parser_argumentos
+
+    Returns:
+        bool: True se a conversão foi bem-sucedida, False caso contrário
+    """
+    try:
+        dialeto = dialetos.dialeto_dos_argumentos(args)
+        esquema = carregar_esquema(args.esquema) if args.esquema else None
+    except ValueError as e:
+        print(f"Erro: {str(e)}")
+        return False
+    # Definido sempre, pois o servidor de conversão executa vários trabalhos no mesmo processo
+    compressao.definir_nivel(args.nivel_compressao)
+
+    # Manifesto de arquivos já convertidos (conversão incremental)
+    manifesto = None
+    if args.cache or args.manifesto or args.invalidar_cache:
+        manifesto = Manifesto(args.manifesto or NOME_MANIFESTO_PADRAO)
+        if args.invalidar_cache:
+            removidas = manifesto.invalidar(operacao=OPERACAO_CONVERSAO)
+            print(f"Cache de conversões invalidado ({removidas} entrada(s) removida(s)).")
+
+    if args.lote:
+        # Modo lote: converte todos os arquivos do diretório ou padrão
+        arquivos = expandir_entrada_lote(args.lote)
+        if not arquivos:
+            print(f"Erro: Nenhum arquivo Excel encontrado em '{args.lote}'.")
+            return False
+        numero_planilha = TODAS_PLANILHAS if args.todas_planilhas else args.planilha
+        with metricas.etapa('conversao_lote'):
+            sucesso = converter_lote(arquivos, args.destino, numero_planilha, args.processos, args.timeout,
+                                     args.padrao_nome, args.motor, manifesto, dialeto, esquema)
+        if manifesto is not None:
+            manifesto.salvar()
+        return sucesso
+
+    # Com argumentos, usa o modo tradicional
+    if args.arquivo_entrada is None:
+        print("Erro: Informe o arquivo de entrada ou use --lote.")
+        return False
+    
+    # Obtém o número da planilha, se especificado
+    numero_planilha = 0
+    if args.todas_planilhas:
+        numero_planilha = TODAS_PLANILHAS
+    elif args.numero_planilha is not None:
+        try:
+            numero_planilha = int(args.numero_planilha)
+        except ValueError:
+            print("Erro: O número da planilha deve ser um número inteiro.")
+            return False
+    
+    # Converte o arquivo
+    sucesso = converter_xls_para_csv(args.arquivo_entrada, args.arquivo_saida, numero_planilha,
+                                     args.padrao_nome, args.paralelo, args.motor, manifesto, dialeto, esquema)
+    if manifesto is not None:
+        manifesto.salvar()
+    return sucesso
 
 def main():
     # Verifica se há argumentos da linha de comando
@@ -220,26 +690,9 @@ def main():
         # Sem argumentos, entra no modo interativo
         sucesso = modo_interativo()
     else:
-        # Com argumentos, usa o modo tradicional
-        # Obtém o arquivo de entrada
-        arquivo_entrada = sys.argv[1]
-        
-        # Obtém o arquivo de saída, se especificado
-        arquivo_saida = None
-        if len(sys.argv) >= 3:
-            arquivo_saida = sys.argv[2]
-        
-        # Obtém o número da planilha, se especificado
-        numero_planilha = 0
-        if len(sys.argv) >= 4:
-            try:
-                numero_planilha = int(sys.argv[3])
-            except ValueError:
-                print("Erro: O número da planilha deve ser um número inteiro.")
-                sys.exit(1)
-        
-        # Converte o arquivo
-        sucesso = converter_xls_para_csv(arquivo_entrada, arquivo_saida, numero_planilha)
+        args = criar_parser_argumentos().parse_args()
+        with metricas.medir(args.metricas, args.metricas_saida, args.perfil):
+            sucesso = executar_linha_comando(args)
     
     # Sai com código de erro apropriado
     sys.exit(0 if sucesso else 1)